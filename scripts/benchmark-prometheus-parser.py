@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Prometheus Parser Benchmark for the OCI Telemetry Ingestion Script
+
+Compares the original line-splitting parser (kept verbatim below as the
+baseline) with the streaming parser in oci-telemetry-metrics-ingestion.py
+on synthetic /metrics bodies shaped like BharatMart's exporter output.
+
+Requirements:
+- Same as scripts/oci-telemetry-metrics-ingestion.py (it is imported directly)
+
+Usage:
+    python3 scripts/benchmark-prometheus-parser.py
+    python3 scripts/benchmark-prometheus-parser.py --lines 10000 100000 1000000
+"""
+
+import argparse
+import importlib.util
+import os
+import re
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+INGESTION_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'oci-telemetry-metrics-ingestion.py')
+
+METHODS = ['GET', 'POST', 'PUT', 'DELETE']
+STATUS_CODES = ['200', '201', '400', '404', '500', '503']
+BUCKETS = ['0.01', '0.05', '0.1', '0.5', '1', '2', '5', '+Inf']
+
+
+def load_ingestion_module():
+    """Import the ingestion script despite its hyphenated file name."""
+    spec = importlib.util.spec_from_file_location('oci_telemetry_metrics_ingestion', INGESTION_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def legacy_parse_prometheus_metrics(prometheus_text: str) -> Dict[str, Any]:
+    """Baseline: the parser as it shipped before the streaming rewrite."""
+    metrics = {}
+
+    for line in prometheus_text.split('\n'):
+        line = line.strip()
+
+        if not line or line.startswith('#'):
+            continue
+
+        match = re.match(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{([^}]+)\})?\s+([\d.]+)(?:\s+(\d+))?$', line)
+        if match:
+            metric_name = match.group(1)
+            labels_str = match.group(2) if match.group(2) else ""
+            value = float(match.group(3))
+
+            labels = {}
+            if labels_str:
+                label_pattern = r'([a-zA-Z_][a-zA-Z0-9_]*)\s*=\s*"([^"]*)"'
+                for label_match in re.finditer(label_pattern, labels_str):
+                    labels[label_match.group(1)] = label_match.group(2)
+
+            metric_key = f"{metric_name}"
+            if metric_key not in metrics:
+                metrics[metric_key] = []
+
+            metrics[metric_key].append({
+                'value': value,
+                'labels': labels,
+                'name': metric_name
+            })
+
+    return metrics
+
+
+def generate_scrape(target_lines: int) -> str:
+    """
+    Build a synthetic exposition body of roughly target_lines sample lines.
+
+    Each route contributes an http_request_duration_seconds histogram and an
+    http_requests_total counter per method/status_code pair, which is how
+    cardinality grows in the real exporter.
+    """
+    lines = [
+        '# HELP http_request_duration_seconds Duration of HTTP requests in seconds',
+        '# TYPE http_request_duration_seconds histogram',
+    ]
+    route = 0
+    while len(lines) < target_lines:
+        for method in METHODS:
+            for status_code in STATUS_CODES:
+                labels = f'method="{method}",route="/api/products/{route}",status_code="{status_code}"'
+                count = route + 1
+                for le in BUCKETS:
+                    lines.append(f'http_request_duration_seconds_bucket{{le="{le}",{labels}}} {count}')
+                lines.append(f'http_request_duration_seconds_sum{{{labels}}} {count * 0.042}')
+                lines.append(f'http_request_duration_seconds_count{{{labels}}} {count}')
+                lines.append(f'http_requests_total{{{labels}}} {count}')
+        route += 1
+    return '\n'.join(lines[:target_lines]) + '\n'
+
+
+def iter_chunks(body: bytes, chunk_size: int) -> Iterator[bytes]:
+    """Slice a body the way requests' iter_content() delivers it."""
+    view = memoryview(body)
+    for offset in range(0, len(body), chunk_size):
+        yield bytes(view[offset:offset + chunk_size])
+
+
+def measure(func: Callable[[], Any], trace_memory: bool = True) -> Tuple[Any, float, float]:
+    """
+    Run func once untraced for wall time, then once under tracemalloc.
+
+    Returns:
+        (result, seconds, peak traced MB or NaN when trace_memory is False)
+    """
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+
+    peak_mb = float('nan')
+    if trace_memory:
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_mb = peak / (1024 * 1024)
+
+    return result, elapsed, peak_mb
+
+
+def main():
+    """Run the benchmark for each requested body size."""
+    parser = argparse.ArgumentParser(
+        description='Benchmark the Prometheus exposition parsers used by the ingestion script'
+    )
+    parser.add_argument(
+        '--lines',
+        nargs='+',
+        type=int,
+        default=[10_000, 100_000, 1_000_000],
+        help='Synthetic scrape sizes in sample lines'
+    )
+    parser.add_argument(
+        '--skip-memory',
+        action='store_true',
+        help='Only measure wall time (tracemalloc is slow on large bodies)'
+    )
+    args = parser.parse_args()
+
+    ingestion = load_ingestion_module()
+    chunk_size = ingestion.SCRAPE_CHUNK_SIZE
+
+    print(f"{'lines':>10} {'parser':>10} {'seconds':>10} {'peak MB':>10} {'series':>10}")
+    print("-" * 56)
+
+    for target_lines in args.lines:
+        text = generate_scrape(target_lines)
+        body = text.encode('utf-8')
+
+        runs = {
+            'legacy': lambda: legacy_parse_prometheus_metrics(text),
+            'streaming': lambda: ingestion.parse_prometheus_stream(iter_chunks(body, chunk_size)),
+        }
+        for label, func in runs.items():
+            result, seconds, peak_mb = measure(func, trace_memory=not args.skip_memory)
+            series = sum(len(samples) for samples in result.values())
+            print(f"{target_lines:>10} {label:>10} {seconds:>10.3f} {peak_mb:>10.1f} {series:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,76 +7,510 @@ reducing toil from manual monitoring tasks.
 Use Case: Scheduled health checks (every 5 minutes) to monitor API availability
 Toil Reduction: Eliminates manual health check tasks
 
+All configured endpoints are probed concurrently over one keep-alive
+connection pool that is kept across warm invocations, so a fleet-wide check
+costs one invocation and no new TCP/TLS handshakes once the function is warm.
+
+With PROBE_MODE=synthetic (or "all", or {"mode": ...} in the invocation
+payload) the function also runs scripted checkout journeys - list products,
+create an order, process the payment, poll the order status - on the same
+session, several journeys at once, and reports per-step latencies.
+
 Deployment:
     fn deploy --app <app-name> --local
 """
 
 import io
 import json
+import time
+import threading
 import requests
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
 from fdk import response
 
+DEFAULT_HEALTH_ENDPOINT = "http://localhost:3000/api/health"
+DEFAULT_TIMEOUT = 5
+DEFAULT_CONNECT_TIMEOUT = 2
+
+# Requests must finish this long before the deadline that bounds them
+DEADLINE_MARGIN = 0.5
+
+# Connections kept per host and endpoints probed at once
+HTTP_POOL_SIZE = 10
+MAX_CONCURRENT_PROBES = 10
+
+# Synthetic checkout journeys, run on their own pool so they never hold up the probes
+DEFAULT_JOURNEYS = 3
+MAX_CONCURRENT_JOURNEYS = 4
+DEFAULT_SYNTHETIC_DEADLINE = 15
+DEFAULT_PAYMENT_METHOD = "synthetic"
+JOURNEY_STEPS = ("list_products", "create_order", "process_payment", "poll_order")
+ORDER_POLL_ATTEMPTS = 5
+ORDER_POLL_INTERVAL = 0.5
+
+# Overall verdicts from best to worst
+VERDICTS = ("healthy", "degraded", "unhealthy")
+
+# Created on first use and reused while the function container stays warm
+_session: Optional[requests.Session] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_journey_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Keep-alive session with a connection pool, shared by warm invocations."""
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Thread pool running the probes, shared by warm invocations."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_PROBES, thread_name_prefix="probe")
+        return _executor
+
+
+def get_journey_executor() -> ThreadPoolExecutor:
+    """Thread pool running synthetic journeys, separate from the probes'."""
+    global _journey_executor
+    with _lock:
+        if _journey_executor is None:
+            _journey_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_JOURNEYS, thread_name_prefix="journey")
+        return _journey_executor
+
+
+def request_timeout(timeout: float, budget: Optional[float] = None) -> Tuple[float, float]:
+    """
+    (connect, read) timeout for one request, fitting both in budget seconds.
+    
+    A worker stuck on a hung server is only freed by these timeouts - a
+    future cannot be cancelled once running - so requests bounded by a
+    deadline must time out before it, or they pile up in the shared pool.
+    """
+    connect = min(DEFAULT_CONNECT_TIMEOUT, timeout)
+    if budget is not None:
+        connect = min(connect, budget / 2)
+        timeout = min(timeout, budget - connect)
+    return connect, timeout
+
+
+def load_endpoints(config: Dict[str, str]) -> List[Dict[str, Any]]:
+    """
+    Read the endpoints to probe from the function configuration.
+    
+    HEALTH_ENDPOINTS is either a comma-separated list of URLs or a JSON list
+    of objects such as
+    {"name": "worker", "url": "http://worker:3001/health", "timeout": 2, "critical": false}.
+    Without it, the single HEALTH_ENDPOINT is probed.
+    
+    Args:
+        config: Function configuration
+    
+    Returns:
+        List of endpoints with name, url, timeout and critical keys
+    """
+    timeout = float(config.get("HEALTH_TIMEOUT", DEFAULT_TIMEOUT))
+    raw = config.get("HEALTH_ENDPOINTS", "").strip()
+    
+    if raw.startswith("["):
+        entries = json.loads(raw)
+    elif raw:
+        entries = [{"url": url.strip()} for url in raw.split(",") if url.strip()]
+    else:
+        entries = [{"url": config.get("HEALTH_ENDPOINT", DEFAULT_HEALTH_ENDPOINT)}]
+    
+    return [
+        {
+            "name": entry.get("name", entry["url"]),
+            "url": entry["url"],
+            "timeout": float(entry.get("timeout", timeout)),
+            "critical": bool(entry.get("critical", True))
+        }
+        for entry in entries
+    ]
+
+
+def probe_endpoint(session: requests.Session, endpoint: Dict[str, Any], budget: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Probe one health endpoint.
+    
+    Args:
+        session: HTTP session to send the request on
+        endpoint: Endpoint from load_endpoints()
+        budget: Seconds the connect and read timeouts must fit in
+    
+    Returns:
+        Result of the probe with status, status_code, response_time_ms and health_data
+    """
+    status_code = None
+    start = time.perf_counter()
+    try:
+        api_response = session.get(endpoint["url"], timeout=request_timeout(endpoint["timeout"], budget))
+        response_time_ms = (time.perf_counter() - start) * 1000
+        status_code = api_response.status_code
+        
+        is_healthy = api_response.status_code == 200
+        health_data = api_response.json() if api_response.headers.get('content-type', '').startswith('application/json') else {}
+        
+    except requests.exceptions.Timeout:
+        is_healthy = False
+        response_time_ms = (time.perf_counter() - start) * 1000
+        health_data = {"error": "Request timeout"}
+    except requests.exceptions.ConnectionError:
+        is_healthy = False
+        response_time_ms = (time.perf_counter() - start) * 1000
+        health_data = {"error": "Connection error"}
+    except Exception as e:
+        is_healthy = False
+        response_time_ms = (time.perf_counter() - start) * 1000
+        health_data = {"error": str(e)}
+    
+    return {
+        "name": endpoint["name"],
+        "status": "healthy" if is_healthy else "unhealthy",
+        "endpoint": endpoint["url"],
+        "critical": endpoint["critical"],
+        "status_code": status_code,
+        "response_time_ms": round(response_time_ms, 2),
+        "health_data": health_data
+    }
+
+
+def probe_endpoints(endpoints: List[Dict[str, Any]], deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Probe all endpoints concurrently on the shared session.
+    
+    Each request is bounded by its endpoint's timeout, and the whole fan-out
+    by deadline seconds (default: the largest timeout plus the connect
+    timeout and one second). Timeouts are shortened to end before the
+    deadline, so no probe holds a worker much past it. Endpoints still
+    pending at the deadline are reported as timed out.
+    
+    Args:
+        endpoints: Endpoints from load_endpoints()
+        deadline: Overall time budget in seconds
+    
+    Returns:
+        One result per endpoint, in the order given
+    """
+    if deadline is None:
+        deadline = max(endpoint["timeout"] for endpoint in endpoints) + DEFAULT_CONNECT_TIMEOUT + 1
+    budget = max(deadline - DEADLINE_MARGIN, DEADLINE_MARGIN)
+    session = get_session()
+    executor = get_executor()
+    futures = [executor.submit(probe_endpoint, session, endpoint, budget) for endpoint in endpoints]
+    wait(futures, timeout=deadline)
+    
+    results = []
+    for endpoint, future in zip(endpoints, futures):
+        if future.done():
+            results.append(future.result())
+        else:
+            # Still queued or running; its timeouts end it shortly after
+            results.append({
+                "name": endpoint["name"],
+                "status": "unhealthy",
+                "endpoint": endpoint["url"],
+                "critical": endpoint["critical"],
+                "status_code": None,
+                "response_time_ms": round(deadline * 1000, 2),
+                "health_data": {"error": "Deadline exceeded"}
+            })
+    return results
+
+
+def aggregate_verdict(results: List[Dict[str, Any]]) -> str:
+    """
+    Overall status of a set of probe results.
+    
+    Returns:
+        "healthy" if every endpoint is healthy, "unhealthy" if a critical one
+        is not, otherwise "degraded"
+    """
+    unhealthy = [result for result in results if result["status"] != "healthy"]
+    if not unhealthy:
+        return "healthy"
+    if any(result["critical"] for result in unhealthy):
+        return "unhealthy"
+    return "degraded"
+
+
+class StepFailed(Exception):
+    """Raised when a journey step fails, ending that journey."""
+
+
+def timed_request(session: requests.Session, method: str, url: str, timeout: Tuple[float, float], **kwargs) -> Tuple[requests.Response, float]:
+    """
+    Send one request and time it, body included, with a nanosecond clock.
+    
+    Returns:
+        (response, latency in milliseconds)
+    """
+    start = time.perf_counter_ns()
+    api_response = session.request(method, url, timeout=timeout, **kwargs)
+    api_response.content
+    return api_response, (time.perf_counter_ns() - start) / 1e6
+
+
+def run_journey(session: requests.Session, base_url: str, journey: int, settings: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run one checkout journey against the BharatMart API.
+    
+    Steps run in order, each depending on the previous one: GET /api/products,
+    POST /api/orders, POST /api/payments, then GET /api/orders/<id> until the
+    order leaves "pending" (or the payment is known to have failed). A
+    declined payment is a valid outcome; only HTTP errors fail a step.
+    Each request's timeouts are shortened to end before the journeys'
+    deadline, and no step starts after it.
+    
+    Args:
+        session: HTTP session to send the requests on
+        base_url: API origin, e.g. http://localhost:3000
+        journey: Journey number, used to spread journeys over the products
+        settings: timeout, deadline_at (time.monotonic()), user_id and payment_method
+    
+    Returns:
+        Journey result with status, order and payment outcome, and one entry
+        per step with its status code and latency
+    """
+    timeout = settings["timeout"]
+    steps: List[Dict[str, Any]] = []
+    result: Dict[str, Any] = {"journey": journey, "status": "healthy", "steps": steps}
+    
+    def step(name: str, method: str, path: str, expected: int, **kwargs) -> Dict[str, Any]:
+        budget = settings["deadline_at"] - time.monotonic() - DEADLINE_MARGIN
+        if budget <= 0:
+            raise StepFailed(f"{name}: deadline exceeded")
+        entry: Dict[str, Any] = {"step": name}
+        steps.append(entry)
+        try:
+            api_response, latency_ms = timed_request(
+                session, method, base_url + path, request_timeout(timeout, budget), **kwargs
+            )
+        except requests.exceptions.RequestException as e:
+            entry.update(ok=False, error=type(e).__name__)
+            raise StepFailed(f"{name}: {type(e).__name__}")
+        entry.update(status_code=api_response.status_code, latency_ms=round(latency_ms, 3))
+        entry["ok"] = api_response.status_code == expected
+        if not entry["ok"]:
+            raise StepFailed(f"{name}: HTTP {api_response.status_code}")
+        try:
+            return api_response.json()
+        except ValueError:
+            entry["ok"] = False
+            raise StepFailed(f"{name}: invalid JSON")
+    
+    start = time.perf_counter_ns()
+    try:
+        products = step("list_products", "GET", "/api/products", 200, params={"limit": 10}).get("data") or []
+        if not products:
+            raise StepFailed("list_products: no products")
+        product = products[journey % len(products)]
+        
+        order = step("create_order", "POST", "/api/orders", 201, json={
+            "user_id": settings["user_id"],
+            "items": [{"product_id": product["id"], "quantity": 1, "unit_price": product.get("price", 0)}],
+            "shipping_address": f"synthetic probe {journey}"
+        })
+        result["order_id"] = order["id"]
+        
+        payment = step("process_payment", "POST", "/api/payments", 201, json={
+            "order_id": order["id"],
+            "amount": order.get("total_amount") or product.get("price", 0),
+            "payment_method": settings["payment_method"]
+        })
+        result["payment_status"] = payment.get("status")
+        
+        # Poll as one step: its latency is the time until the order settles
+        poll_start = time.perf_counter_ns()
+        polls = 0
+        status = None
+        while polls < ORDER_POLL_ATTEMPTS:
+            polls += 1
+            status = step("poll_order", "GET", f"/api/orders/{order['id']}", 200).get("status")
+            if status != "pending" or payment.get("status") == "failed":
+                break
+            time.sleep(ORDER_POLL_INTERVAL)
+        # Keep one poll_order entry, timed over all polls
+        del steps[len(steps) - polls:len(steps) - 1]
+        steps[-1].update(latency_ms=round((time.perf_counter_ns() - poll_start) / 1e6, 3), polls=polls)
+        result["order_status"] = status
+    except StepFailed as e:
+        result.update(status="unhealthy", error=str(e))
+    except (KeyError, TypeError) as e:
+        result.update(status="unhealthy", error=f"unexpected response: {e}")
+    
+    result["total_ms"] = round((time.perf_counter_ns() - start) / 1e6, 3)
+    return result
+
+
+def start_journeys(config: Dict[str, str], count: int) -> Tuple[List[Future], Dict[str, Any]]:
+    """
+    Submit count checkout journeys to run concurrently on the shared session.
+    
+    At most MAX_CONCURRENT_JOURNEYS run at once; the rest queue on the
+    journey pool. All are bounded by SYNTHETIC_DEADLINE from now.
+    
+    Returns:
+        (one future per journey, the journey settings)
+    """
+    user_id = config.get("SYNTHETIC_USER_ID", "")
+    if not user_id:
+        raise ValueError("SYNTHETIC_USER_ID is required for synthetic journeys")
+    base_url = config.get("SYNTHETIC_BASE_URL", "")
+    if not base_url:
+        parts = urlsplit(config.get("HEALTH_ENDPOINT", DEFAULT_HEALTH_ENDPOINT))
+        base_url = f"{parts.scheme}://{parts.netloc}"
+    settings = {
+        "base_url": base_url.rstrip("/"),
+        "timeout": float(config.get("HEALTH_TIMEOUT", DEFAULT_TIMEOUT)),
+        "deadline_at": time.monotonic() + float(config.get("SYNTHETIC_DEADLINE", DEFAULT_SYNTHETIC_DEADLINE)),
+        "user_id": user_id,
+        "payment_method": config.get("SYNTHETIC_PAYMENT_METHOD", DEFAULT_PAYMENT_METHOD)
+    }
+    session = get_session()
+    executor = get_journey_executor()
+    futures = [
+        executor.submit(run_journey, session, settings["base_url"], journey, settings)
+        for journey in range(count)
+    ]
+    return futures, settings
+
+
+def collect_journeys(futures: List[Future], settings: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Journey results once all finish or the deadline passes; late ones count as failed."""
+    wait(futures, timeout=max(0.0, settings["deadline_at"] - time.monotonic()))
+    results = []
+    for journey, future in enumerate(futures):
+        if future.done():
+            results.append(future.result())
+        else:
+            # Drops journeys still queued; running ones stop at their next step
+            future.cancel()
+            results.append({"journey": journey, "status": "unhealthy", "error": "Deadline exceeded", "steps": []})
+    return results
+
+
+def summarize_steps(journeys: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Per-step success count and latency (median and max) across journeys."""
+    summary = {}
+    for name in JOURNEY_STEPS:
+        entries = [entry for journey in journeys for entry in journey["steps"] if entry["step"] == name]
+        latencies = sorted(entry["latency_ms"] for entry in entries if "latency_ms" in entry)
+        summary[name] = {
+            "runs": len(entries),
+            "ok": sum(1 for entry in entries if entry["ok"]),
+            "p50_ms": latencies[(len(latencies) - 1) // 2] if latencies else None,
+            "max_ms": latencies[-1] if latencies else None
+        }
+    return summary
+
+
+def journey_verdict(journeys: List[Dict[str, Any]]) -> str:
+    """healthy if every journey completed, unhealthy if none did, otherwise degraded."""
+    completed = sum(1 for journey in journeys if journey["status"] == "healthy")
+    if completed == len(journeys):
+        return "healthy"
+    return "unhealthy" if completed == 0 else "degraded"
+
+
+def read_mode(config: Dict[str, str], data: Optional[io.BytesIO]) -> str:
+    """Probe mode ("health", "synthetic" or "all") from the payload, else PROBE_MODE."""
+    mode = config.get("PROBE_MODE", "health")
+    if data is not None:
+        try:
+            payload = json.loads(data.getvalue() or b"{}")
+            if isinstance(payload, dict) and payload.get("mode"):
+                mode = payload["mode"]
+        except (ValueError, AttributeError):
+            pass
+    if mode not in ("health", "synthetic", "all"):
+        raise ValueError(f"Unknown probe mode: {mode}")
+    return mode
+
 
 def handler(ctx, data: io.BytesIO = None):
     """
     Handler function for OCI Function.
     
-    Performs health check on BharatMart API endpoint.
+    Performs health checks on the configured BharatMart endpoints and/or
+    synthetic checkout journeys.
     
     Args:
         ctx: Function context (contains configuration)
         data: Input data (if any)
     
     Returns:
-        JSON response with health check results
+        JSON response with health check and synthetic journey results
     """
     try:
         # Get configuration from environment or context
         config = dict(ctx.Config())
         
-        # Health check endpoint (configurable via environment variable)
-        health_endpoint = config.get("HEALTH_ENDPOINT", "http://localhost:3000/api/health")
-        timeout = int(config.get("HEALTH_TIMEOUT", "5"))
+        mode = read_mode(config, data)
         
-        # Perform health check
-        start_time = datetime.utcnow()
-        try:
-            api_response = requests.get(health_endpoint, timeout=timeout)
-            end_time = datetime.utcnow()
-            response_time_ms = (end_time - start_time).total_seconds() * 1000
-            
-            is_healthy = api_response.status_code == 200
-            health_data = api_response.json() if api_response.headers.get('content-type', '').startswith('application/json') else {}
-            
-        except requests.exceptions.Timeout:
-            is_healthy = False
-            response_time_ms = timeout * 1000
-            health_data = {"error": "Request timeout"}
-        except requests.exceptions.ConnectionError:
-            is_healthy = False
-            response_time_ms = 0
-            health_data = {"error": "Connection error"}
-        except Exception as e:
-            is_healthy = False
-            response_time_ms = 0
-            health_data = {"error": str(e)}
+        # Start synthetic journeys first, so they overlap the health checks
+        start = time.perf_counter()
+        journey_futures = None
+        if mode in ("synthetic", "all"):
+            journey_futures, settings = start_journeys(config, int(config.get("SYNTHETIC_JOURNEYS", DEFAULT_JOURNEYS)))
+        
+        result: Dict[str, Any] = {}
+        verdicts = []
+        
+        # Perform health checks
+        if mode in ("health", "all"):
+            endpoints = load_endpoints(config)
+            deadline = float(config["HEALTH_DEADLINE"]) if config.get("HEALTH_DEADLINE") else None
+            checks = probe_endpoints(endpoints, deadline)
+            verdicts.append(aggregate_verdict(checks))
+            result.update(
+                healthy=sum(1 for check in checks if check["status"] == "healthy"),
+                total=len(checks),
+                checks=checks
+            )
+        
+        if journey_futures is not None:
+            journeys = collect_journeys(journey_futures, settings)
+            verdicts.append(journey_verdict(journeys))
+            result["synthetic"] = {
+                "status": verdicts[-1],
+                "base_url": settings["base_url"],
+                "completed": sum(1 for journey in journeys if journey["status"] == "healthy"),
+                "total": len(journeys),
+                "steps": summarize_steps(journeys),
+                "journeys": journeys
+            }
+        
+        verdict = max(verdicts, key=VERDICTS.index)
         
         # Prepare result
         result = {
-            "status": "healthy" if is_healthy else "unhealthy",
-            "endpoint": health_endpoint,
-            "status_code": api_response.status_code if 'api_response' in locals() else None,
-            "response_time_ms": round(response_time_ms, 2),
-            "timestamp": datetime.utcnow().isoformat(),
-            "health_data": health_data
+            "status": verdict,
+            "mode": mode,
+            **result,
+            "response_time_ms": round((time.perf_counter() - start) * 1000, 2),
+            "timestamp": datetime.utcnow().isoformat()
         }
         
         # Log result
         print(json.dumps(result))
         
         # Return appropriate status code
-        status_code = 200 if is_healthy else 503
+        status_code = 503 if verdict == "unhealthy" else 200
         
         return response.Response(
             ctx,
@@ -84,7 +518,7 @@ def handler(ctx, data: io.BytesIO = None):
             headers={"Content-Type": "application/json"},
             status_code=status_code
         )
-        
+    
     except Exception as e:
         error_result = {
             "status": "error",
@@ -99,4 +533,3 @@ def handler(ctx, data: io.BytesIO = None):
             headers={"Content-Type": "application/json"},
             status_code=500
         )
-
@@ -0,0 +1,220 @@
+"""
+Vectorized Time-Series Analytics over OCI Monitoring Query Results
+
+Query results are converted once into contiguous NumPy arrays - int64 epoch
+seconds and float64 values - and every function below works on whole
+arrays, so comparing hundreds of instances over a day of one-minute data
+takes milliseconds instead of loops over SDK Datapoint objects.
+
+Example:
+    series = from_streams(QueryCache().read(...))
+    grid, keys, matrix = align(series, step=60)
+    p95_per_instance = percentiles(matrix, 95)
+    fleet_p95 = percentiles(matrix.T, 95)
+
+Requirements:
+- numpy
+"""
+
+import numpy as np
+from datetime import datetime
+from typing import Any, Dict, Hashable, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+
+class Series(NamedTuple):
+    """One metric stream: sorted int64 epoch seconds and float64 values."""
+    timestamps: np.ndarray
+    values: np.ndarray
+
+
+def to_series(points: Sequence[Tuple[Union[datetime, float], float]]) -> Series:
+    """Convert (timestamp, value) pairs, timestamps as datetimes or epoch seconds."""
+    count = len(points)
+    if count and isinstance(points[0][0], datetime):
+        timestamps = np.fromiter((point[0].timestamp() for point in points), dtype=np.float64, count=count)
+    else:
+        timestamps = np.fromiter((point[0] for point in points), dtype=np.float64, count=count)
+    values = np.fromiter((point[1] for point in points), dtype=np.float64, count=count)
+    
+    order = np.argsort(timestamps, kind='stable')
+    return Series(timestamps[order].astype(np.int64), values[order])
+
+
+def from_streams(streams: Dict[Hashable, Sequence[Tuple[float, float]]]) -> Dict[Hashable, Series]:
+    """Convert QueryCache results ({dimensions: [(epoch, value), ...]}) to Series."""
+    return {key: to_series(points) for key, points in streams.items()}
+
+
+def from_metric_data(data: Iterable[Any]) -> Dict[Tuple[Tuple[str, str], ...], Series]:
+    """Convert summarize_metrics_data results (MetricData objects) to Series keyed by dimensions."""
+    return {
+        tuple(sorted((metric.dimensions or {}).items())): to_series(
+            [(point.timestamp, point.value) for point in metric.aggregated_datapoints or []]
+        )
+        for metric in data
+    }
+
+
+def rate(series: Series, counter: bool = False) -> Series:
+    """
+    Per-second rate of change between consecutive datapoints.
+    
+    With counter=True a decrease is treated as a reset, so the increase
+    over that interval is the new value itself (as Prometheus rate() does).
+    """
+    if len(series.timestamps) < 2:
+        return Series(series.timestamps[:0], series.values[:0])
+    
+    deltas = np.diff(series.values)
+    if counter:
+        deltas = np.where(deltas < 0, series.values[1:], deltas)
+    seconds = np.diff(series.timestamps).astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return Series(series.timestamps[1:], np.where(seconds > 0, deltas / seconds, np.nan))
+
+
+def moving_average(series: Series, window_seconds: int) -> Series:
+    """
+    Trailing mean over the last window_seconds at every datapoint.
+    
+    The window is in time, not points, so gaps shrink it instead of
+    stretching it; NaN values are ignored.
+    """
+    valid = ~np.isnan(series.values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(valid, series.values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(valid)))
+    
+    end = np.arange(1, len(series.timestamps) + 1)
+    start = np.searchsorted(series.timestamps, series.timestamps - window_seconds, side='right')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = (sums[end] - sums[start]) / (counts[end] - counts[start])
+    return Series(series.timestamps, means)
+
+
+def percentiles(values: np.ndarray, q: Union[float, Sequence[float]], axis: int = -1) -> np.ndarray:
+    """
+    NaN-ignoring percentiles along an axis (linear interpolation).
+    
+    On an aligned matrix (series x time), axis=-1 gives one percentile per
+    series and percentiles(matrix.T, q) one per timestamp across the fleet.
+    np.nanpercentile falls back to a per-row loop once any NaN is present;
+    here NaNs sort to the end and each row interpolates within its own
+    count of valid values, so gappy matrices stay vectorized.
+    """
+    ordered = np.sort(np.moveaxis(np.asarray(values, dtype=np.float64), axis, -1), axis=-1)
+    counts = np.count_nonzero(~np.isnan(ordered), axis=-1)
+    fractions = np.asarray(q, dtype=np.float64) / 100
+    if ordered.shape[-1] == 0:
+        # Nothing to index into (e.g. an empty query result)
+        return np.full(fractions.shape + counts.shape, np.nan)
+    
+    # One leading axis per requested percentile
+    positions = fractions.reshape(fractions.shape + (1,) * counts.ndim) * np.maximum(counts - 1, 0)
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, np.maximum(counts - 1, 0))
+    weight = positions - lower
+    
+    ordered = ordered.reshape((1,) * fractions.ndim + ordered.shape)
+    low = np.take_along_axis(ordered, lower[..., np.newaxis], axis=-1)[..., 0]
+    high = np.take_along_axis(ordered, upper[..., np.newaxis], axis=-1)[..., 0]
+    return np.where(counts > 0, low + (high - low) * weight, np.nan)
+
+
+def find_gaps(series: Series, step: int, tolerance: float = 1.5) -> np.ndarray:
+    """
+    Missing stretches in a series expected every step seconds.
+    
+    Returns:
+        int64 array of shape (gaps, 2): last timestamp before and first
+        timestamp after each gap longer than tolerance * step
+    """
+    gaps = np.flatnonzero(np.diff(series.timestamps) > step * tolerance)
+    return np.column_stack((series.timestamps[gaps], series.timestamps[gaps + 1]))
+
+
+def _reduce_buckets(flat: np.ndarray, values: np.ndarray, size: int, how: str) -> np.ndarray:
+    """Reduce values into size buckets by flat index ('mean', 'sum', 'max', 'min' or 'last')."""
+    result = np.full(size, np.nan)
+    valid = ~np.isnan(values)
+    if not valid.all():
+        flat, values = flat[valid], values[valid]
+    
+    if how in ('mean', 'sum'):
+        totals = np.bincount(flat, weights=values, minlength=size)
+        counts = np.bincount(flat, minlength=size)
+        filled = counts > 0
+        result[filled] = totals[filled] / counts[filled] if how == 'mean' else totals[filled]
+    elif how in ('max', 'min'):
+        reducer = np.fmax if how == 'max' else np.fmin
+        reducer.at(result, flat, values)
+    elif how == 'last':
+        # flat is non-decreasing, so the last entry of each run is the latest value
+        order = np.argsort(flat, kind='stable')
+        flat, values = flat[order], values[order]
+        last = np.flatnonzero(np.append(flat[1:] != flat[:-1], True))
+        result[flat[last]] = values[last]
+    else:
+        raise ValueError(f"unknown aggregation {how!r}")
+    return result
+
+
+def resample(
+    series: Series,
+    step: int,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    how: str = 'mean'
+) -> Series:
+    """
+    Put a series onto a regular grid of step seconds over [start, end).
+    
+    Datapoints are bucketed by floor((t - start) / step) and reduced with
+    how; empty buckets are NaN. start and end default to the series' span.
+    """
+    grid, _, matrix = align({None: series}, step, start, end, how)
+    return Series(grid, matrix[0])
+
+
+def align(
+    series: Dict[Hashable, Series],
+    step: int,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    how: str = 'mean'
+) -> Tuple[np.ndarray, List[Hashable], np.ndarray]:
+    """
+    Resample many series onto one common grid in a single vectorized pass.
+    
+    Args:
+        series: Series by key (e.g. dimensions)
+        step: Grid spacing in seconds
+        start: Grid start (default: earliest timestamp, floored to step)
+        end: Grid end, exclusive (default: just past the latest timestamp)
+        how: Bucket reduction - 'mean', 'sum', 'max', 'min' or 'last'
+    
+    Returns:
+        (grid timestamps, series keys in row order, float64 matrix of
+        shape (len(keys), len(grid)) with NaN where a bucket is empty)
+    """
+    keys = list(series)
+    non_empty = [s.timestamps for s in series.values() if len(s.timestamps)]
+    if start is None:
+        start = min(int(t[0]) for t in non_empty) // step * step if non_empty else 0
+    if end is None:
+        end = max(int(t[-1]) for t in non_empty) + 1 if non_empty else start
+    grid = np.arange(start, end, step, dtype=np.int64)
+    
+    lengths = np.array([len(series[key].timestamps) for key in keys], dtype=np.int64)
+    if not len(keys) or not lengths.sum():
+        return grid, keys, np.full((len(keys), len(grid)), np.nan)
+    
+    timestamps = np.concatenate([series[key].timestamps for key in keys])
+    values = np.concatenate([series[key].values for key in keys])
+    rows = np.repeat(np.arange(len(keys)), lengths)
+    
+    inside = (timestamps >= start) & (timestamps < end)
+    if not inside.all():
+        timestamps, values, rows = timestamps[inside], values[inside], rows[inside]
+    flat = rows * len(grid) + (timestamps - start) // step
+    matrix = _reduce_buckets(flat, values, len(keys) * len(grid), how)
+    return grid, keys, matrix.reshape(len(keys), len(grid))
@@ -0,0 +1,311 @@
+"""
+Local Downsampling Rollup Store for OCI Monitoring Metrics
+
+Keeps min/max/sum/count rollups of metric series at 1m, 5m, 1h and 1d
+resolution on local disk, so long-range views read a few hundred buckets
+instead of tens of thousands of one-minute datapoints. Used by
+sre-dashboard.py and query-metrics.py in this directory.
+
+Each (series, resolution) is one columnar .npy file memory-mapped as a
+fixed-size ring: bucket t lives in slot (t // step) % capacity, and a
+timestamp column tells whether the slot still holds that bucket. Buckets
+are filled by query-side backfill - missing ones are fetched from OCI
+Monitoring at the bucket's own interval, so OCI does the downsampling.
+Completed buckets are never fetched again; the trailing buckets that may
+still receive datapoints are re-read on every query.
+
+QueryCache does the same for arbitrary MQL queries (percentiles, per-
+resource streams, ...) that rollups cannot answer: results are cached per
+aligned time chunk, and complete chunks are persisted as immutable files.
+
+Requirements:
+- numpy
+
+Environment Variables:
+    DASHBOARD_ROLLUP_DIR  - Store location (default: ~/.oci/sre-rollups)
+    DASHBOARD_QUERY_CACHE_DIR - Query cache location (default: ~/.oci/sre-query-cache)
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+import numpy as np
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROLLUP_DIR = os.getenv('DASHBOARD_ROLLUP_DIR', '~/.oci/sre-rollups')
+QUERY_CACHE_DIR = os.getenv('DASHBOARD_QUERY_CACHE_DIR', '~/.oci/sre-query-cache')
+
+# Query cache chunks span this many datapoints of the query resolution (1 day of 1m)
+QUERY_CHUNK_POINTS = 1440
+
+# Resolution name -> bucket seconds, finest first (names are valid MQL intervals)
+RESOLUTIONS = [("1m", 60), ("5m", 300), ("1h", 3600), ("1d", 86400)]
+RESOLUTION_SECONDS = dict(RESOLUTIONS)
+
+# Buckets kept per resolution: 7 days of 1m, 30 days of 5m, ~13 months of 1h, 5 years of 1d
+CAPACITY = {"1m": 7 * 1440, "5m": 30 * 288, "1h": 400 * 24, "1d": 5 * 365}
+
+# Buckets ending less than this many seconds ago may still receive datapoints.
+# OCI accepts datapoints up to 2 hours old, and the ingestion spool replays
+# batches that late after an outage, so recent buckets are re-read until then.
+ROLLUP_SETTLE = 2 * 3600
+
+# Column layout of every rollup file
+TS, MASK, MIN, MAX, SUM, COUNT = range(6)
+STATISTICS = {"min": MIN, "max": MAX, "sum": SUM, "count": COUNT}
+STAT_BITS = {"min": 1, "max": 2, "sum": 4, "count": 8}
+
+# fetch(statistic, interval, start_time, end_time) -> [(timestamp, value), ...]
+Fetch = Callable[[str, str, datetime, datetime], List[Tuple[datetime, float]]]
+
+# Metric streams: dimensions (sorted (name, value) pairs) -> [(epoch seconds, value), ...]
+Streams = Dict[Tuple[Tuple[str, str], ...], List[Tuple[float, float]]]
+
+
+def parse_duration(text: str) -> int:
+    """Seconds in a duration such as '5m', '6h' or '30d'."""
+    units = {"m": 60, "h": 3600, "d": 86400}
+    if len(text) < 2 or text[-1] not in units or not text[:-1].isdigit():
+        raise ValueError(f"invalid duration {text!r} (expected e.g. 5m, 1h, 30d)")
+    return int(text[:-1]) * units[text[-1]]
+
+
+def pick_resolution(step_seconds: int) -> Tuple[str, int]:
+    """Coarsest stored resolution whose buckets are no wider than the requested step."""
+    chosen = RESOLUTIONS[0]
+    for name, seconds in RESOLUTIONS:
+        if seconds <= step_seconds:
+            chosen = (name, seconds)
+    return chosen
+
+
+def series_key(namespace: str, metric_name: str, dimensions: Optional[Dict[str, str]] = None) -> str:
+    """Stable identifier of a series: namespace, metric and dimension filters."""
+    identity = json.dumps([namespace, metric_name, sorted((dimensions or {}).items())])
+    return hashlib.sha1(identity.encode('utf-8')).hexdigest()[:16]
+
+
+class RollupStore:
+    """
+    Memory-mapped min/max/sum/count rollups per series and resolution.
+    
+    Thread-safe within a process; files are opened once and kept mapped.
+    """
+    
+    def __init__(self, directory: Optional[str] = ROLLUP_DIR, settle: float = ROLLUP_SETTLE):
+        self.directory = os.path.expanduser(directory) if directory else None
+        self.settle = settle
+        self.lock = threading.Lock()
+        self.file_locks: Dict[str, threading.Lock] = {}
+        self.tables: Dict[str, np.ndarray] = {}
+    
+    def table(self, namespace: str, metric_name: str, dimensions: Optional[Dict[str, str]], resolution: str) -> Tuple[str, np.ndarray]:
+        """Open (creating if needed) the rollup file of one series at one resolution."""
+        key = series_key(namespace, metric_name, dimensions)
+        path = os.path.join(self.directory, key, f"{resolution}.npy") if self.directory else f"{key}/{resolution}"
+        
+        with self.lock:
+            if path in self.tables:
+                return path, self.tables[path]
+            self.file_locks[path] = threading.Lock()
+            
+            if not self.directory:
+                table = np.full((6, CAPACITY[resolution]), np.nan)
+            elif os.path.exists(path):
+                table = np.lib.format.open_memmap(path, mode='r+')
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(os.path.join(os.path.dirname(path), 'series.json'), 'w', encoding='utf-8') as f:
+                    json.dump({"namespace": namespace, "metric": metric_name, "dimensions": dimensions or {}}, f)
+                table = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=(6, CAPACITY[resolution]))
+                table[:] = np.nan
+            self.tables[path] = table
+            return path, table
+    
+    def read(
+        self,
+        namespace: str,
+        metric_name: str,
+        dimensions: Optional[Dict[str, str]],
+        resolution: str,
+        start_time: datetime,
+        end_time: datetime,
+        statistics: Tuple[str, ...],
+        fetch: Fetch,
+        now: Optional[float] = None
+    ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Rollup buckets overlapping [start_time, end_time), backfilling gaps.
+        
+        Args:
+            namespace: Metric namespace
+            metric_name: Metric name
+            dimensions: Dimension filters identifying the series
+            resolution: One of RESOLUTIONS (e.g. '1h')
+            start_time: Window start
+            end_time: Window end
+            statistics: Columns wanted, from 'min', 'max', 'sum', 'count'
+            fetch: Called once per statistic for the span of missing buckets
+            now: Current epoch seconds (default: time.time())
+        
+        Returns:
+            (bucket start times in epoch seconds, {statistic: values}); buckets
+            without data are NaN in every column, so a real zero sum or count
+            stays distinguishable from a gap
+        """
+        step = RESOLUTION_SECONDS[resolution]
+        capacity = CAPACITY[resolution]
+        first = int(start_time.timestamp()) // step * step
+        last = (int(end_time.timestamp()) - 1) // step * step
+        expected = np.arange(first, last + step, step, dtype=np.float64)
+        if len(expected) > capacity:
+            raise ValueError(
+                f"{len(expected)} buckets of {resolution} exceed the {capacity} kept; use a coarser step"
+            )
+        
+        path, table = self.table(namespace, metric_name, dimensions, resolution)
+        slots = (expected // step).astype(np.int64) % capacity
+        is_open = expected + step > (time.time() if now is None else now) - self.settle
+        
+        with self.file_locks[path]:
+            # Slots still holding an older bucket of the ring start over
+            stale = table[TS, slots] != expected
+            if stale.any():
+                reset = slots[stale]
+                table[:, reset] = np.nan
+                table[TS, reset] = expected[stale]
+                table[MASK, reset] = 0
+            
+            for statistic in statistics:
+                bit = STAT_BITS[statistic]
+                filled = (np.nan_to_num(table[MASK, slots]).astype(np.int64) & bit) != 0
+                missing = np.flatnonzero(~filled | is_open)
+                if not len(missing):
+                    continue
+                
+                span_start, span_end = expected[missing[0]], expected[missing[-1]] + step
+                values = np.full(len(expected), np.nan)
+                for timestamp, value in fetch(
+                    statistic,
+                    resolution,
+                    datetime.fromtimestamp(span_start, timezone.utc),
+                    datetime.fromtimestamp(span_end, timezone.utc)
+                ):
+                    index = (int(timestamp.timestamp()) - first) // step
+                    if 0 <= index < len(expected):
+                        values[index] = value
+                
+                targets = slots[missing]
+                table[STATISTICS[statistic], targets] = values[missing]
+                table[MASK, targets] = (np.nan_to_num(table[MASK, targets]).astype(np.int64) | bit).astype(np.float64)
+            
+            if isinstance(table, np.memmap):
+                table.flush()
+            columns = {statistic: np.array(table[STATISTICS[statistic], slots]) for statistic in statistics}
+        
+        return expected, columns
+
+
+class QueryCache:
+    """
+    Read-through cache of summarize_metrics_data results for any MQL query.
+    
+    Time is cut into chunks of QUERY_CHUNK_POINTS datapoints aligned to the
+    epoch, so overlapping windows from different runs land on the same
+    chunks. A chunk that ended more than settle seconds ago is complete: it
+    is fetched once, written to disk and never fetched again. Each read
+    issues at most one request, spanning the chunks it is missing plus the
+    part of the open chunk inside the window.
+    """
+    
+    def __init__(self, directory: Optional[str] = QUERY_CACHE_DIR, settle: float = ROLLUP_SETTLE):
+        self.directory = os.path.expanduser(directory) if directory else None
+        self.settle = settle
+    
+    def chunk_path(self, namespace: str, query: str, resolution: str, chunk_start: int) -> Optional[str]:
+        """File holding one complete chunk (None when caching is disabled)."""
+        if not self.directory:
+            return None
+        key = hashlib.sha1(json.dumps([namespace, query, resolution]).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.directory, key, f"{chunk_start}.json")
+    
+    def read(
+        self,
+        namespace: str,
+        query: str,
+        resolution: str,
+        start_time: datetime,
+        end_time: datetime,
+        fetch: Callable[[datetime, datetime], List[Tuple[Dict[str, str], List[Tuple[datetime, float]]]]],
+        now: Optional[float] = None
+    ) -> Streams:
+        """
+        Datapoints of a query over [start_time, end_time), per metric stream.
+        
+        Args:
+            namespace: Metric namespace
+            query: MQL query text
+            resolution: Query resolution (e.g. '1m')
+            start_time: Window start
+            end_time: Window end
+            fetch: fetch(start, end) -> [(dimensions, [(timestamp, value), ...]), ...]
+            now: Current epoch seconds (default: time.time())
+        
+        Returns:
+            {dimensions: [(epoch seconds, value), ...]} with points in time order
+        """
+        chunk = parse_duration(resolution) * QUERY_CHUNK_POINTS
+        start, end = start_time.timestamp(), end_time.timestamp()
+        chunk_starts = range(int(start) // chunk * chunk, int(end - 1) // chunk * chunk + chunk, chunk)
+        settled_until = (time.time() if now is None else now) - self.settle
+        
+        cached: Dict[int, List[Dict[str, Any]]] = {}
+        for chunk_start in chunk_starts:
+            path = self.chunk_path(namespace, query, resolution, chunk_start)
+            if chunk_start + chunk <= settled_until and path and os.path.exists(path):
+                try:
+                    with open(path, encoding='utf-8') as f:
+                        cached[chunk_start] = json.load(f)
+                except (OSError, ValueError):
+                    pass
+        
+        missing = [chunk_start for chunk_start in chunk_starts if chunk_start not in cached]
+        if missing:
+            # Complete chunks are fetched whole so they can be stored; open ones only as far as asked
+            span_start, span_end = missing[0], missing[-1] + chunk
+            if span_start + chunk > settled_until:
+                span_start = max(span_start, start)
+            if span_end > settled_until:
+                span_end = min(span_end, end)
+            fetched: Dict[int, Dict[Tuple, Dict[str, Any]]] = {chunk_start: {} for chunk_start in missing}
+            for dimensions, points in fetch(
+                datetime.fromtimestamp(span_start, timezone.utc),
+                datetime.fromtimestamp(span_end, timezone.utc)
+            ):
+                key = tuple(sorted(dimensions.items()))
+                for timestamp, value in points:
+                    epoch = timestamp.timestamp()
+                    chunk_start = int(epoch) // chunk * chunk
+                    if chunk_start in fetched:
+                        stream = fetched[chunk_start].setdefault(key, {"dimensions": dimensions, "points": []})
+                        stream["points"].append([epoch, value])
+            
+            for chunk_start in missing:
+                cached[chunk_start] = list(fetched[chunk_start].values())
+                path = self.chunk_path(namespace, query, resolution, chunk_start)
+                if path and chunk_start + chunk <= settled_until:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                    with open(tmp_path, 'w', encoding='utf-8') as f:
+                        json.dump(cached[chunk_start], f, separators=(',', ':'))
+                    os.replace(tmp_path, path)
+        
+        streams: Streams = {}
+        for chunk_start in chunk_starts:
+            for stream in cached[chunk_start]:
+                points = streams.setdefault(tuple(sorted(stream["dimensions"].items())), [])
+                points.extend((epoch, value) for epoch, value in stream["points"] if start <= epoch < end)
+        return streams
@@ -2,31 +2,105 @@
 """
 Query OCI Monitoring Metrics via REST API
 
-Example script to query metrics from OCI Monitoring.
+Example script to query metrics from OCI Monitoring. Datapoints are read
+through the local rollup store (metric_rollups.py), which keeps min/max/
+sum/count rollups at 1m, 5m, 1h and 1d; the coarsest resolution that fits
+--step is used, so a 30-day view at 1h steps reads 720 buckets.
+
+Any other MQL query can be passed with --query. Its results are cached per
+aligned time chunk, so repeated and overlapping queries only fetch the
+trailing, still-open part of the window.
+
+With --batch, every query in a file runs concurrently over one client and
+the datapoints are streamed out as JSON Lines (or Parquet / Arrow IPC with
+pyarrow installed) as each query completes.
 
 Usage:
     python3 scripts/oci-rest-api-dashboard/query-metrics.py
+    python3 scripts/oci-rest-api-dashboard/query-metrics.py --range 30d --step 1h --statistic max
+    python3 scripts/oci-rest-api-dashboard/query-metrics.py --query 'CpuUtilization[5m].percentile(0.9)' --step 5m
+    python3 scripts/oci-rest-api-dashboard/query-metrics.py --batch queries.txt --range 1d --output out.jsonl
 
 Environment Variables:
     OCI_COMPARTMENT_ID    - OCI Compartment OCID (required)
     OCI_INSTANCE_ID       - Optional: Instance OCID
     METRIC_NAMESPACE      - Namespace (default: oci_computeagent)
     METRIC_NAME           - Metric name (default: CpuUtilization)
+    DASHBOARD_ROLLUP_DIR  - Local rollup store (default: ~/.oci/sre-rollups)
+    DASHBOARD_QUERY_CACHE_DIR - Local --query cache (default: ~/.oci/sre-query-cache)
 """
 
 import os
 import sys
 import oci
-from datetime import datetime, timedelta
+import json
+import math
+import argparse
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, TextIO
+
+from metric_analytics import Series, align, find_gaps, from_streams, percentiles
+from metric_rollups import QueryCache, RollupStore, parse_duration, pick_resolution
 
 COMPARTMENT_OCID = os.getenv('OCI_COMPARTMENT_ID', '')
 INSTANCE_OCID = os.getenv('OCI_INSTANCE_ID', '')
 NAMESPACE = os.getenv('METRIC_NAMESPACE', 'oci_computeagent')
 METRIC_NAME = os.getenv('METRIC_NAME', 'CpuUtilization')
 
+# Concurrent queries in --batch mode
+BATCH_WORKERS = 8
+
+# Rollup columns each displayed statistic is derived from
+STATISTIC_COLUMNS = {
+    'mean': ('sum', 'count'),
+    'min': ('min',),
+    'max': ('max',),
+    'sum': ('sum',),
+    'count': ('count',),
+}
+
+
+def aligned_range(time_range: str):
+    """Window of the given length ending at the current minute (UTC)."""
+    end_time = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    return end_time - timedelta(seconds=parse_duration(time_range)), end_time
+
+
+def print_recent(series: Series) -> None:
+    """Print the last ten datapoints of a series."""
+    print("\nRecent Values:")
+    for timestamp, value in zip(series.timestamps[-10:].tolist(), series.values[-10:].tolist()):
+        stamp = datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        print(f"  {stamp}: {value}")
+
+
+def print_summary(series: Series, step_seconds: int) -> None:
+    """Print percentiles and gaps of a series."""
+    p50, p95, p99 = percentiles(series.values, [50, 95, 99])
+    gaps = find_gaps(series, step_seconds)
+    print(f"p50: {p50:.4g}  p95: {p95:.4g}  p99: {p99:.4g}  max: {np.nanmax(series.values):.4g}")
+    if len(gaps):
+        missing = int(((gaps[:, 1] - gaps[:, 0]) // step_seconds - 1).sum())
+        print(f"Gaps: {len(gaps)} ({missing} missing datapoints)")
+
 
-def query_metrics(namespace: str, metric_name: str, compartment_id: str, resource_id: str = None):
-    """Query metrics from OCI Monitoring."""
+def query_metrics(
+    namespace: str,
+    metric_name: str,
+    compartment_id: str,
+    resource_id: str = None,
+    time_range: str = '1h',
+    step: str = '1m',
+    statistic: str = 'mean'
+):
+    """
+    Query metrics from OCI Monitoring.
+    
+    Returns:
+        Series of the buckets that have data (int64 epoch seconds, float64 values)
+    """
     
     # Load OCI config
     config = oci.config.from_file()
@@ -34,62 +108,319 @@ def query_metrics(namespace: str, metric_name: str, compartment_id: str, resourc
     # Create Monitoring client
     monitoring = oci.monitoring.MonitoringClient(config)
     
-    # Calculate time range (last 1 hour)
-    end_time = datetime.now()
-    start_time = end_time - timedelta(hours=1)
+    # Calculate time range, ending at the current minute
+    start_time, end_time = aligned_range(time_range)
+    resolution, resolution_seconds = pick_resolution(parse_duration(step))
     
     # Build query
-    query = f"{namespace}.{metric_name}"
-    if resource_id:
-        query += f"{{resourceId=\"{resource_id}\"}}"
+    dimensions = {'resourceId': resource_id} if resource_id else None
+    query_filter = f'{{resourceId = "{resource_id}"}}' if resource_id else ''
     
-    print(f"Query: {query}")
+    print(f"Query: {metric_name}[{resolution}]{query_filter}.{statistic}()")
     print(f"Time Range: {start_time.isoformat()} to {end_time.isoformat()}")
     print("-" * 60)
     
+    def fetch(column, interval, fetch_start, fetch_end):
+        response = monitoring.summarize_metrics_data(
+            compartment_id=compartment_id,
+            summarize_metrics_data_details=oci.monitoring.models.SummarizeMetricsDataDetails(
+                namespace=namespace,
+                query=f"{metric_name}[{interval}]{query_filter}.grouping().{column}()",
+                start_time=fetch_start,
+                end_time=fetch_end,
+                resolution=interval
+            )
+        )
+        if not response.data:
+            return []
+        return [(dp.timestamp, dp.value) for dp in response.data[0].aggregated_datapoints or []]
+    
     try:
         # Query metrics
+        timestamps, columns = RollupStore().read(
+            namespace, metric_name, dimensions, resolution,
+            start_time, end_time, STATISTIC_COLUMNS[statistic], fetch
+        )
+        
+        if statistic == 'mean':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                values = np.where(columns['count'] > 0, columns['sum'] / columns['count'], np.nan)
+        else:
+            values = columns[statistic]
+        present = ~np.isnan(values)
+        series = Series(timestamps[present].astype(np.int64), values[present])
+        
+        # Process results
+        print(f"\nMetric: {metric_name}")
+        print(f"Namespace: {namespace}")
+        if len(series.values):
+            print(f"Data Points: {len(series.values)} of {len(values)} {resolution} buckets")
+            print_summary(series, resolution_seconds)
+            print_recent(series)
+        else:
+            print("No data points available")
+        
+        return series
+    
+    except oci.exceptions.ServiceError as e:
+        print(f"Error querying metrics: {e.message}")
+        raise
+
+
+def mql_fetcher(monitoring: oci.monitoring.MonitoringClient, compartment_id: str, namespace: str, query: str, resolution: str):
+    """QueryCache fetch callback running one MQL query, keeping every returned stream."""
+    def fetch(fetch_start, fetch_end):
         response = monitoring.summarize_metrics_data(
             compartment_id=compartment_id,
             summarize_metrics_data_details=oci.monitoring.models.SummarizeMetricsDataDetails(
                 namespace=namespace,
                 query=query,
-                start_time=start_time.isoformat(),
-                end_time=end_time.isoformat(),
-                resolution="1m"
+                start_time=fetch_start,
+                end_time=fetch_end,
+                resolution=resolution
             )
         )
+        return [
+            (metric.dimensions or {}, [(dp.timestamp, dp.value) for dp in metric.aggregated_datapoints or []])
+            for metric in response.data or []
+        ]
+    return fetch
+
+
+def query_mql(namespace: str, query: str, compartment_id: str, time_range: str = '1h', step: str = '1m'):
+    """
+    Run an arbitrary MQL query through the local query cache.
+    
+    Returns:
+        {dimensions: Series} for every returned metric stream
+    """
+    
+    # Load OCI config
+    config = oci.config.from_file()
+    
+    # Create Monitoring client
+    monitoring = oci.monitoring.MonitoringClient(config)
+    
+    start_time, end_time = aligned_range(time_range)
+    
+    print(f"Query: {query}")
+    print(f"Time Range: {start_time.isoformat()} to {end_time.isoformat()}")
+    print("-" * 60)
+    
+    try:
+        streams = from_streams(QueryCache().read(
+            namespace, query, step, start_time, end_time,
+            mql_fetcher(monitoring, compartment_id, namespace, query, step)
+        ))
+        step_seconds = parse_duration(step)
         
         # Process results
-        if response.data:
-            for metric in response.data:
-                print(f"\nMetric: {metric.name}")
-                print(f"Namespace: {metric.namespace}")
-                if metric.datapoints:
-                    print(f"Data Points: {len(metric.datapoints)}")
-                    print("\nRecent Values:")
-                    for dp in metric.datapoints[-10:]:  # Last 10 points
-                        timestamp = dp.timestamp.strftime("%Y-%m-%d %H:%M:%S")
-                        value = dp.value
-                        print(f"  {timestamp}: {value}")
-                else:
-                    print("No data points available")
-        else:
+        if not streams:
             print("No metrics returned")
-            
-        return response.data
+        for dimensions, series in streams.items():
+            print(f"\nStream: {', '.join(f'{k}={v}' for k, v in dimensions) or '(all)'}")
+            print(f"Data Points: {len(series.values)}")
+            if len(series.values):
+                print_summary(series, step_seconds)
+                print_recent(series)
+        
+        if len(streams) > 1:
+            # Compare streams on a common grid: who sits above the fleet's p95 most often
+            _, keys, matrix = align(streams, step_seconds, int(start_time.timestamp()), int(end_time.timestamp()))
+            fleet_p95 = percentiles(matrix.T, 95)
+            above = np.sum(matrix > fleet_p95, axis=1)
+            print(f"\nAcross {len(keys)} streams, most often above the fleet p95:")
+            for row in np.argsort(-above)[:5]:
+                print(f"  {', '.join(f'{k}={v}' for k, v in keys[row]) or '(all)'}: {int(above[row])} of {matrix.shape[1]} steps")
         
+        return streams
+    
     except oci.exceptions.ServiceError as e:
         print(f"Error querying metrics: {e.message}")
         raise
 
 
+def load_batch(path: str, namespace: str, resolution: str) -> List[Dict[str, str]]:
+    """
+    Read a batch file: one MQL query per line, or a JSON object per line.
+    
+    JSON lines may set "query" and optionally "namespace", "resolution"
+    and "name" (defaults: the METRIC_NAMESPACE, --step and the query text).
+    Blank lines and lines starting with # are skipped.
+    """
+    queries = []
+    with open(os.path.expanduser(path), encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            entry = json.loads(line) if line.startswith('{') else {"query": line}
+            if "query" not in entry:
+                raise ValueError(f"{path}:{line_number}: missing \"query\"")
+            entry.setdefault("namespace", namespace)
+            entry.setdefault("resolution", resolution)
+            entry.setdefault("name", entry["query"])
+            queries.append(entry)
+    return queries
+
+
+class JsonLinesWriter:
+    """Writes one JSON object per datapoint."""
+    
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+    
+    def write(self, entry: Dict[str, str], dimensions: Dict[str, str], points: List) -> None:
+        """Append the datapoints of one stream."""
+        # The fields shared by every row of the stream are encoded once
+        prefix = json.dumps({"name": entry["name"], "namespace": entry["namespace"], "dimensions": dimensions})[:-1]
+        self.stream.writelines(
+            f'{prefix}, "timestamp": "{datetime.fromtimestamp(timestamp, timezone.utc).isoformat()}", '
+            f'"value": {json.dumps(value) if math.isfinite(value) else "null"}}}\n'
+            for timestamp, value in points
+        )
+    
+    def close(self) -> None:
+        if self.stream is sys.stdout:
+            self.stream.flush()
+        else:
+            self.stream.close()
+
+
+class ArrowWriter:
+    """Writes each stream as one record batch to a Parquet or Arrow IPC file."""
+    
+    def __init__(self, path: str, file_format: str):
+        try:
+            import pyarrow
+            import pyarrow.ipc
+            import pyarrow.parquet
+        except ImportError:
+            print(f"Error: --format {file_format} needs pyarrow (pip install pyarrow)", file=sys.stderr)
+            sys.exit(1)
+        
+        self.pa = pyarrow
+        self.schema = pyarrow.schema([
+            ("name", pyarrow.string()),
+            ("namespace", pyarrow.string()),
+            ("dimensions", pyarrow.string()),
+            ("timestamp", pyarrow.timestamp("s", tz="UTC")),
+            ("value", pyarrow.float64()),
+        ])
+        if file_format == "parquet":
+            self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        else:
+            self.writer = pyarrow.ipc.new_file(path, self.schema)
+    
+    def write(self, entry: Dict[str, str], dimensions: Dict[str, str], points: List) -> None:
+        """Append the datapoints of one stream."""
+        rows = len(points)
+        timestamps, values = zip(*points) if points else ((), ())
+        batch = self.pa.record_batch([
+            self.pa.array([entry["name"]] * rows, self.pa.string()),
+            self.pa.array([entry["namespace"]] * rows, self.pa.string()),
+            self.pa.array([json.dumps(dimensions, sort_keys=True)] * rows, self.pa.string()),
+            self.pa.array(np.asarray(timestamps, dtype=np.int64), self.pa.timestamp("s", tz="UTC")),
+            self.pa.array(values, self.pa.float64()),
+        ], schema=self.schema)
+        if hasattr(self.writer, "write_batch"):
+            self.writer.write_batch(batch)
+        else:
+            self.writer.write_table(self.pa.Table.from_batches([batch]))
+    
+    def close(self) -> None:
+        self.writer.close()
+
+
+def run_batch(
+    queries: List[Dict[str, str]],
+    compartment_id: str,
+    time_range: str,
+    writer: Any,
+    max_workers: int = BATCH_WORKERS
+) -> int:
+    """
+    Run every query concurrently over one client, writing results as they complete.
+    
+    At most 2 * max_workers results are held at once, whatever the size of
+    the batch. Returns the number of queries that failed. The writer is
+    closed however the batch ends.
+    """
+    try:
+        start_time, end_time = aligned_range(time_range)
+        monitoring = oci.monitoring.MonitoringClient(oci.config.from_file())
+        cache = QueryCache()
+        
+        def run(entry):
+            fetch = mql_fetcher(monitoring, compartment_id, entry["namespace"], entry["query"], entry["resolution"])
+            return cache.read(entry["namespace"], entry["query"], entry["resolution"], start_time, end_time, fetch)
+        
+        failed = 0
+        pending = iter(queries)
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="query") as executor:
+            in_flight = {}
+            for entry in pending:
+                in_flight[executor.submit(run, entry)] = entry
+                if len(in_flight) >= max_workers * 2:
+                    break
+            
+            while in_flight:
+                future = next(as_completed(in_flight))
+                entry = in_flight.pop(future)
+                try:
+                    for dimension_pairs, points in future.result().items():
+                        writer.write(entry, dict(dimension_pairs), points)
+                except Exception as e:
+                    failed += 1
+                    print(f"Error in query {entry['name']!r}: {e}", file=sys.stderr)
+                
+                next_entry = next(pending, None)
+                if next_entry is not None:
+                    in_flight[executor.submit(run, next_entry)] = next_entry
+    finally:
+        writer.close()
+    return failed
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Query OCI Monitoring metrics through the local rollup store')
+    parser.add_argument('--range', dest='time_range', default='1h', help='How far back to query (e.g. 1h, 7d, 30d)')
+    parser.add_argument('--step', default='1m', help='Spacing of returned points (e.g. 1m, 5m, 1h, 1d)')
+    parser.add_argument('--statistic', choices=sorted(STATISTIC_COLUMNS), default='mean', help='Aggregate per step')
+    parser.add_argument('--query', help='Run this MQL query instead (cached per time chunk; --step is its resolution)')
+    parser.add_argument('--batch', help='File of MQL queries (one per line, or JSON objects) to run concurrently')
+    parser.add_argument('--format', choices=['jsonl', 'parquet', 'arrow'], default='jsonl', help='--batch output format')
+    parser.add_argument('--output', help='--batch output file (default: stdout, jsonl only)')
+    parser.add_argument('--workers', type=int, default=BATCH_WORKERS, help='Concurrent --batch queries')
+    args = parser.parse_args()
+    
     if not COMPARTMENT_OCID:
         print("Error: OCI_COMPARTMENT_ID environment variable is required", file=sys.stderr)
         sys.exit(1)
     
-    print("=== OCI Metrics Query ===")
-    print("")
-    query_metrics(NAMESPACE, METRIC_NAME, COMPARTMENT_OCID, INSTANCE_OCID)
-
+    if args.batch and args.format != 'jsonl' and not args.output:
+        parser.error(f"--format {args.format} needs --output")
+    
+    try:
+        if args.batch:
+            # Read the batch file before opening the output, so a bad file leaves no partial output behind
+            queries = load_batch(args.batch, NAMESPACE, args.step)
+            if args.format == 'jsonl':
+                output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+                writer = JsonLinesWriter(output)
+            else:
+                writer = ArrowWriter(args.output, args.format)
+            failed = run_batch(queries, COMPARTMENT_OCID, args.time_range, writer, args.workers)
+            print(f"{len(queries) - failed}/{len(queries)} queries written", file=sys.stderr)
+            sys.exit(1 if failed else 0)
+        
+        print("=== OCI Metrics Query ===")
+        print("")
+        if args.query:
+            query_mql(NAMESPACE, args.query, COMPARTMENT_OCID, args.time_range, args.step)
+        else:
+            query_metrics(NAMESPACE, METRIC_NAME, COMPARTMENT_OCID, INSTANCE_OCID, args.time_range, args.step, args.statistic)
+    except ValueError as e:
+        # Bad --range/--step or batch file, or more buckets than the rollup store keeps
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -7,25 +7,169 @@ to display key metrics, alarm status, and service health.
 
 Usage:
     python3 scripts/oci-rest-api-dashboard/sre-dashboard.py
+    python3 scripts/oci-rest-api-dashboard/sre-dashboard.py --watch --interval 30
 
 Environment Variables:
     OCI_COMPARTMENT_ID    - OCI Compartment OCID (required)
     OCI_INSTANCE_ID       - Optional: Instance OCID for specific metrics
     OCI_CONFIG_FILE       - OCI config file path (default: ~/.oci/config)
+    DASHBOARD_QUERY_DEADLINE - Seconds to wait for API calls (default: 10)
+    DASHBOARD_CACHE_FILE  - Inventory cache shared between runs
+                            (default: ~/.oci/sre-dashboard-cache.json, "" disables)
+    DASHBOARD_INVENTORY_TTL - Seconds before cached inventory is refreshed (default: 300)
+    DASHBOARD_ALARM_STATUS_TTL - Seconds before cached alarm status is refreshed (default: 60)
+    DASHBOARD_ROLLUP_DIR  - Local rollup store for long SLO windows (default: ~/.oci/sre-rollups)
+    DASHBOARD_SLO_CONFIG  - SLO definitions (default: slo-config.json next to this script)
+    DASHBOARD_INSTANCE_STATES - Comma-separated instance lifecycle states to list
+                            (default: RUNNING,STOPPED,STARTING,STOPPING,PROVISIONING)
 """
 
 import os
 import sys
 import oci
 import json
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List
+import time
+import argparse
+import threading
+import numpy as np
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed, wait
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, Callable, List, Tuple
+
+from metric_rollups import RESOLUTIONS, RollupStore, parse_duration
 
 # Configuration from environment variables
 COMPARTMENT_OCID = os.getenv('OCI_COMPARTMENT_ID', '')
 INSTANCE_OCID = os.getenv('OCI_INSTANCE_ID', '')
 OCI_CONFIG_FILE = os.getenv('OCI_CONFIG_FILE', '~/.oci/config')
 
+# Concurrent API calls per render and seconds to wait for all of them
+MAX_CONCURRENT_QUERIES = 8
+QUERY_DEADLINE = float(os.getenv('DASHBOARD_QUERY_DEADLINE', '10'))
+
+# Inventory (instance and alarm lists) cache shared between runs
+INVENTORY_CACHE_FILE = os.getenv('DASHBOARD_CACHE_FILE', '~/.oci/sre-dashboard-cache.json')
+INVENTORY_TTL = float(os.getenv('DASHBOARD_INVENTORY_TTL', '300'))
+ALARM_STATUS_TTL = float(os.getenv('DASHBOARD_ALARM_STATUS_TTL', '60'))
+INVENTORY_PAGE_SIZE = 1000
+INSTANCE_STATES = [
+    state.strip()
+    for state in os.getenv('DASHBOARD_INSTANCE_STATES', 'RUNNING,STOPPED,STARTING,STOPPING,PROVISIONING').split(',')
+    if state.strip()
+]
+
+# SLO targets, burn-rate alert windows and the counters they are computed from
+SLO_CONFIG_FILE = os.getenv(
+    'DASHBOARD_SLO_CONFIG',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'slo-config.json')
+)
+
+# Fewest rollup buckets an SLO window is split into
+MIN_ROLLUP_BUCKETS = 6
+
+# Watch mode: refresh period and how many minutes of datapoints each panel keeps
+DEFAULT_WATCH_INTERVAL = 30
+WATCH_WINDOW_MINUTES = 15
+
+# Metric panels: key -> (namespace, metric name, statistic, per instance).
+# Per-instance metrics are read for every instance at once, grouped by resourceId.
+METRIC_QUERIES = {
+    "cpu": ("oci_computeagent", "CpuUtilization", "mean", True),
+    "memory": ("oci_computeagent", "MemoryUtilization", "mean", True),
+    "latency": ("custom.bharatmart", "api_latency_seconds", "mean", False),
+    "request_rate": ("custom.bharatmart", "http_requests_total_rate", "sum", False),
+}
+
+
+def aligned_window(minutes_back: int, now: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """Time window ending at the current minute boundary (UTC)."""
+    end_time = (now or datetime.now(timezone.utc)).replace(second=0, microsecond=0)
+    return end_time - timedelta(minutes=minutes_back), end_time
+
+
+def build_metric_query(
+    metric_name: str,
+    resource_id: Optional[str] = None,
+    statistic: str = "mean",
+    interval: str = "1m",
+    dimensions: Optional[Dict[str, str]] = None,
+    group_by: Optional[str] = None
+) -> str:
+    """
+    Build an MQL query for one metric.
+    
+    Without a resource filter all streams of the metric are aggregated into
+    one with grouping(), so the result is fleet-wide rather than whichever
+    stream happens to come back first; with group_by they are aggregated
+    into one stream per value of that dimension (e.g. "resourceId").
+    Dimension values containing * are matched as wildcards
+    (e.g. {"status_code": "5*"}).
+    """
+    filters = [f'{name} {"=~" if "*" in value else "="} "{value}"' for name, value in (dimensions or {}).items()]
+    if resource_id:
+        filters.append(f'resourceId = "{resource_id}"')
+    
+    query = f"{metric_name}[{interval}]"
+    if filters:
+        query += "{" + ", ".join(filters) + "}"
+    if group_by:
+        query += f".groupBy({group_by})"
+    elif not resource_id:
+        query += ".grouping()"
+    return f"{query}.{statistic}()"
+
+
+def fetch_metric_streams(
+    monitoring_client: oci.monitoring.MonitoringClient,
+    namespace: str,
+    query: str,
+    compartment_id: str,
+    start_time: datetime,
+    end_time: datetime,
+    resolution: str = "1m",
+    group_by: Optional[str] = None
+) -> Dict[Optional[str], List[Tuple[datetime, float]]]:
+    """
+    Fetch the (timestamp, value) points of the streams of one MQL query over a window.
+    
+    Streams are keyed by their group_by dimension value; without group_by
+    only the first stream is returned, under None. resolution should match
+    the query interval so buckets do not overlap.
+    """
+    data = monitoring_client.summarize_metrics_data(
+        compartment_id=compartment_id,
+        summarize_metrics_data_details=oci.monitoring.models.SummarizeMetricsDataDetails(
+            namespace=namespace,
+            query=query,
+            start_time=start_time,
+            end_time=end_time,
+            resolution=resolution
+        )
+    ).data
+    if not group_by:
+        data = data[:1]
+    return {
+        (metric.dimensions or {}).get(group_by) if group_by else None:
+            [(point.timestamp, float(point.value)) for point in metric.aggregated_datapoints or []]
+        for metric in data
+    }
+
+
+def fetch_metric_points(
+    monitoring_client: oci.monitoring.MonitoringClient,
+    namespace: str,
+    query: str,
+    compartment_id: str,
+    start_time: datetime,
+    end_time: datetime,
+    resolution: str = "1m"
+) -> List[Tuple[datetime, float]]:
+    """Fetch the (timestamp, value) points of a single-stream MQL query over a window."""
+    return fetch_metric_streams(
+        monitoring_client, namespace, query, compartment_id, start_time, end_time, resolution
+    ).get(None, [])
+
 
 def get_latest_metric_value(
     monitoring_client: oci.monitoring.MonitoringClient,
@@ -33,7 +177,8 @@ def get_latest_metric_value(
     metric_name: str,
     compartment_id: str,
     resource_id: Optional[str] = None,
-    minutes_back: int = 5
+    minutes_back: int = 5,
+    statistic: str = "mean"
 ) -> Optional[float]:
     """
     Get latest metric value from OCI Monitoring.
@@ -45,243 +190,941 @@ def get_latest_metric_value(
         compartment_id: Compartment OCID
         resource_id: Optional resource OCID to filter
         minutes_back: Minutes to look back for data
+        statistic: MQL statistic aggregating each minute (e.g. 'mean', 'sum')
         
     Returns:
         Latest metric value or None if not available
     """
     try:
-        end_time = datetime.now()
-        start_time = end_time - timedelta(minutes=minutes_back)
-        
-        query = f"{namespace}.{metric_name}"
-        if resource_id:
-            query += f"{{resourceId=\"{resource_id}\"}}"
-        
-        response = monitoring_client.summarize_metrics_data(
-            compartment_id=compartment_id,
-            summarize_metrics_data_details=oci.monitoring.models.SummarizeMetricsDataDetails(
-                namespace=namespace,
-                query=query,
-                start_time=start_time.isoformat(),
-                end_time=end_time.isoformat(),
-                resolution="1m"
-            )
-        )
-        
-        if response.data and response.data[0].datapoints:
-            return float(response.data[0].datapoints[-1].value)
+        start_time, end_time = aligned_window(minutes_back)
+        query = build_metric_query(metric_name, resource_id, statistic)
+        points = fetch_metric_points(monitoring_client, namespace, query, compartment_id, start_time, end_time)
+        return points[-1][1] if points else None
+    except Exception as e:
+        print(f"  Error querying {metric_name}: {e}", file=sys.stderr)
         return None
+
+
+def get_latest_values_by_resource(
+    monitoring_client: oci.monitoring.MonitoringClient,
+    namespace: str,
+    metric_name: str,
+    compartment_id: str,
+    minutes_back: int = 5,
+    statistic: str = "mean"
+) -> Dict[str, float]:
+    """
+    Latest value of a metric for every resource reporting it, in one query.
+    
+    The query is grouped by resourceId, so the infrastructure panel and the
+    per-instance figures of the service health panel share one call.
+    Returns an empty dict if the query fails.
+    """
+    try:
+        start_time, end_time = aligned_window(minutes_back)
+        query = build_metric_query(metric_name, statistic=statistic, group_by="resourceId")
+        streams = fetch_metric_streams(
+            monitoring_client, namespace, query, compartment_id, start_time, end_time, group_by="resourceId"
+        )
+        return {resource_id: points[-1][1] for resource_id, points in streams.items() if resource_id and points}
     except Exception as e:
         print(f"  Error querying {metric_name}: {e}", file=sys.stderr)
+        return {}
+
+
+def instance_value(values: Optional[Dict[str, float]], instance_id: Optional[str]) -> Optional[float]:
+    """One instance's value if instance_id is set, otherwise the mean across instances."""
+    if not values:
         return None
+    if instance_id:
+        return values.get(instance_id)
+    return sum(values.values()) / len(values)
+
+
+class MetricSeries:
+    """
+    Ring buffers of recent datapoints for one metric panel.
+    
+    The first refresh backfills the whole window; later refreshes only ask
+    for the minutes since the newest buffered point, so a watch tick costs
+    the same however long the window is. The newest minute is re-read on
+    each refresh because OCI may still be aggregating it. A query grouped
+    by a dimension keeps one buffer per value of it; a stream with no
+    datapoint inside the window is dropped.
+    """
+    
+    def __init__(
+        self,
+        namespace: str,
+        query: str,
+        window_minutes: int = WATCH_WINDOW_MINUTES,
+        group_by: Optional[str] = None
+    ):
+        self.namespace = namespace
+        self.query = query
+        self.group_by = group_by
+        self.window_minutes = window_minutes
+        self.window = timedelta(minutes=window_minutes)
+        self.streams: Dict[Optional[str], deque] = {}
+    
+    def refresh(
+        self,
+        monitoring_client: oci.monitoring.MonitoringClient,
+        compartment_id: str,
+        now: Optional[datetime] = None
+    ) -> Any:
+        """Fetch datapoints newer than the buffers and return the latest value(s)."""
+        _, end_time = aligned_window(0, now)
+        newest = max((points[-1][0] for points in self.streams.values()), default=None)
+        start_time = newest or end_time - self.window
+        
+        if start_time < end_time:
+            streams = fetch_metric_streams(
+                monitoring_client, self.namespace, self.query, compartment_id, start_time, end_time,
+                group_by=self.group_by
+            )
+            for key, fetched in streams.items():
+                points = self.streams.setdefault(key, deque(maxlen=self.window_minutes))
+                for timestamp, value in fetched:
+                    if points and timestamp <= points[-1][0]:
+                        if timestamp == points[-1][0]:
+                            points[-1] = (timestamp, value)
+                        continue
+                    points.append((timestamp, value))
+        
+        self.streams = {
+            key: points for key, points in self.streams.items() if points and points[-1][0] > end_time - self.window
+        }
+        return self.latest
+    
+    @property
+    def latest(self) -> Any:
+        """
+        Newest buffered value, or None before any data has arrived.
+        
+        Grouped series return {dimension value: newest value} instead.
+        """
+        if self.group_by:
+            return {key: points[-1][1] for key, points in self.streams.items()}
+        points = self.streams.get(None)
+        return points[-1][1] if points else None
+
+
+class InventoryCache:
+    """
+    Time-limited cache of list results, persisted between dashboard runs.
+    
+    A lookup younger than the TTL is served from the cache (or the cache
+    file, for a fresh process) without any API call. Older entries are
+    refreshed once, however many panels ask for them at the same time; if
+    the refresh fails the previous listing is served, marked stale, rather
+    than blanking the panel.
+    """
+    
+    VERSION = 1
+    
+    def __init__(self, path: Optional[str] = INVENTORY_CACHE_FILE, ttl: float = INVENTORY_TTL):
+        self.path = os.path.expanduser(path) if path else None
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.refreshing: Dict[str, Future] = {}
+        self.load()
+    
+    def load(self) -> None:
+        """Read the cache file; a missing or unreadable file starts empty."""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('version') == self.VERSION:
+                self.entries = state['entries']
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"  Ignoring unreadable inventory cache {self.path}: {e}", file=sys.stderr)
+    
+    def save(self) -> None:
+        """Atomically write the cache file."""
+        if not self.path:
+            return
+        with self.lock:
+            state = {'version': self.VERSION, 'entries': dict(self.entries)}
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"  Could not write inventory cache {self.path}: {e}", file=sys.stderr)
+    
+    def get(
+        self,
+        key: str,
+        fetch: Callable[[], List[Dict[str, Any]]],
+        ttl: Optional[float] = None
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Return (items, stale) for key, calling fetch() only when the entry expired.
+        
+        ttl overrides the cache-wide TTL for this key. Raises whatever fetch()
+        raised when there is no earlier listing to fall back to.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and time.time() - entry['fetched_at'] < ttl:
+                return entry['items'], False
+            future = self.refreshing.get(key)
+            owner = future is None
+            if owner:
+                future = self.refreshing[key] = Future()
+        
+        if owner:
+            try:
+                items = fetch()
+                with self.lock:
+                    self.entries[key] = {'fetched_at': time.time(), 'items': items}
+                self.save()
+                future.set_result(items)
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self.lock:
+                    self.refreshing.pop(key, None)
+        
+        try:
+            return future.result(), False
+        except Exception:
+            if entry:
+                return entry['items'], True
+            raise
+
+
+inventory_cache = InventoryCache()
+
+
+def list_inventory(
+    list_call: Callable[..., Any],
+    compartment_id: str,
+    filter_values: Optional[List[str]] = None,
+    filter_name: str = "lifecycle_state",
+    **kwargs
+) -> List[Any]:
+    """
+    List every resource of a compartment, following all pages.
+    
+    Page tokens make a single listing sequential, so with filter_values the
+    listing is split by value - filtered server-side - and the values are
+    paged through concurrently.
+    
+    Args:
+        list_call: SDK list operation (e.g. compute_client.list_instances)
+        compartment_id: Compartment OCID
+        filter_values: Optional values of filter_name to keep; None lists everything
+        filter_name: list_call argument to filter on (e.g. 'lifecycle_state', 'status')
+        **kwargs: Extra arguments for list_call
+        
+    Returns:
+        All resources across every page (and filter value)
+    """
+    def list_all(**filters):
+        return oci.pagination.list_call_get_all_results(
+            list_call,
+            compartment_id=compartment_id,
+            limit=INVENTORY_PAGE_SIZE,
+            **kwargs,
+            **filters
+        ).data
+    
+    if not filter_values:
+        return list_all()
+    if len(filter_values) == 1:
+        return list_all(**{filter_name: filter_values[0]})
+    
+    with ThreadPoolExecutor(max_workers=len(filter_values), thread_name_prefix="inventory") as executor:
+        pages = executor.map(lambda value: list_all(**{filter_name: value}), filter_values)
+        return [item for page in pages for item in page]
+
+
+def get_alarm_states(
+    monitoring_client: oci.monitoring.MonitoringClient,
+    compartment_id: str
+) -> Tuple[Dict[str, Dict[str, Any]], bool]:
+    """
+    Current status of every alarm in the compartment, keyed by alarm OCID.
+    
+    Uses the bulk ListAlarmsStatus listing - FIRING and OK paged through
+    concurrently - so the cost grows with status pages, not with alarms.
+    Results are cached for ALARM_STATUS_TTL seconds.
+    
+    Returns:
+        ({alarm OCID: {name, severity, status, triggered}}, stale)
+    """
+    statuses, stale = inventory_cache.get(
+        f"alarm-status:{compartment_id}",
+        lambda: [
+            {
+                "id": a.id,
+                "name": a.display_name,
+                "severity": a.severity,
+                "status": a.status,
+                "triggered": a.timestamp_triggered.isoformat() if a.timestamp_triggered else None
+            }
+            for a in list_inventory(monitoring_client.list_alarms_status, compartment_id, ["FIRING", "OK"], "status")
+        ],
+        ttl=ALARM_STATUS_TTL
+    )
+    return {a['id']: a for a in statuses}, stale
 
 
 def get_alarm_summary(
     monitoring_client: oci.monitoring.MonitoringClient,
     compartment_id: str
 ) -> Dict[str, Any]:
-    """Get summary of alarms in compartment."""
+    """Get summary of active alarms and their current state (all pages, cached)."""
     try:
-        response = monitoring_client.list_alarms(compartment_id=compartment_id)
-        if response.data:
-            enabled_count = sum(1 for a in response.data if a.is_enabled)
-            firing_count = sum(1 for a in response.data if getattr(a, 'severity', None) == 'CRITICAL')
-            return {
-                "total": len(response.data),
-                "enabled": enabled_count,
-                "disabled": len(response.data) - enabled_count,
-                "firing": firing_count
-            }
-        return {"total": 0, "enabled": 0, "disabled": 0, "firing": 0}
+        alarms, alarms_stale = inventory_cache.get(
+            f"alarms:{compartment_id}",
+            lambda: [
+                {"id": a.id, "name": a.display_name, "enabled": a.is_enabled, "severity": a.severity}
+                for a in list_inventory(monitoring_client.list_alarms, compartment_id, ["ACTIVE"])
+            ]
+        )
+        states, states_stale = get_alarm_states(monitoring_client, compartment_id)
+        
+        enabled_count = sum(1 for a in alarms if a['enabled'])
+        firing = sorted(
+            (a for a in states.values() if a['status'] == "FIRING"),
+            key=lambda a: (a['severity'] != "CRITICAL", a['name'])
+        )
+        ok_count = sum(1 for a in states.values() if a['status'] == "OK")
+        return {
+            "total": len(alarms),
+            "enabled": enabled_count,
+            "disabled": len(alarms) - enabled_count,
+            "firing": len(firing),
+            "firing_critical": sum(1 for a in firing if a['severity'] == "CRITICAL"),
+            "firing_alarms": firing,
+            "ok": ok_count,
+            "stale": alarms_stale or states_stale
+        }
     except Exception as e:
         return {"error": str(e)}
 
 
 def get_instance_status(
     compute_client: oci.core.ComputeClient,
-    compartment_id: str
+    compartment_id: str,
+    lifecycle_states: Optional[List[str]] = None
 ) -> Dict[str, Any]:
-    """Get compute instance status summary."""
+    """Get compute instance status summary (all pages, cached)."""
+    states = INSTANCE_STATES if lifecycle_states is None else lifecycle_states
     try:
-        response = compute_client.list_instances(compartment_id=compartment_id)
-        if response.data:
-            running = sum(1 for i in response.data if i.lifecycle_state == "RUNNING")
-            stopped = sum(1 for i in response.data if i.lifecycle_state == "STOPPED")
-            return {
-                "total": len(response.data),
-                "running": running,
-                "stopped": stopped,
-                "instances": [
-                    {
-                        "name": inst.display_name,
-                        "state": inst.lifecycle_state,
-                        "ocid": inst.id
-                    }
-                    for inst in response.data
-                ]
-            }
-        return {"total": 0, "running": 0, "stopped": 0, "instances": []}
+        instances, stale = inventory_cache.get(
+            f"instances:{compartment_id}:{','.join(states)}",
+            lambda: [
+                {"name": inst.display_name, "state": inst.lifecycle_state, "ocid": inst.id}
+                for inst in list_inventory(compute_client.list_instances, compartment_id, states)
+            ]
+        )
+        return {
+            "total": len(instances),
+            "running": sum(1 for i in instances if i['state'] == "RUNNING"),
+            "stopped": sum(1 for i in instances if i['state'] == "STOPPED"),
+            "instances": instances,
+            "stale": stale
+        }
     except Exception as e:
         return {"error": str(e)}
 
 
-def display_dashboard(
+rollup_store = RollupStore()
+
+
+def rollup_interval(window_seconds: int) -> Tuple[str, int]:
+    """
+    Coarsest MQL interval that splits a window into at least MIN_ROLLUP_BUCKETS buckets.
+    
+    A 30d window is read as 30 daily rollups and a 6h window as 6 hourly
+    ones, instead of tens of thousands of one-minute points.
+    """
+    for interval, seconds in reversed(RESOLUTIONS):
+        if window_seconds % seconds == 0 and window_seconds // seconds >= MIN_ROLLUP_BUCKETS:
+            return interval, seconds
+    return RESOLUTIONS[0]
+
+
+def load_slo_config(path: Optional[str] = SLO_CONFIG_FILE) -> Dict[str, Any]:
+    """
+    Load and validate SLO definitions from a JSON file.
+    
+    Every SLO names two of "good", "bad" and "total", each a counter
+    increase metric with optional dimension filters; see slo-config.json.
+    """
+    with open(os.path.expanduser(path), encoding='utf-8') as f:
+        config = json.load(f)
+    
+    config.setdefault("namespace", "custom.bharatmart")
+    config.setdefault("period", "30d")
+    config.setdefault("projection_window", "1h")
+    config.setdefault("alerts", [])
+    for slo in config.get("slos", []):
+        if not 0 < slo["target"] < 100:
+            raise ValueError(f"SLO {slo['name']!r}: target must be a percentage below 100")
+        if sum(1 for kind in ("good", "bad", "total") if kind in slo) != 2:
+            raise ValueError(f"SLO {slo['name']!r}: needs exactly two of good, bad and total")
+    
+    windows = {config["period"], config["projection_window"]}
+    for alert in config["alerts"]:
+        windows.update((alert["long_window"], alert["short_window"]))
+    config["windows"] = sorted(windows, key=parse_duration)
+    return config
+
+
+def window_sums(
     monitoring_client: oci.monitoring.MonitoringClient,
-    compute_client: oci.core.ComputeClient,
+    namespace: str,
     compartment_id: str,
-    instance_id: Optional[str] = None
-):
-    """Display SRE Dashboard with metrics and status."""
-    print("=" * 80)
-    print(" " * 25 + "SRE DASHBOARD - BharatMart")
-    print("=" * 80)
-    print(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"Compartment: {compartment_id[:50]}...")
-    print()
-    
-    # Infrastructure Metrics
-    print("-" * 80)
-    print("INFRASTRUCTURE METRICS")
-    print("-" * 80)
-    
-    cpu = get_latest_metric_value(
-        monitoring_client,
-        "oci_computeagent",
-        "CpuUtilization",
-        compartment_id,
-        instance_id
-    )
+    counter: Dict[str, Any],
+    windows: List[str],
+    end_time: datetime
+) -> Dict[str, float]:
+    """
+    Total of one counter increase metric over each window ending at end_time.
+    
+    Windows are grouped by rollup interval and each group is read from the
+    rollup store over its longest window; shorter windows sum a suffix of
+    it. Only buckets the store does not hold yet are fetched from OCI.
+    """
+    by_interval: Dict[str, List[Tuple[str, int]]] = {}
+    for window in windows:
+        seconds = parse_duration(window)
+        by_interval.setdefault(rollup_interval(seconds)[0], []).append((window, seconds))
+    
+    def fetch(statistic, interval, start_time, stop_time):
+        query = build_metric_query(counter["metric"], statistic=statistic, interval=interval, dimensions=counter.get("dimensions"))
+        return fetch_metric_points(monitoring_client, namespace, query, compartment_id, start_time, stop_time, resolution=interval)
+    
+    sums = {}
+    for interval, group in by_interval.items():
+        longest = max(seconds for _, seconds in group)
+        timestamps, columns = rollup_store.read(
+            namespace, counter["metric"], counter.get("dimensions"), interval,
+            end_time - timedelta(seconds=longest), end_time, ("sum",), fetch
+        )
+        for window, seconds in group:
+            since = end_time.timestamp() - seconds
+            sums[window] = float(np.nansum(columns["sum"][timestamps >= since]))
+    return sums
+
+
+def evaluate_slo(
+    monitoring_client: oci.monitoring.MonitoringClient,
+    compartment_id: str,
+    config: Dict[str, Any],
+    slo: Dict[str, Any],
+    end_time: datetime,
+    executor: ThreadPoolExecutor
+) -> Dict[str, Any]:
+    """
+    Error ratio, burn rate and remaining error budget of one SLO per window.
+    
+    A burn rate of 1 spends exactly the error budget over the SLO period;
+    an alert fires when both its long and short window burn at least its
+    burn_rate, so it reacts fast and resets fast.
+    """
+    windows = config["windows"]
+    counters = {
+        kind: executor.submit(window_sums, monitoring_client, config["namespace"], compartment_id, slo[kind], windows, end_time)
+        for kind in ("good", "bad", "total") if kind in slo
+    }
+    sums = {kind: future.result() for kind, future in counters.items()}
+    
+    budget = 1 - slo["target"] / 100
+    evaluation = {"name": slo["name"], "target": slo["target"], "period": config["period"], "burn": {}, "alerts": []}
+    for window in windows:
+        if "total" in sums:
+            total = sums["total"][window]
+            bad = sums["bad"][window] if "bad" in sums else total - sums["good"][window]
+        else:
+            bad = sums["bad"][window]
+            total = sums["good"][window] + bad
+        evaluation["burn"][window] = (max(bad, 0) / total) / budget if total > 0 else None
+    
+    period_burn = evaluation["burn"][config["period"]]
+    if period_burn is None:
+        evaluation["sli"] = evaluation["budget_remaining"] = evaluation["exhausted_in"] = None
+        return evaluation
+    
+    evaluation["sli"] = 100 * (1 - period_burn * budget)
+    evaluation["budget_remaining"] = 1 - period_burn
+    
+    # Time until the remaining budget is gone if the recent burn rate holds
+    recent_burn = evaluation["burn"][config["projection_window"]]
+    if evaluation["budget_remaining"] <= 0:
+        evaluation["exhausted_in"] = 0
+    elif recent_burn:
+        evaluation["exhausted_in"] = evaluation["budget_remaining"] * parse_duration(config["period"]) / recent_burn
+    else:
+        evaluation["exhausted_in"] = None
+    
+    for alert in config["alerts"]:
+        long_burn = evaluation["burn"][alert["long_window"]]
+        short_burn = evaluation["burn"][alert["short_window"]]
+        if long_burn is not None and short_burn is not None and min(long_burn, short_burn) >= alert["burn_rate"]:
+            evaluation["alerts"].append({**alert, "long_burn": long_burn, "short_burn": short_burn})
+    return evaluation
+
+
+def evaluate_slos(
+    monitoring_client: oci.monitoring.MonitoringClient,
+    compartment_id: str,
+    config: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Evaluate every configured SLO over windows ending at the current minute."""
+    if config is None:
+        return {"error": "no SLO config file found"}
+    try:
+        _, end_time = aligned_window(0)
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_QUERIES, thread_name_prefix="slo") as executor:
+            return {
+                "slos": [
+                    evaluate_slo(monitoring_client, compartment_id, config, slo, end_time, executor)
+                    for slo in config.get("slos", [])
+                ],
+                "windows": config["windows"]
+            }
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def format_duration(seconds: float) -> str:
+    """Compact human duration, e.g. '45m', '6.5h', '12.3d'."""
+    if seconds < 3600:
+        return f"{seconds / 60:.0f}m"
+    if seconds < 86400:
+        return f"{seconds / 3600:.1f}h"
+    return f"{seconds / 86400:.1f}d"
+
+
+def render_infrastructure(results: Dict[str, Any]) -> List[str]:
+    """Infrastructure panel: CPU and memory utilization of the instance, or the fleet mean."""
+    cpu = instance_value(results.get("cpu"), results.get("instance_id"))
     cpu_display = f"{cpu:.2f}%" if cpu is not None else "Not available"
     cpu_status = "⚠️ " if cpu and cpu > 80 else "✅" if cpu is not None else "❓"
-    print(f"{cpu_status} CPU Utilization: {cpu_display}")
-    
-    memory = get_latest_metric_value(
-        monitoring_client,
-        "oci_computeagent",
-        "MemoryUtilization",
-        compartment_id,
-        instance_id
-    )
+    
+    memory = instance_value(results.get("memory"), results.get("instance_id"))
     memory_display = f"{memory:.2f}%" if memory is not None else "Not available"
     memory_status = "⚠️ " if memory and memory > 85 else "✅" if memory is not None else "❓"
-    print(f"{memory_status} Memory Utilization: {memory_display}")
-    
-    # Application Metrics (BharatMart Custom Metrics)
-    print()
-    print("-" * 80)
-    print("APPLICATION METRICS (BharatMart)")
-    print("-" * 80)
-    
-    latency = get_latest_metric_value(
-        monitoring_client,
-        "custom.bharatmart",
-        "api_latency_seconds",
-        compartment_id
-    )
+    
+    return [
+        f"{cpu_status} CPU Utilization: {cpu_display}",
+        f"{memory_status} Memory Utilization: {memory_display}",
+    ]
+
+
+def render_application(results: Dict[str, Any]) -> List[str]:
+    """Application panel: BharatMart latency and request rate."""
+    lines = []
+    
+    latency = results.get("latency")
     if latency is not None:
         latency_ms = latency * 1000
         latency_status = "⚠️ " if latency_ms > 500 else "✅"
-        print(f"{latency_status} API Latency (avg): {latency_ms:.2f}ms ({latency:.3f}s)")
+        lines.append(f"{latency_status} API Latency (avg): {latency_ms:.2f}ms ({latency:.3f}s)")
     else:
-        print("❓ API Latency: Not available (custom metrics may not be ingested yet)")
+        lines.append("❓ API Latency: Not available (custom metrics may not be ingested yet)")
     
-    request_rate = get_latest_metric_value(
-        monitoring_client,
-        "custom.bharatmart",
-        "http_requests_total",
-        compartment_id
-    )
+    # Per-second rate derived from the counter by the ingestion script
+    request_rate = results.get("request_rate")
     if request_rate is not None:
-        print(f"✅ Request Rate: {request_rate:.0f} requests/min")
+        lines.append(f"✅ Request Rate: {request_rate * 60:.0f} requests/min")
     else:
-        print("❓ Request Rate: Not available")
-    
-    # Service Health
-    print()
-    print("-" * 80)
-    print("SERVICE HEALTH")
-    print("-" * 80)
-    
-    instance_status = get_instance_status(compute_client, compartment_id)
-    if "error" not in instance_status:
-        running = instance_status.get('running', 0)
-        total = instance_status.get('total', 0)
-        health_status = "✅" if running == total and total > 0 else "⚠️ " if running > 0 else "❌"
-        print(f"{health_status} Compute Instances: {running}/{total} running")
+        lines.append("❓ Request Rate: Not available")
+    
+    return lines
+
+
+def render_service_health(results: Dict[str, Any]) -> List[str]:
+    """Service health panel: compute instance states."""
+    instance_status = results["instances"]
+    if "error" in instance_status:
+        return [f"❌ Error getting instance status: {instance_status['error']}"]
+    
+    running = instance_status.get('running', 0)
+    total = instance_status.get('total', 0)
+    health_status = "✅" if running == total and total > 0 else "⚠️ " if running > 0 else "❌"
+    lines = [f"{health_status} Compute Instances: {running}/{total} running"]
+    if instance_status.get('stale'):
+        lines.append("   (cached - refresh failed)")
+    
+    if instance_status.get('instances'):
+        # Utilization comes from the infrastructure panel's per-instance results
+        cpu = results.get("cpu") or {}
+        memory = results.get("memory") or {}
+        lines.append("\nInstance Details:")
+        for inst in instance_status['instances'][:5]:  # Show first 5
+            state_icon = "✅" if inst['state'] == "RUNNING" else "❌"
+            usage = [
+                f"{label} {values[inst.get('ocid')]:.1f}%"
+                for label, values in (("CPU", cpu), ("memory", memory))
+                if inst.get('ocid') in values
+            ]
+            detail = f" ({', '.join(usage)})" if usage else ""
+            lines.append(f"  {state_icon} {inst['name']}: {inst['state']}{detail}")
+        if len(instance_status['instances']) > 5:
+            lines.append(f"  ... and {len(instance_status['instances']) - 5} more")
+    return lines
+
+
+def render_alarms(results: Dict[str, Any]) -> List[str]:
+    """Alarm panel: alarm counts and currently firing alarms."""
+    alarm_summary = results["alarms"]
+    if "error" in alarm_summary:
+        return [f"❌ Error getting alarm status: {alarm_summary['error']}"]
+    
+    total = alarm_summary.get('total', 0)
+    enabled = alarm_summary.get('enabled', 0)
+    firing = alarm_summary.get('firing', 0)
+    critical = alarm_summary.get('firing_critical', 0)
+    
+    alarm_icon = "✅" if firing == 0 else "❌" if critical or firing >= 3 else "⚠️ "
+    lines = [
+        f"{alarm_icon} Total Alarms: {total}",
+        f"   Enabled: {enabled}",
+        f"   Firing: {firing} ({critical} critical)",
+        f"   OK: {alarm_summary.get('ok', 0)}",
+    ]
+    for alarm in alarm_summary.get('firing_alarms', [])[:5]:  # Show first 5
+        lines.append(f"   🔥 {alarm['name']} [{alarm['severity']}] since {alarm['triggered'] or 'unknown'}")
+    if firing > 5:
+        lines.append(f"   ... and {firing - 5} more firing")
+    if alarm_summary.get('stale'):
+        lines.append("   (cached - refresh failed)")
+    return lines
+
+
+def render_slo(results: Dict[str, Any]) -> List[str]:
+    """SLO panel: SLI over the period and burn rate per window."""
+    slo_status = results["slo"]
+    if "error" in slo_status:
+        return [f"❓ Cannot evaluate SLOs: {slo_status['error']}"]
+    
+    lines = []
+    for slo in slo_status["slos"]:
+        if slo["sli"] is None:
+            lines.append(f"❓ {slo['name']}: no traffic in the last {slo['period']}")
+            continue
         
-        if instance_status.get('instances'):
-            print("\nInstance Details:")
-            for inst in instance_status['instances'][:5]:  # Show first 5
-                state_icon = "✅" if inst['state'] == "RUNNING" else "❌"
-                print(f"  {state_icon} {inst['name']}: {inst['state']}")
-            if len(instance_status['instances']) > 5:
-                print(f"  ... and {len(instance_status['instances']) - 5} more")
-    else:
-        print(f"❌ Error getting instance status: {instance_status['error']}")
-    
-    # Alarm Status
-    print()
-    print("-" * 80)
-    print("ALARM STATUS")
-    print("-" * 80)
-    
-    alarm_summary = get_alarm_summary(monitoring_client, compartment_id)
-    if "error" not in alarm_summary:
-        total = alarm_summary.get('total', 0)
-        enabled = alarm_summary.get('enabled', 0)
-        firing = alarm_summary.get('firing', 0)
+        icon = "❌" if slo["alerts"] else "✅" if slo["sli"] >= slo["target"] else "⚠️ "
+        burns = "  ".join(
+            f"{window} {burn:.1f}x" if burn is not None else f"{window} -"
+            for window, burn in slo["burn"].items()
+        )
+        lines.append(f"{icon} {slo['name']}: {slo['sli']:.3f}% over {slo['period']} (target {slo['target']}%)")
+        lines.append(f"   Burn rate: {burns}")
+        for alert in slo["alerts"]:
+            lines.append(
+                f"   🚨 {alert['severity'].upper()}: {alert['long_burn']:.1f}x over {alert['long_window']} "
+                f"and {alert['short_burn']:.1f}x over {alert['short_window']} (threshold {alert['burn_rate']}x)"
+            )
+    return lines
+
+
+def render_error_budget(results: Dict[str, Any]) -> List[str]:
+    """Error budget panel: budget left per SLO and when it runs out at the recent burn rate."""
+    slo_status = results["slo"]
+    if "error" in slo_status:
+        return []
+    
+    lines = []
+    for slo in slo_status["slos"]:
+        remaining = slo["budget_remaining"]
+        if remaining is None:
+            continue
         
-        alarm_icon = "✅" if firing == 0 else "⚠️ " if firing < 3 else "❌"
-        print(f"{alarm_icon} Total Alarms: {total}")
-        print(f"   Enabled: {enabled}")
-        print(f"   Firing: {firing}")
-    else:
-        print(f"❌ Error getting alarm status: {alarm_summary['error']}")
-    
-    # SLO Status (Example)
-    print()
-    print("-" * 80)
-    print("SLO STATUS")
-    print("-" * 80)
-    
-    if "error" not in instance_status:
-        total = instance_status.get('total', 0)
-        running = instance_status.get('running', 0)
-        if total > 0:
-            availability = (running / total) * 100
-            slo_target = 99.9
-            slo_status = "✅" if availability >= slo_target else "⚠️ "
-            print(f"{slo_status} Availability: {availability:.2f}%")
-            print(f"   SLO Target: {slo_target}%")
-            
-            if availability >= slo_target:
-                print("   Status: Meeting SLO")
-            else:
-                breach = slo_target - availability
-                print(f"   Status: SLO Breach (-{breach:.2f}%)")
+        icon = "✅" if remaining > 0.5 else "⚠️ " if remaining > 0 else "❌"
+        exhausted_in = slo["exhausted_in"]
+        if exhausted_in == 0:
+            projection = "budget exhausted"
+        elif exhausted_in is None:
+            projection = "not being consumed"
         else:
-            print("❓ No instances found for SLO calculation")
-    else:
-        print("❓ Cannot calculate SLO (instance status unavailable)")
+            projection = f"exhausted in ~{format_duration(exhausted_in)} at the current burn rate"
+        lines.append(f"{icon} {slo['name']}: {max(remaining, 0) * 100:.1f}% remaining - {projection}")
+    return lines
+
+
+# Panels in display order: (title, result keys it needs, renderer)
+PANELS = [
+    ("INFRASTRUCTURE METRICS", ("cpu", "memory"), render_infrastructure),
+    ("APPLICATION METRICS (BharatMart)", ("latency", "request_rate"), render_application),
+    ("SERVICE HEALTH", ("instances", "cpu", "memory"), render_service_health),
+    ("ALARM STATUS", ("alarms",), render_alarms),
+    ("SLO STATUS", ("slo",), render_slo),
+    ("ERROR BUDGET", ("slo",), render_error_budget),
+]
+
+
+def format_panel(title: str, lines: List[str]) -> List[str]:
+    """Panel heading plus body, one entry per screen line (empty panels are hidden)."""
+    if not lines:
+        return []
+    return "\n".join(["", "-" * 80, title, "-" * 80, *lines]).split("\n")
+
+
+def print_panel(title: str, lines: List[str]) -> None:
+    """Print one panel as a single write, so concurrent panels never interleave."""
+    if lines:
+        print("\n".join(format_panel(title, lines)), flush=True)
+
+
+def header_lines(compartment_id: str) -> List[str]:
+    """Dashboard banner."""
+    return [
+        "=" * 80,
+        " " * 25 + "SRE DASHBOARD - BharatMart",
+        "=" * 80,
+        f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        f"Compartment: {compartment_id[:50]}...",
+    ]
+
+
+FOOTER_LINES = [
+    "",
+    "=" * 80,
+    "",
+    "Note: Some metrics may take a few minutes to appear after deployment.",
+    "      Custom metrics require ingestion script to be running.",
+]
+
+
+def display_dashboard(
+    monitoring_client: oci.monitoring.MonitoringClient,
+    compute_client: oci.core.ComputeClient,
+    compartment_id: str,
+    instance_id: Optional[str] = None,
+    deadline: float = QUERY_DEADLINE,
+    slo_config: Optional[Dict[str, Any]] = None
+):
+    """
+    Display SRE Dashboard with metrics and status.
+    
+    All queries are issued at once on a bounded thread pool. Each panel is
+    printed as soon as the results it needs have arrived, so a slow query
+    only delays its own panel. Whatever is still missing after deadline
+    seconds is rendered as unavailable.
+    """
+    print("\n".join(header_lines(compartment_id)))
+    
+    tasks = {}
+    for key, (namespace, metric_name, statistic, per_instance) in METRIC_QUERIES.items():
+        if per_instance:
+            tasks[key] = (get_latest_values_by_resource, monitoring_client, namespace, metric_name, compartment_id, 5, statistic)
+        else:
+            tasks[key] = (get_latest_metric_value, monitoring_client, namespace, metric_name, compartment_id, None, 5, statistic)
+    tasks["instances"] = (get_instance_status, compute_client, compartment_id)
+    tasks["alarms"] = (get_alarm_summary, monitoring_client, compartment_id)
+    tasks["slo"] = (evaluate_slos, monitoring_client, compartment_id, slo_config)
+    # Shown for calls that miss the deadline
+    results: Dict[str, Any] = {
+        "instance_id": instance_id,
+        "instances": {"error": f"timed out after {deadline:.0f}s"},
+        "alarms": {"error": f"timed out after {deadline:.0f}s"},
+        "slo": {"error": f"timed out after {deadline:.0f}s"},
+    }
+    
+    executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_QUERIES, thread_name_prefix="dashboard")
+    futures = {executor.submit(*task): key for key, task in tasks.items()}
+    completed = set()
+    pending_panels = list(PANELS)
+    
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            key = futures[future]
+            results[key] = future.result()
+            completed.add(key)
+            for panel in [p for p in pending_panels if completed.issuperset(p[1])]:
+                pending_panels.remove(panel)
+                print_panel(panel[0], panel[2](results))
+    except FuturesTimeout:
+        late = sorted(key for future, key in futures.items() if not future.done())
+        print(f"\n⚠️  Timed out after {deadline:.0f}s waiting for: {', '.join(late)}", file=sys.stderr)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    for title, _, render in pending_panels:
+        print_panel(title, render(results))
+    
+    print("\n".join(FOOTER_LINES))
+
+
+class FrameWriter:
+    """
+    Redraws a terminal frame by rewriting only the lines that changed.
+    
+    On a TTY each changed line is addressed with an ANSI cursor move;
+    otherwise (e.g. output piped to a log) the whole frame is printed
+    again, but only when something in it changed.
+    """
+    
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.tty = self.stream.isatty()
+        self.previous: Optional[List[str]] = None
+    
+    def draw(self, lines: List[str]) -> int:
+        """Draw a frame and return how many lines were written."""
+        if lines == self.previous:
+            return 0
+        
+        if not self.tty:
+            self.stream.write("\n".join(lines) + "\n")
+            changed = len(lines)
+        elif self.previous is None:
+            self.stream.write("\x1b[2J\x1b[H" + "\n".join(lines) + "\n")
+            changed = len(lines)
+        else:
+            parts = []
+            changed = 0
+            for row, line in enumerate(lines):
+                if row >= len(self.previous) or self.previous[row] != line:
+                    parts.append(f"\x1b[{row + 1};1H{line}\x1b[K")
+                    changed += 1
+            if len(lines) < len(self.previous):
+                parts.append(f"\x1b[{len(lines) + 1};1H\x1b[J")
+            parts.append(f"\x1b[{len(lines) + 1};1H")
+            self.stream.write("".join(parts))
+        
+        self.stream.flush()
+        self.previous = list(lines)
+        return changed
+
+
+class LiveDashboard:
+    """
+    Long-lived dashboard state for --watch.
+    
+    Keeps the OCI clients, a worker pool and one MetricSeries per metric
+    panel alive between ticks. Each tick only fetches datapoints newer than
+    what is buffered; inventory and alarm calls are re-run as a whole. A
+    call still running from the previous tick is not issued again, and
+    panels whose call misses the deadline keep showing their last value.
+    """
+    
+    def __init__(
+        self,
+        monitoring_client: oci.monitoring.MonitoringClient,
+        compute_client: oci.core.ComputeClient,
+        compartment_id: str,
+        instance_id: Optional[str] = None,
+        deadline: float = QUERY_DEADLINE,
+        slo_config: Optional[Dict[str, Any]] = None
+    ):
+        self.monitoring_client = monitoring_client
+        self.compute_client = compute_client
+        self.compartment_id = compartment_id
+        self.deadline = deadline
+        self.slo_config = slo_config
+        self.series = {}
+        for key, (namespace, metric_name, statistic, per_instance) in METRIC_QUERIES.items():
+            group_by = "resourceId" if per_instance else None
+            self.series[key] = MetricSeries(
+                namespace, build_metric_query(metric_name, statistic=statistic, group_by=group_by), group_by=group_by
+            )
+        self.results: Dict[str, Any] = {
+            "instance_id": instance_id,
+            "instances": {"error": "waiting for first refresh"},
+            "alarms": {"error": "waiting for first refresh"},
+            "slo": {"error": "waiting for first refresh"},
+        }
+        self.in_flight: Dict[str, Future] = {}
+        self.executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_QUERIES, thread_name_prefix="dashboard")
+    
+    def refresh_metric(self, key: str) -> Any:
+        """Pull new datapoints for one metric panel."""
+        try:
+            return self.series[key].refresh(self.monitoring_client, self.compartment_id)
+        except Exception as e:
+            print(f"  Error querying {self.series[key].query}: {e}", file=sys.stderr)
+            return self.series[key].latest
     
-    # Error Budget (Example calculation)
-    if latency is not None and latency_ms > 500:
-        print()
-        print("-" * 80)
-        print("ERROR BUDGET")
-        print("-" * 80)
-        print("⚠️  High latency detected - consuming error budget")
-        print("   Consider investigating latency issues")
+    def tick(self) -> None:
+        """Refresh every panel, waiting at most deadline seconds."""
+        tasks = {key: (self.refresh_metric, key) for key in self.series}
+        tasks["instances"] = (get_instance_status, self.compute_client, self.compartment_id)
+        tasks["alarms"] = (get_alarm_summary, self.monitoring_client, self.compartment_id)
+        tasks["slo"] = (evaluate_slos, self.monitoring_client, self.compartment_id, self.slo_config)
+        
+        for key, task in tasks.items():
+            if key not in self.in_flight:
+                self.in_flight[key] = self.executor.submit(*task)
+        
+        wait(self.in_flight.values(), timeout=self.deadline)
+        for key, future in list(self.in_flight.items()):
+            if future.done():
+                del self.in_flight[key]
+                self.results[key] = future.result()
     
-    print()
-    print("=" * 80)
-    print()
-    print("Note: Some metrics may take a few minutes to appear after deployment.")
-    print("      Custom metrics require ingestion script to be running.")
+    def frame(self) -> List[str]:
+        """Render all panels into screen lines."""
+        lines = header_lines(self.compartment_id)
+        for title, _, render in PANELS:
+            lines.extend(format_panel(title, render(self.results)))
+        if self.in_flight:
+            lines.append(f"\n⚠️  Still waiting for: {', '.join(sorted(self.in_flight))}")
+        lines.extend(FOOTER_LINES)
+        return "\n".join(lines).split("\n")
+    
+    def close(self) -> None:
+        """Stop the worker pool without waiting for calls in flight."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def watch_dashboard(dashboard: LiveDashboard, interval: float) -> None:
+    """Refresh the dashboard every interval seconds until interrupted."""
+    writer = FrameWriter()
+    next_tick = time.monotonic()
+    try:
+        while True:
+            dashboard.tick()
+            writer.draw(dashboard.frame())
+            
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay < 0:
+                # Refresh took longer than the interval; skip the missed ticks
+                next_tick = time.monotonic()
+                delay = 0
+            time.sleep(delay)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        dashboard.close()
 
 
 def main():
     """Main function to run SRE Dashboard."""
+    parser = argparse.ArgumentParser(description='SRE dashboard built on OCI REST APIs')
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='Keep running and refresh in place instead of printing once'
+    )
+    parser.add_argument(
+        '--interval',
+        type=float,
+        default=DEFAULT_WATCH_INTERVAL,
+        help=f'Seconds between refreshes in watch mode (default: {DEFAULT_WATCH_INTERVAL})'
+    )
+    parser.add_argument(
+        '--slo-config',
+        default=SLO_CONFIG_FILE,
+        help='JSON file declaring SLO targets and burn-rate alerts (default: slo-config.json next to this script)'
+    )
+    args = parser.parse_args()
+    
     if not COMPARTMENT_OCID:
         print("Error: OCI_COMPARTMENT_ID environment variable is required", file=sys.stderr)
         print("Usage: export OCI_COMPARTMENT_ID=ocid1.compartment.oc1...", file=sys.stderr)
@@ -294,17 +1137,35 @@ def main():
             profile_name=os.getenv('OCI_PROFILE', 'DEFAULT')
         )
         
-        # Create OCI clients
-        monitoring_client = oci.monitoring.MonitoringClient(config)
-        compute_client = oci.core.ComputeClient(config)
+        # Create OCI clients; the read timeout caps each call at the deadline
+        timeout = (5, QUERY_DEADLINE)
+        monitoring_client = oci.monitoring.MonitoringClient(config, timeout=timeout)
+        compute_client = oci.core.ComputeClient(config, timeout=timeout)
+        
+        slo_config = None
+        if os.path.exists(os.path.expanduser(args.slo_config)):
+            slo_config = load_slo_config(args.slo_config)
         
         # Display dashboard
-        display_dashboard(
-            monitoring_client,
-            compute_client,
-            COMPARTMENT_OCID,
-            INSTANCE_OCID if INSTANCE_OCID else None
-        )
+        if args.watch:
+            watch_dashboard(
+                LiveDashboard(
+                    monitoring_client,
+                    compute_client,
+                    COMPARTMENT_OCID,
+                    INSTANCE_OCID if INSTANCE_OCID else None,
+                    slo_config=slo_config
+                ),
+                args.interval
+            )
+        else:
+            display_dashboard(
+                monitoring_client,
+                compute_client,
+                COMPARTMENT_OCID,
+                INSTANCE_OCID if INSTANCE_OCID else None,
+                slo_config=slo_config
+            )
         
     except oci.exceptions.ConfigFileNotFound:
         print("Error: OCI config file not found", file=sys.stderr)
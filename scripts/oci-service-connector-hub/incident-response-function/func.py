@@ -7,21 +7,710 @@ automated incident response actions.
 Use Case: Automated incident response when alarms fire
 Integration: OCI Service Connector Hub routes monitoring alarms to this function
 
+Service Connector Hub may deliver a batch of events per invocation. Events
+are grouped by alarm and state, and each group is checked against a sliding
+deduplication window kept in a small SQLite store, so an alarm storm produces
+one notification digest per incident instead of one per event.
+
+The handler returns as soon as each incident is recorded in that store.
+Notifications are published from a bounded background queue on OCI clients
+that are created once and reused while the container stays warm, and the
+queue is flushed when the container shuts down.
+
+Each notified incident carries a context snapshot - the last 15 minutes of
+latency, errors and chaos events, instance lifecycle states and firing
+alarms - collected concurrently under a fixed time budget, so triage starts
+with the data already in the notification.
+
+Firing incidents can also trigger automated remediation (remediation.py),
+configured in remediation-rules.json and rate-limited so that an alarm storm
+cannot become a remediation storm.
+
 Deployment:
     fn deploy --app <app-name> --local
 """
 
 import io
+import os
 import json
 import oci
+import time
+import queue
+import atexit
+import signal
+import sqlite3
 import logging
-from datetime import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
 from fdk import response
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+from remediation import DEFAULT_RULES_FILE, RemediationEngine, RemediationLedger, load_rules
+
 logger = logging.getLogger(__name__)
 
+# Sliding deduplication window and the store holding it (/tmp is writable in OCI Functions)
+DEFAULT_DEDUP_WINDOW = 300
+DEFAULT_STATE_DB = "/tmp/incident-response-state.db"
+# Groups not seen for this long are dropped from the store
+STATE_RETENTION = 24 * 3600
+
+# Background notification dispatch
+DISPATCH_QUEUE_SIZE = 100
+DISPATCH_WORKERS = 2
+DISPATCH_MAX_ATTEMPTS = 5
+DISPATCH_FLUSH_TIMEOUT = 5
+
+# Incident context snapshot: metrics window, time budget and reuse across a burst
+DEFAULT_NAMESPACE = "custom.bharatmart"
+ENRICHMENT_WINDOW_MINUTES = 15
+DEFAULT_ENRICHMENT_DEADLINE = 3
+ENRICHMENT_TTL = 30
+ENRICHMENT_WORKERS = 8
+ENRICHMENT_PAGE_SIZE = 1000
+
+# (connect, read) timeouts of OCI clients, so late lookups do not hold threads.
+# Snapshot lookups cut them further to the time left before their deadline.
+OCI_CLIENT_TIMEOUT = (3, 10)
+
+# Metrics in the snapshot: name -> (MQL query, per-interval increases to add up).
+# Counters are read through the <counter>_increase series the ingestion script
+# publishes; summing raw cumulative values across streams and scrapes is not
+# meaningful.
+ENRICHMENT_METRICS = {
+    "api_latency_seconds": ("api_latency_seconds[1m].grouping().max()", False),
+    "errors_total_increase": ("errors_total_increase[1m].grouping().sum()", True),
+    "chaos_events_total_increase": ("chaos_events_total_increase[1m].grouping().sum()", True),
+}
+
+# OCI alarm message types -> the alarm state they report
+ALARM_STATES = {
+    "OK_TO_FIRING": "FIRING",
+    "REPEAT": "FIRING",
+    "FIRING_TO_OK": "OK",
+    "RESET": "RESET",
+}
+
+
+class IncidentStore:
+    """
+    Incident journal and deduplication window, in one SQLite file.
+    
+    Every incident is written here before the handler returns, together with
+    the notification it should send, so a notification still queued when the
+    container is frozen or recycled is sent by a later invocation.
+    
+    The deduplication window keeps the last notification time and suppressed
+    event count per (alarm, state). The first group of events for an alarm
+    state is notified; later ones inside the window are only counted, and the
+    count is reported with the next notification once the window has passed.
+    Concurrent invocations on the same host share the file; point
+    INCIDENT_STATE_DB at shared storage to share it more widely.
+    """
+
+    def __init__(self, path: str = DEFAULT_STATE_DB, window: float = DEFAULT_DEDUP_WINDOW):
+        self.path = path
+        self.window = window
+        self.conn: Optional[sqlite3.Connection] = None
+        # The connection is shared with the dispatch threads
+        self.lock = threading.Lock()
+
+    def connect(self) -> sqlite3.Connection:
+        """Open the store, creating its tables on first use."""
+        if self.conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS alarm_groups ("
+                " alarm_id TEXT NOT NULL, state TEXT NOT NULL,"
+                " notified_at REAL NOT NULL, last_seen REAL NOT NULL, suppressed INTEGER NOT NULL,"
+                " PRIMARY KEY (alarm_id, state))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS incidents ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, alarm_id TEXT NOT NULL, state TEXT NOT NULL,"
+                " recorded_at REAL NOT NULL, record TEXT NOT NULL,"
+                " topic_id TEXT, title TEXT, body TEXT, notified_at REAL, attempts INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS incidents_pending ON incidents (notified_at, topic_id)"
+            )
+            self.conn = conn
+        return self.conn
+
+    def check(self, alarm_id: str, state: str, events: int, now: Optional[float] = None) -> Tuple[bool, int]:
+        """
+        Record a group of events and decide whether to notify.
+        
+        Args:
+            alarm_id: Alarm OCID
+            state: Alarm state the events report
+            events: Number of events in the group
+            now: Current Unix time (default: now)
+        
+        Returns:
+            (notify, events covered: this group plus any suppressed since the
+            last notification)
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            conn = self.connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT notified_at, suppressed FROM alarm_groups WHERE alarm_id = ? AND state = ?",
+                    (alarm_id, state)
+                ).fetchone()
+                if row is not None and now - row[0] < self.window:
+                    conn.execute(
+                        "UPDATE alarm_groups SET suppressed = suppressed + ?, last_seen = ? WHERE alarm_id = ? AND state = ?",
+                        (events, now, alarm_id, state)
+                    )
+                    notify, covered = False, row[1] + events
+                else:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO alarm_groups VALUES (?, ?, ?, ?, 0)",
+                        (alarm_id, state, now, now)
+                    )
+                    notify, covered = True, (row[1] if row else 0) + events
+                conn.execute("DELETE FROM alarm_groups WHERE last_seen < ?", (now - STATE_RETENTION,))
+                conn.execute("DELETE FROM incidents WHERE recorded_at < ?", (now - STATE_RETENTION,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return notify, covered
+
+    def record(
+        self,
+        incident_log: Dict[str, Any],
+        topic_id: Optional[str] = None,
+        message: Optional[oci.ons.models.MessageDetails] = None
+    ) -> int:
+        """
+        Durably write an incident and the notification it still has to send.
+        
+        Returns:
+            Row ID of the incident
+        """
+        with self.lock:
+            cursor = self.connect().execute(
+                "INSERT INTO incidents (alarm_id, state, recorded_at, record, topic_id, title, body)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    incident_log["incident_id"], incident_log["state"], time.time(),
+                    json.dumps(incident_log, separators=(",", ":"), default=str),
+                    topic_id if message else None,
+                    message.title if message else None,
+                    message.body if message else None
+                )
+            )
+            return cursor.lastrowid
+
+    def mark_notified(self, row_id: int) -> None:
+        with self.lock:
+            self.connect().execute("UPDATE incidents SET notified_at = ? WHERE id = ?", (time.time(), row_id))
+
+    def mark_failed(self, row_id: int) -> None:
+        with self.lock:
+            self.connect().execute("UPDATE incidents SET attempts = attempts + 1 WHERE id = ?", (row_id,))
+
+    def pending(self, limit: int = DISPATCH_QUEUE_SIZE) -> List[Tuple[int, str, str, str]]:
+        """Recorded notifications not yet sent, oldest first: (row ID, topic, title, body)."""
+        with self.lock:
+            return self.connect().execute(
+                "SELECT id, topic_id, title, body FROM incidents"
+                " WHERE notified_at IS NULL AND topic_id IS NOT NULL AND attempts < ?"
+                " ORDER BY id LIMIT ?",
+                (DISPATCH_MAX_ATTEMPTS, limit)
+            ).fetchall()
+
+
+class NotificationDispatcher:
+    """
+    Bounded queue of ONS notifications published by background threads.
+    
+    The handler only enqueues; a full queue leaves the notification recorded
+    but unsent, for a later invocation to pick up. A failed publish is
+    retried the same way, up to DISPATCH_MAX_ATTEMPTS times. flush() waits
+    for the queue to drain and runs when the container shuts down.
+    """
+
+    def __init__(self, max_pending: int = DISPATCH_QUEUE_SIZE, workers: int = DISPATCH_WORKERS):
+        self.queue: "queue.Queue[Tuple[IncidentStore, int, str, str, str]]" = queue.Queue(maxsize=max_pending)
+        self.workers = workers
+        self.threads: List[threading.Thread] = []
+        self.queued: Set[int] = set()
+        self.lock = threading.Lock()
+
+    def submit(self, store: IncidentStore, row_id: int, topic_id: str, title: str, body: str) -> bool:
+        """Queue a recorded notification; False if the queue is full."""
+        with self.lock:
+            if row_id in self.queued:
+                return True
+            try:
+                self.queue.put_nowait((store, row_id, topic_id, title, body))
+            except queue.Full:
+                return False
+            self.queued.add(row_id)
+            if not self.threads:
+                for i in range(self.workers):
+                    thread = threading.Thread(target=self.run, name=f"dispatch-{i}", daemon=True)
+                    thread.start()
+                    self.threads.append(thread)
+        return True
+
+    def run(self) -> None:
+        """Worker loop: publish queued notifications and record the outcome."""
+        while True:
+            store, row_id, topic_id, title, body = self.queue.get()
+            try:
+                get_client(oci.ons.NotificationDataPlaneClient).publish_message(
+                    topic_id=topic_id,
+                    message_details=oci.ons.models.MessageDetails(title=title, body=body)
+                )
+                store.mark_notified(row_id)
+                logger.info("notification_sent", extra=log_fields(incident_row=row_id, topic_id=topic_id))
+            except Exception as e:
+                logger.warning("notification_failed", extra=log_fields(incident_row=row_id, error=str(e)))
+                try:
+                    store.mark_failed(row_id)
+                except sqlite3.Error:
+                    pass
+            finally:
+                with self.lock:
+                    self.queued.discard(row_id)
+                self.queue.task_done()
+
+    def flush(self, timeout: float = DISPATCH_FLUSH_TIMEOUT) -> bool:
+        """Wait up to timeout seconds for queued notifications; True if all were handled."""
+        deadline = time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One compact JSON object per log line.
+    
+    Structured fields are passed as extra=log_fields(...) and serialized only
+    when the record is actually emitted.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {"time": record.created, "level": record.levelname, "event": record.getMessage()}
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, separators=(",", ":"), default=str)
+
+
+def log_fields(**fields: Any) -> Dict[str, Dict[str, Any]]:
+    """extra= argument carrying structured fields to JsonFormatter."""
+    return {"fields": fields}
+
+
+def create_client(client_class: Any) -> Any:
+    """OCI client authenticated as the function (resource principal) when deployed."""
+    if os.getenv("OCI_RESOURCE_PRINCIPAL_VERSION"):
+        return client_class(
+            {}, signer=oci.auth.signers.get_resource_principals_signer(), timeout=OCI_CLIENT_TIMEOUT
+        )
+    # Initialize OCI client using default config
+    return client_class({}, timeout=OCI_CLIENT_TIMEOUT)
+
+
+def get_client(client_class: Any) -> Any:
+    """Client of the given class, created once and reused by warm invocations."""
+    with _clients_lock:
+        client = _clients.get(client_class)
+        if client is None:
+            client = _clients[client_class] = create_client(client_class)
+        return client
+
+
+def get_lookup_client(client_class: Any, deadline_at: float) -> Any:
+    """
+    Client for one snapshot request, with timeouts ending by deadline_at (time.monotonic()).
+    
+    The SDK takes timeouts per client, not per call, so each enrichment
+    worker keeps its own clients and sets their timeouts before every
+    request. A lookup still running at the deadline then frees its worker
+    within moments instead of holding it for OCI_CLIENT_TIMEOUT.
+    
+    Raises:
+        TimeoutError: If the deadline has already passed
+    """
+    remaining = deadline_at - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("deadline exceeded")
+    clients = getattr(_lookup_clients, "clients", None)
+    if clients is None:
+        clients = _lookup_clients.clients = {}
+    client = clients.get(client_class)
+    if client is None:
+        client = clients[client_class] = create_client(client_class)
+    connect = min(OCI_CLIENT_TIMEOUT[0], remaining / 2)
+    client.base_client.timeout = (connect, min(OCI_CLIENT_TIMEOUT[1], remaining - connect))
+    return client
+
+
+def list_all(client_class: Any, operation: str, deadline_at: float, **kwargs) -> List[Any]:
+    """Every page of a list operation, each page bounded by the time left before deadline_at."""
+    items: List[Any] = []
+    page = None
+    while True:
+        result = getattr(get_lookup_client(client_class, deadline_at), operation)(
+            page=page,
+            limit=ENRICHMENT_PAGE_SIZE,
+            retry_strategy=oci.retry.NoneRetryStrategy(),
+            **kwargs
+        )
+        items.extend(result.data)
+        if not result.has_next_page:
+            return items
+        page = result.next_page
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Thread pool running enrichment lookups, shared by warm invocations."""
+    global _executor
+    with _clients_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=ENRICHMENT_WORKERS, thread_name_prefix="enrich")
+        return _executor
+
+
+def get_remediation_engine(rules_path: str, ledger_path: str, enabled: Optional[bool] = None) -> RemediationEngine:
+    """Remediation engine for a rules file, kept (with its rate limits) across warm invocations."""
+    with _clients_lock:
+        engine = _engines.get((rules_path, ledger_path))
+        if engine is None:
+            engine = _engines[(rules_path, ledger_path)] = RemediationEngine(
+                load_rules(rules_path), get_client=get_client, ledger=RemediationLedger(ledger_path)
+            )
+    if enabled is not None:
+        engine.enabled = enabled
+    return engine
+
+
+def get_store(path: str, window: float) -> IncidentStore:
+    """Incident store for a path, kept open across warm invocations."""
+    with _clients_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = IncidentStore(path, window)
+        store.window = window
+        return store
+
+
+def flush_on_shutdown(signum: Optional[int] = None, frame: Any = None) -> None:
+    """Send queued notifications before the container exits."""
+    if not dispatcher.flush(DISPATCH_FLUSH_TIMEOUT):
+        logger.warning("notification_flush_timeout", extra=log_fields(pending=dispatcher.queue.unfinished_tasks))
+    if signum is not None:
+        if callable(_previous_sigterm):
+            _previous_sigterm(signum, frame)
+        else:
+            raise SystemExit(128 + signum)
+
+
+# Configure logging
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(JsonFormatter())
+logging.basicConfig(level=logging.INFO, handlers=[_log_handler])
+
+# Created on first use and reused while the function container stays warm
+_clients: Dict[Any, Any] = {}
+_stores: Dict[str, IncidentStore] = {}
+_clients_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_lookup_clients = threading.local()
+_engines: Dict[Tuple[str, str], RemediationEngine] = {}
+_snapshots: Dict[Tuple[str, str], Tuple[float, Dict[str, Any]]] = {}
+dispatcher = NotificationDispatcher()
+
+atexit.register(flush_on_shutdown)
+_previous_sigterm = signal.getsignal(signal.SIGTERM)
+try:
+    signal.signal(signal.SIGTERM, flush_on_shutdown)
+except ValueError:
+    # Not imported from the main thread; atexit still flushes on a clean exit
+    pass
+
+
+def parse_events(data: Optional[io.BytesIO]) -> List[Dict[str, Any]]:
+    """
+    Read the invocation payload as a list of alarm events.
+    
+    Accepts one event object or a JSON array of them (Service Connector Hub
+    batches). Non-JSON payloads become a single raw event.
+    """
+    if not data:
+        # Test event structure
+        return [{
+            "alarmId": "test-alarm-id",
+            "message": "Test alarm event",
+            "severity": "CRITICAL",
+            "timestamp": datetime.utcnow().isoformat()
+        }]
+
+    event_str = data.read().decode('utf-8')
+    try:
+        event_data = json.loads(event_str)
+    except json.JSONDecodeError:
+        # Handle non-JSON format (OCI events may be wrapped)
+        return [{"raw_event": event_str, "message": event_str}]
+    if isinstance(event_data, list):
+        return [event for event in event_data if isinstance(event, dict)]
+    return [event_data]
+
+
+def extract_alarm(event_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Alarm information from one event, tolerant of the different payload shapes."""
+    metadata = (event_data.get("alarmMetaData") or [{}])[0]
+    alarm_id = (
+        event_data.get("alarmId") or event_data.get("alarm_id") or metadata.get("id")
+        or event_data.get("dedupeKey") or "unknown"
+    )
+    event_type = event_data.get("type") or metadata.get("status") or "FIRING"
+    resources = [
+        dimensions["resourceId"] for dimensions in metadata.get("dimensions") or []
+        if isinstance(dimensions, dict) and dimensions.get("resourceId")
+    ]
+    if event_data.get("resourceId"):
+        resources.append(event_data["resourceId"])
+    return {
+        "alarm_id": alarm_id,
+        "state": ALARM_STATES.get(event_type, event_type),
+        "message": event_data.get("message") or event_data.get("summary") or event_data.get("body") or "No message",
+        "severity": event_data.get("severity") or event_data.get("severityLevel") or metadata.get("severity") or "UNKNOWN",
+        "timestamp": event_data.get("timestamp") or datetime.utcnow().isoformat(),
+        "alarm_name": event_data.get("alarmName") or event_data.get("title") or event_data.get("resourceDisplayName") or "Unknown Alarm",
+        "resources": resources,
+    }
+
+
+def coalesce_events(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Group a batch of events by (alarm ID, state).
+    
+    Returns:
+        One incident per group, carrying the latest event's details, the
+        event count, the first and last event timestamps and every resource
+        the group's events named
+    """
+    groups: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for event_data in events:
+        alarm = extract_alarm(event_data)
+        key = (alarm["alarm_id"], alarm["state"])
+        group = groups.get(key)
+        if group is None:
+            groups[key] = {**alarm, "events": 1, "first_timestamp": alarm["timestamp"]}
+        else:
+            resources = list(dict.fromkeys(group["resources"] + alarm["resources"]))
+            group.update(alarm, events=group["events"] + 1, first_timestamp=group["first_timestamp"], resources=resources)
+    return list(groups.values())
+
+
+def summarize_points(points: List[Tuple[datetime, float]], increases: bool) -> Dict[str, Any]:
+    """Latest, mean and peak of a series (and their total, for per-interval increases)."""
+    values = [value for _, value in points]
+    summary = {
+        "points": len(values),
+        "latest": values[-1] if values else None,
+        "mean": round(sum(values) / len(values), 6) if values else None,
+        "max": max(values) if values else None,
+        "values": [round(value, 6) for value in values]
+    }
+    if increases:
+        summary["increase"] = sum(values)
+    return summary
+
+
+def fetch_metric(compartment_id: str, namespace: str, query: str, increases: bool, deadline_at: float) -> Dict[str, Any]:
+    """One metric over the enrichment window at one-minute resolution."""
+    end = datetime.utcnow()
+    start = end - timedelta(minutes=ENRICHMENT_WINDOW_MINUTES)
+    data = get_lookup_client(oci.monitoring.MonitoringClient, deadline_at).summarize_metrics_data(
+        compartment_id=compartment_id,
+        summarize_metrics_data_details=oci.monitoring.models.SummarizeMetricsDataDetails(
+            namespace=namespace,
+            query=query,
+            start_time=start,
+            end_time=end,
+            resolution="1m"
+        ),
+        retry_strategy=oci.retry.NoneRetryStrategy()
+    ).data
+    points = sorted(
+        (point.timestamp, point.value)
+        for metric in data
+        for point in metric.aggregated_datapoints or []
+    )
+    return summarize_points(points, increases)
+
+
+def fetch_instances(compartment_id: str, deadline_at: float) -> Dict[str, Any]:
+    """Instance counts by lifecycle state, and the names of instances not running."""
+    instances = list_all(oci.core.ComputeClient, "list_instances", deadline_at, compartment_id=compartment_id)
+    states: Dict[str, int] = {}
+    for instance in instances:
+        states[instance.lifecycle_state] = states.get(instance.lifecycle_state, 0) + 1
+    return {
+        "total": len(instances),
+        "states": states,
+        "not_running": sorted(
+            instance.display_name for instance in instances
+            if instance.lifecycle_state not in ("RUNNING", "TERMINATED")
+        )
+    }
+
+
+def fetch_alarms(compartment_id: str, deadline_at: float) -> Dict[str, Any]:
+    """Alarms currently firing in the compartment."""
+    statuses = list_all(
+        oci.monitoring.MonitoringClient, "list_alarms_status", deadline_at,
+        compartment_id=compartment_id, status="FIRING"
+    )
+    return {
+        "firing": [
+            {
+                "id": status.id,
+                "name": status.display_name,
+                "severity": status.severity,
+                "since": status.timestamp_triggered.isoformat() if status.timestamp_triggered else None
+            }
+            for status in statuses
+        ]
+    }
+
+
+def collect_snapshot(compartment_id: str, namespace: str, deadline: float) -> Dict[str, Any]:
+    """
+    Fetch the incident context concurrently within deadline seconds.
+    
+    Lookups still running at the deadline, or failing, are listed under
+    "missing" and everything else is returned; the snapshot is "complete"
+    only if nothing is missing. Every request's timeouts end by the
+    deadline, so late lookups do not pile up in the shared pool.
+    """
+    started = time.perf_counter()
+    deadline_at = time.monotonic() + deadline
+    executor = get_executor()
+    futures = {
+        f"metric:{name}": executor.submit(fetch_metric, compartment_id, namespace, query, increases, deadline_at)
+        for name, (query, increases) in ENRICHMENT_METRICS.items()
+    }
+    futures["instances"] = executor.submit(fetch_instances, compartment_id, deadline_at)
+    futures["alarms"] = executor.submit(fetch_alarms, compartment_id, deadline_at)
+    wait(futures.values(), timeout=deadline)
+
+    snapshot: Dict[str, Any] = {
+        "window_minutes": ENRICHMENT_WINDOW_MINUTES,
+        "collected_at": datetime.utcnow().isoformat(),
+        "metrics": {},
+        "missing": {}
+    }
+    for key, future in futures.items():
+        if not future.done():
+            # Drops lookups still queued; running ones end with their timeouts
+            future.cancel()
+            snapshot["missing"][key] = "deadline exceeded"
+        elif future.exception() is not None:
+            snapshot["missing"][key] = str(future.exception())
+        elif key.startswith("metric:"):
+            snapshot["metrics"][key[len("metric:"):]] = future.result()
+        else:
+            snapshot[key] = future.result()
+    snapshot["complete"] = not snapshot["missing"]
+    snapshot["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return snapshot
+
+
+def get_snapshot(config: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    """
+    Incident context for the configured compartment, or None without one.
+    
+    A snapshot is reused for ENRICHMENT_TTL seconds, so a burst of
+    invocations queries OCI once.
+    """
+    compartment_id = config.get("COMPARTMENT_OCID", "")
+    if not compartment_id:
+        return None
+    namespace = config.get("METRICS_NAMESPACE", DEFAULT_NAMESPACE)
+    deadline = float(config.get("ENRICHMENT_DEADLINE", DEFAULT_ENRICHMENT_DEADLINE))
+
+    key = (compartment_id, namespace)
+    cached = _snapshots.get(key)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+    snapshot = collect_snapshot(compartment_id, namespace, deadline)
+    if snapshot["complete"]:
+        _snapshots[key] = (time.monotonic() + ENRICHMENT_TTL, snapshot)
+    logger.info("incident_context_collected", extra=log_fields(
+        elapsed_ms=snapshot["elapsed_ms"], missing=list(snapshot["missing"])
+    ))
+    return snapshot
+
+
+def format_snapshot(snapshot: Dict[str, Any]) -> List[str]:
+    """Short text lines describing a context snapshot, for notifications."""
+    lines = [f"Context (last {snapshot['window_minutes']} min):"]
+    for name, summary in snapshot["metrics"].items():
+        if not summary["points"]:
+            lines.append(f"  {name}: no data")
+        elif "increase" in summary:
+            lines.append(f"  {name}: +{summary['increase']:g} (latest {summary['latest']:g})")
+        else:
+            lines.append(f"  {name}: latest {summary['latest']:g}, mean {summary['mean']:g}, max {summary['max']:g}")
+    if "instances" in snapshot:
+        states = ", ".join(f"{state} {count}" for state, count in sorted(snapshot["instances"]["states"].items()))
+        lines.append(f"  instances: {states or 'none'}")
+        if snapshot["instances"]["not_running"]:
+            lines.append(f"  not running: {', '.join(snapshot['instances']['not_running'])}")
+    if "alarms" in snapshot:
+        firing = snapshot["alarms"]["firing"]
+        lines.append(f"  firing alarms: {len(firing)}")
+        lines.extend(f"    [{alarm['severity']}] {alarm['name']}" for alarm in firing[:10])
+    if snapshot["missing"]:
+        lines.append(f"  unavailable: {', '.join(sorted(snapshot['missing']))}")
+    return lines
+
+
+def format_digest(
+    incident: Dict[str, Any],
+    covered: int,
+    snapshot: Optional[Dict[str, Any]] = None,
+    remediations: Optional[List[Dict[str, Any]]] = None
+) -> oci.ons.models.MessageDetails:
+    """Notification for one incident, summarizing every event it covers."""
+    body = f"""Alarm: {incident['alarm_name']}
+State: {incident['state']}
+Message: {incident['message']}
+Time: {incident['timestamp']}
+Alarm ID: {incident['alarm_id']}"""
+    if covered > 1:
+        body += f"\nEvents: {covered} since {incident['first_timestamp']}"
+    if remediations:
+        body += "\n\nRemediation:"
+        for result in remediations:
+            body += f"\n  {result['action']} {result['target']}: {result['status']}"
+            if result["detail"]:
+                body += f" ({result['detail']})"
+    if snapshot:
+        body += "\n\n" + "\n".join(format_snapshot(snapshot))
+    return oci.ons.models.MessageDetails(
+        title=f"BharatMart Incident: {incident['severity']}",
+        body=body
+    )
+
 
 def handler(ctx, data: io.BytesIO = None):
     """
@@ -32,92 +721,145 @@ def handler(ctx, data: io.BytesIO = None):
     
     Args:
         ctx: Function context (contains configuration)
-        data: Alarm event data from Service Connector Hub
+        data: Alarm event data from Service Connector Hub (one event or a batch)
     
     Returns:
         JSON response with incident processing results
     """
     try:
-        # Parse incoming alarm event
-        if data:
-            event_str = data.read().decode('utf-8')
-            try:
-                event_data = json.loads(event_str)
-            except json.JSONDecodeError:
-                # Handle non-JSON format (OCI events may be wrapped)
-                event_data = {"raw_event": event_str, "message": event_str}
-            logger.info(f"Received alarm event: {json.dumps(event_data, indent=2)}")
-        else:
-            # Test event structure
-            event_data = {
-                "alarmId": "test-alarm-id",
-                "message": "Test alarm event",
-                "severity": "CRITICAL",
-                "timestamp": datetime.utcnow().isoformat()
-            }
-
-        # Extract alarm information
-        alarm_id = event_data.get("alarmId") or event_data.get("alarm_id") or "unknown"
-        message = event_data.get("message") or event_data.get("summary") or "No message"
-        severity = event_data.get("severity") or event_data.get("severityLevel") or "UNKNOWN"
-        timestamp = event_data.get("timestamp") or datetime.utcnow().isoformat()
-        alarm_name = event_data.get("alarmName") or event_data.get("resourceDisplayName") or "Unknown Alarm"
-
-        # Log incident details
-        incident_log = {
-            "incident_id": alarm_id,
-            "timestamp": timestamp,
-            "severity": severity,
-            "message": message,
-            "alarm_name": alarm_name,
-            "service": "BharatMart",
-            "status": "acknowledged",
-            "actions_taken": []
-        }
-
-        logger.info(f"Incident logged: {json.dumps(incident_log, indent=2)}")
+        # Parse incoming alarm events
+        events = parse_events(data)
+        logger.info("alarm_events_received", extra=log_fields(count=len(events)))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("alarm_events", extra=log_fields(events=events))
 
         # Get configuration from context
         config = dict(ctx.Config())
         topic_ocid = config.get("TOPIC_OCID", "")
-        
-        # Send notification (optional - requires ONS topic)
-        if topic_ocid:
+        store = get_store(
+            config.get("INCIDENT_STATE_DB", DEFAULT_STATE_DB),
+            float(config.get("DEDUP_WINDOW_SECONDS", DEFAULT_DEDUP_WINDOW))
+        )
+
+        # Re-queue notifications an earlier invocation recorded but did not send
+        try:
+            for row_id, topic_id, title, body in store.pending():
+                if not dispatcher.submit(store, row_id, topic_id, title, body):
+                    break
+        except sqlite3.Error as e:
+            logger.warning("incident_store_unavailable", extra=log_fields(error=str(e)))
+
+        # Context snapshot, collected once per invocation when first needed
+        snapshot = None
+        snapshot_collected = False
+
+        incidents = []
+        for incident in coalesce_events(events):
+            incident_log = {
+                "incident_id": incident["alarm_id"],
+                "timestamp": incident["timestamp"],
+                "severity": incident["severity"],
+                "state": incident["state"],
+                "message": incident["message"],
+                "alarm_name": incident["alarm_name"],
+                "service": "BharatMart",
+                "status": "acknowledged",
+                "events": incident["events"],
+                "actions_taken": []
+            }
+
             try:
-                # Initialize OCI client using default config
-                notification_client = oci.ons.NotificationDataPlaneClient({})
-                
-                notification_client.publish_message(
-                    topic_id=topic_ocid,
-                    message_details=oci.ons.models.MessageDetails(
-                        title=f"BharatMart Incident: {severity}",
-                        body=f"""Alarm: {alarm_name}
-Message: {message}
-Time: {timestamp}
-Alarm ID: {alarm_id}"""
+                notify, covered = store.check(incident["alarm_id"], incident["state"], incident["events"])
+            except sqlite3.Error as e:
+                # Without the store, fail open: notify rather than drop
+                logger.warning("incident_store_unavailable", extra=log_fields(error=str(e)))
+                notify, covered = True, incident["events"]
+
+            # Additional response actions based on severity
+            if notify and incident["severity"] in ["CRITICAL", "ERROR"] and incident["state"] == "FIRING":
+                incident_log["actions_taken"].append("incident_escalated")
+
+            if notify:
+                if not snapshot_collected:
+                    try:
+                        snapshot = get_snapshot(config)
+                    except Exception as e:
+                        logger.warning("incident_context_failed", extra=log_fields(error=str(e)))
+                    snapshot_collected = True
+                if snapshot is not None:
+                    incident_log["context"] = snapshot
+
+            incidents.append((incident, incident_log, notify, covered))
+
+        # Remediate the new incidents of this batch concurrently
+        remediations: Dict[str, List[Dict[str, Any]]] = {}
+        try:
+            engine = get_remediation_engine(
+                config.get("REMEDIATION_RULES", os.path.join(os.path.dirname(os.path.abspath(__file__)), DEFAULT_RULES_FILE)),
+                config.get("INCIDENT_STATE_DB", DEFAULT_STATE_DB),
+                config["REMEDIATION_ENABLED"].lower() == "true" if "REMEDIATION_ENABLED" in config else None
+            )
+            remediations = engine.run([incident for incident, _, notify, _ in incidents if notify])
+        except Exception as e:
+            logger.warning("remediation_failed", extra=log_fields(error=str(e)))
+
+        for incident, incident_log, notify, covered in incidents:
+            # Only firing incidents are remediated; an OK group of the same alarm shares its ID
+            incident_remediations = remediations.get(incident["alarm_id"], []) if incident["state"] == "FIRING" else []
+            for result in incident_remediations:
+                incident_log["actions_taken"].append(f"remediation_{result['status']}: {result['action']} {result['target']}")
+            if incident_remediations:
+                incident_log["remediations"] = incident_remediations
+
+            message = format_digest(incident, covered, snapshot, incident_remediations) if notify and topic_ocid else None
+
+            # Record the incident before returning; the notification is sent in the background
+            try:
+                row_id = store.record(incident_log, topic_ocid, message)
+            except sqlite3.Error as e:
+                logger.warning("incident_store_unavailable", extra=log_fields(error=str(e)))
+                row_id = None
+
+            if not notify:
+                incident_log["actions_taken"].append("notification_deduplicated")
+            elif not topic_ocid:
+                incident_log["actions_taken"].append("notification_skipped")
+            elif row_id is None:
+                # Nothing durable to retry from, so publish inline
+                try:
+                    get_client(oci.ons.NotificationDataPlaneClient).publish_message(
+                        topic_id=topic_ocid,
+                        message_details=message
                     )
-                )
-                logger.info(f"Notification sent to topic: {topic_ocid}")
-                incident_log["actions_taken"].append("notification_sent")
-            except Exception as e:
-                logger.warning(f"Could not send notification: {e}")
-                incident_log["actions_taken"].append(f"notification_failed: {str(e)}")
-        else:
-            logger.info("No notification topic configured, skipping notification")
-            incident_log["actions_taken"].append("notification_skipped")
+                    incident_log["actions_taken"].append("notification_sent")
+                except Exception as e:
+                    logger.warning("notification_failed", extra=log_fields(incident_id=incident["alarm_id"], error=str(e)))
+                    incident_log["actions_taken"].append(f"notification_failed: {str(e)}")
+            elif dispatcher.submit(store, row_id, topic_ocid, message.title, message.body):
+                incident_log["actions_taken"].append("notification_queued")
+            else:
+                # Queue full: recorded as pending and sent by a later invocation
+                incident_log["actions_taken"].append("notification_deferred")
 
-        # Additional response actions based on severity
-        if severity in ["CRITICAL", "ERROR"]:
-            incident_log["actions_taken"].append("incident_escalated")
-            logger.info(f"Critical incident detected - escalation recommended")
+            logger.info("incident_recorded", extra=log_fields(
+                covered_events=covered, **{key: value for key, value in incident_log.items() if key != "context"}
+            ))
 
         # Return response
         result = {
             "status": "success",
-            "incident_id": alarm_id,
+            "events_received": len(events),
+            "incidents": [
+                {
+                    "incident_id": incident["incident_id"],
+                    "state": incident["state"],
+                    "events": incident["events"],
+                    "actions_taken": incident["actions_taken"]
+                }
+                for _, incident, _, _ in incidents
+            ],
             "timestamp": datetime.utcnow().isoformat(),
-            "actions_taken": incident_log["actions_taken"],
-            "message": f"Incident {alarm_id} processed successfully"
+            "message": f"{len(events)} events processed as {len(incidents)} incidents"
         }
 
         return response.Response(
@@ -128,17 +870,16 @@ Alarm ID: {alarm_id}"""
         )
 
     except Exception as e:
-        logger.error(f"Error processing incident: {e}", exc_info=True)
+        logger.error("incident_processing_failed", extra=log_fields(error=str(e)), exc_info=True)
         error_result = {
             "status": "error",
             "error": str(e),
             "timestamp": datetime.utcnow().isoformat()
         }
-        
+
         return response.Response(
             ctx,
             response_data=json.dumps(error_result),
             headers={"Content-Type": "application/json"},
             status_code=500
         )
-
@@ -0,0 +1,343 @@
+"""
+Rate-Limited Auto-Remediation for BharatMart Incidents
+
+Maps firing alarms to remediation actions - instance soft-reset through the
+Compute API, or HTTP hooks such as a cache flush or worker restart - and runs
+them concurrently. Three limits keep many simultaneous alarms from turning
+into a remediation storm:
+- a token bucket per action, limiting how often it runs
+- an idempotency key per (action, target, alarm), remembered for
+  idempotency_ttl, so repeated or re-delivered alarms do not repeat an action
+- a blast-radius cap on the actions started across all alarms within a
+  sliding window
+
+Idempotency keys and the blast-radius window are kept in a SQLite ledger
+shared by invocations; token buckets live in the warm container.
+
+Rules come from a JSON file (see remediation-rules.json). Actions only run
+when the file sets "enabled": true; otherwise they are reported as planned.
+OCI clients are obtained through the get_client callable passed in, so the
+engine runs unchanged against stubbed clients:
+
+    engine = RemediationEngine(rules, get_client=lambda cls: stub, ledger=RemediationLedger(":memory:"))
+    results = engine.run([incident])
+
+Requirements:
+- oci (instance actions only)
+"""
+
+import json
+import time
+import fnmatch
+import hashlib
+import sqlite3
+import threading
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import oci
+
+DEFAULT_RULES_FILE = "remediation-rules.json"
+
+DEFAULT_MAX_CONCURRENT_ACTIONS = 4
+DEFAULT_DEADLINE = 5
+DEFAULT_IDEMPOTENCY_TTL = 1800
+DEFAULT_BLAST_RADIUS = {"max_actions": 5, "window": 600}
+DEFAULT_RATE = {"capacity": 1, "per": 300}
+DEFAULT_HTTP_TIMEOUT = 5
+
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_duration(value: Any) -> float:
+    """Seconds in a duration such as 90, "30s", "10m" or "1h"."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = str(value).strip()
+    if value and value[-1] in DURATION_UNITS:
+        return float(value[:-1]) * DURATION_UNITS[value[-1]]
+    return float(value)
+
+
+class TokenBucket:
+    """Allows capacity runs at once, refilled at one token every per / capacity seconds."""
+
+    def __init__(self, capacity: float, per: float):
+        self.capacity = capacity
+        self.rate = capacity / per
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class RemediationLedger:
+    """
+    Idempotency keys and recent action starts, in a SQLite table.
+    
+    claim() checks both limits and records the start in one transaction, so
+    concurrent invocations cannot both pass the blast-radius cap or both run
+    the same action.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn: Optional[sqlite3.Connection] = None
+        self.lock = threading.Lock()
+
+    def connect(self) -> sqlite3.Connection:
+        """Open the ledger, creating its table on first use."""
+        if self.conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS remediations ("
+                " key TEXT PRIMARY KEY, action TEXT NOT NULL, target TEXT NOT NULL,"
+                " started_at REAL NOT NULL, status TEXT NOT NULL, detail TEXT)"
+            )
+            self.conn = conn
+        return self.conn
+
+    def claim(self, key: str, action: str, target: str, ttl: float, max_actions: int, window: float) -> str:
+        """
+        Reserve an action run.
+        
+        Returns:
+            "claimed", "duplicate" (same key within ttl) or
+            "blast_radius_exceeded" (max_actions already started within window)
+        """
+        now = time.time()
+        with self.lock:
+            conn = self.connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM remediations WHERE started_at < ?", (now - max(ttl, window),))
+                row = conn.execute("SELECT started_at FROM remediations WHERE key = ?", (key,)).fetchone()
+                if row is not None and now - row[0] < ttl:
+                    verdict = "duplicate"
+                elif conn.execute(
+                    "SELECT COUNT(*) FROM remediations WHERE started_at >= ?", (now - window,)
+                ).fetchone()[0] >= max_actions:
+                    verdict = "blast_radius_exceeded"
+                else:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO remediations VALUES (?, ?, ?, ?, 'running', NULL)",
+                        (key, action, target, now)
+                    )
+                    verdict = "claimed"
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return verdict
+
+    def release(self, key: str) -> None:
+        """Forget a claim whose action did not start."""
+        with self.lock:
+            self.connect().execute("DELETE FROM remediations WHERE key = ?", (key,))
+
+    def finish(self, key: str, status: str, detail: str) -> None:
+        with self.lock:
+            self.connect().execute(
+                "UPDATE remediations SET status = ?, detail = ? WHERE key = ?", (status, detail, key)
+            )
+
+
+def instance_targets(settings: Dict[str, Any], incident: Dict[str, Any]) -> List[str]:
+    """Instances named by the alarm's dimensions, plus any configured instance_ids."""
+    resources = [r for r in incident.get("resources", []) if r.startswith("ocid1.instance.")]
+    return sorted(set(resources) | set(settings.get("instance_ids", [])))
+
+
+def run_instance_action(get_client: Callable[[Any], Any], settings: Dict[str, Any], target: str, incident: Dict[str, Any]) -> str:
+    """Send a power action (default SOFTRESET) to one instance."""
+    instance = get_client(oci.core.ComputeClient).instance_action(target, settings.get("action", "SOFTRESET")).data
+    return f"{instance.display_name}: {instance.lifecycle_state}"
+
+
+def http_targets(settings: Dict[str, Any], incident: Dict[str, Any]) -> List[str]:
+    return [settings["url"]]
+
+
+def run_http_hook(get_client: Callable[[Any], Any], settings: Dict[str, Any], target: str, incident: Dict[str, Any]) -> str:
+    """Call an operator-provided hook (cache flush, worker restart, ...) with the alarm as JSON."""
+    body = json.dumps({
+        "alarm_id": incident["alarm_id"],
+        "alarm_name": incident["alarm_name"],
+        "severity": incident["severity"]
+    }).encode("utf-8")
+    request = urllib.request.Request(
+        target,
+        data=body,
+        method=settings.get("method", "POST"),
+        headers={"Content-Type": "application/json", **settings.get("headers", {})}
+    )
+    with urllib.request.urlopen(request, timeout=settings.get("timeout", DEFAULT_HTTP_TIMEOUT)) as hook_response:
+        return f"HTTP {hook_response.status}"
+
+
+# Action type -> (targets of an incident, run one target). Register new types here.
+ACTION_TYPES: Dict[str, Tuple[Callable[..., List[str]], Callable[..., str]]] = {
+    "instance_action": (instance_targets, run_instance_action),
+    "http": (http_targets, run_http_hook),
+}
+
+
+def load_rules(path: str) -> Dict[str, Any]:
+    """Read a rules file; a missing file means no remediation."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+class RemediationEngine:
+    """
+    Matches incidents to actions and runs them under the rate, idempotency
+    and blast-radius limits.
+    
+    Rules file layout:
+    
+        {
+            "enabled": true,
+            "max_concurrent_actions": 4,
+            "deadline": 5,
+            "idempotency_ttl": "30m",
+            "blast_radius": {"max_actions": 5, "window": "10m"},
+            "actions": {
+                "soft_reset_instance": {"type": "instance_action", "action": "SOFTRESET",
+                                        "rate": {"capacity": 2, "per": "10m"}}
+            },
+            "rules": [
+                {"alarm_name": "*unreachable*", "severity": ["CRITICAL"], "actions": ["soft_reset_instance"]}
+            ]
+        }
+    
+    alarm_name is a case-insensitive glob; a rule without severity matches
+    every severity. Only FIRING incidents are remediated.
+    """
+
+    def __init__(
+        self,
+        rules: Dict[str, Any],
+        get_client: Callable[[Any], Any],
+        ledger: RemediationLedger,
+        executor: Optional[ThreadPoolExecutor] = None
+    ):
+        self.enabled = bool(rules.get("enabled", False))
+        self.deadline = parse_duration(rules.get("deadline", DEFAULT_DEADLINE))
+        self.idempotency_ttl = parse_duration(rules.get("idempotency_ttl", DEFAULT_IDEMPOTENCY_TTL))
+        blast_radius = {**DEFAULT_BLAST_RADIUS, **rules.get("blast_radius", {})}
+        self.max_actions = int(blast_radius["max_actions"])
+        self.window = parse_duration(blast_radius["window"])
+        self.actions: Dict[str, Dict[str, Any]] = rules.get("actions", {})
+        self.rules: List[Dict[str, Any]] = rules.get("rules", [])
+        self.get_client = get_client
+        self.ledger = ledger
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=int(rules.get("max_concurrent_actions", DEFAULT_MAX_CONCURRENT_ACTIONS)),
+            thread_name_prefix="remediate"
+        )
+        self.buckets = {
+            name: TokenBucket(
+                float(settings.get("rate", DEFAULT_RATE).get("capacity", 1)),
+                parse_duration(settings.get("rate", DEFAULT_RATE).get("per", DEFAULT_RATE["per"]))
+            )
+            for name, settings in self.actions.items()
+        }
+        for name, settings in self.actions.items():
+            if settings.get("type") not in ACTION_TYPES:
+                raise ValueError(f"action {name!r} has unknown type {settings.get('type')!r}")
+
+    def plan(self, incident: Dict[str, Any]) -> List[Tuple[str, str]]:
+        """(action name, target) pairs the rules select for an incident."""
+        if incident.get("state") != "FIRING":
+            return []
+        planned = []
+        alarm_name = str(incident.get("alarm_name", "")).lower()
+        for rule in self.rules:
+            if not fnmatch.fnmatch(alarm_name, str(rule.get("alarm_name", "*")).lower()):
+                continue
+            if rule.get("severity") and incident.get("severity") not in rule["severity"]:
+                continue
+            for name in rule.get("actions", []):
+                settings = self.actions.get(name)
+                if settings is None:
+                    continue
+                targets, _ = ACTION_TYPES[settings["type"]]
+                planned.extend((name, target) for target in targets(settings, incident))
+        # A target matched by several rules runs once
+        return list(dict.fromkeys(planned))
+
+    def idempotency_key(self, name: str, target: str, incident: Dict[str, Any]) -> str:
+        return hashlib.sha256(f"{name}\0{target}\0{incident['alarm_id']}".encode("utf-8")).hexdigest()[:32]
+
+    def execute(self, name: str, target: str, incident: Dict[str, Any]) -> str:
+        settings = self.actions[name]
+        _, run = ACTION_TYPES[settings["type"]]
+        return run(self.get_client, settings, target, incident)
+
+    def run(self, incidents: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Remediate a batch of incidents concurrently, waiting up to the deadline.
+        
+        Returns:
+            {alarm ID: [{"action", "target", "status", "detail"}]}, where status
+            is planned (engine disabled), duplicate, rate_limited,
+            blast_radius_exceeded, executed, failed or running (still going
+            at the deadline; the ledger records the outcome)
+        """
+        results: Dict[str, List[Dict[str, Any]]] = {}
+        futures: Dict[Future, Dict[str, Any]] = {}
+
+        for incident in incidents:
+            for name, target in self.plan(incident):
+                result = {"action": name, "target": target, "status": "planned", "detail": ""}
+                results.setdefault(incident["alarm_id"], []).append(result)
+                if not self.enabled:
+                    continue
+
+                key = self.idempotency_key(name, target, incident)
+                verdict = self.ledger.claim(key, name, target, self.idempotency_ttl, self.max_actions, self.window)
+                if verdict != "claimed":
+                    result["status"] = verdict
+                    continue
+                if not self.buckets[name].try_acquire():
+                    self.ledger.release(key)
+                    result["status"] = "rate_limited"
+                    continue
+
+                future = self.executor.submit(self.execute, name, target, incident)
+                future.add_done_callback(lambda f, key=key: self.record_outcome(key, f))
+                futures[future] = result
+
+        wait(futures, timeout=self.deadline)
+        for future, result in futures.items():
+            if not future.done():
+                result["status"] = "running"
+            elif future.exception() is not None:
+                result.update(status="failed", detail=str(future.exception()))
+            else:
+                result.update(status="executed", detail=future.result())
+        return results
+
+    def record_outcome(self, key: str, future: Future) -> None:
+        """Store an action's final status in the ledger once it completes."""
+        error = future.exception()
+        try:
+            if error is not None:
+                self.ledger.finish(key, "failed", str(error))
+            else:
+                self.ledger.finish(key, "executed", str(future.result()))
+        except sqlite3.Error:
+            pass
@@ -0,0 +1,158 @@
+"""
+Tests for the remediation engine against a stubbed Compute client.
+
+Run from this directory:
+    python -m unittest test_remediation
+"""
+
+import threading
+import unittest
+from types import SimpleNamespace
+
+import oci
+
+from remediation import RemediationEngine, RemediationLedger
+
+
+class StubComputeClient:
+    """Records instance_action calls; optionally blocks until released."""
+
+    def __init__(self, release: threading.Event = None):
+        self.calls = []
+        self.release = release
+        self.lock = threading.Lock()
+
+    def instance_action(self, instance_id, action):
+        with self.lock:
+            self.calls.append((instance_id, action))
+        if self.release is not None:
+            self.release.wait(5)
+        return SimpleNamespace(data=SimpleNamespace(display_name=instance_id.rsplit(".", 1)[-1], lifecycle_state="RUNNING"))
+
+
+def make_rules(enabled=True, capacity=10, max_actions=10, deadline=2):
+    return {
+        "enabled": enabled,
+        "deadline": deadline,
+        "idempotency_ttl": "30m",
+        "blast_radius": {"max_actions": max_actions, "window": "10m"},
+        "actions": {
+            "soft_reset_instance": {
+                "type": "instance_action",
+                "action": "SOFTRESET",
+                "rate": {"capacity": capacity, "per": "1h"}
+            }
+        },
+        "rules": [
+            {"alarm_name": "*unreachable*", "severity": ["CRITICAL"], "actions": ["soft_reset_instance"]}
+        ]
+    }
+
+
+def make_incident(alarm_id, *instances, state="FIRING"):
+    return {
+        "alarm_id": alarm_id,
+        "alarm_name": "BharatMart instance unreachable",
+        "severity": "CRITICAL",
+        "state": state,
+        "resources": [f"ocid1.instance.oc1..{name}" for name in instances]
+    }
+
+
+class RemediationEngineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.compute = StubComputeClient()
+        self.ledger = RemediationLedger(":memory:")
+        self.engines = []
+
+    def tearDown(self):
+        if self.compute.release is not None:
+            self.compute.release.set()
+        for engine in self.engines:
+            engine.executor.shutdown(wait=True)
+
+    def make_engine(self, **rules):
+        def get_client(client_class):
+            self.assertIs(client_class, oci.core.ComputeClient)
+            return self.compute
+        engine = RemediationEngine(make_rules(**rules), get_client=get_client, ledger=self.ledger)
+        self.engines.append(engine)
+        return engine
+
+    def statuses(self, results, alarm_id):
+        return [result["status"] for result in results[alarm_id]]
+
+    def test_executed(self):
+        results = self.make_engine().run([make_incident("alarm-1", "web1")])
+
+        self.assertEqual(results["alarm-1"], [{
+            "action": "soft_reset_instance",
+            "target": "ocid1.instance.oc1..web1",
+            "status": "executed",
+            "detail": "web1: RUNNING"
+        }])
+        self.assertEqual(self.compute.calls, [("ocid1.instance.oc1..web1", "SOFTRESET")])
+
+    def test_duplicate_alarm_does_not_repeat_action(self):
+        engine = self.make_engine()
+        engine.run([make_incident("alarm-1", "web1")])
+        results = engine.run([make_incident("alarm-1", "web1")])
+
+        self.assertEqual(self.statuses(results, "alarm-1"), ["duplicate"])
+        self.assertEqual(len(self.compute.calls), 1)
+
+    def test_rate_limited(self):
+        results = self.make_engine(capacity=1).run([
+            make_incident("alarm-1", "web1"),
+            make_incident("alarm-2", "web2")
+        ])
+
+        self.assertEqual(self.statuses(results, "alarm-1"), ["executed"])
+        self.assertEqual(self.statuses(results, "alarm-2"), ["rate_limited"])
+        self.assertEqual(len(self.compute.calls), 1)
+
+    def test_rate_limited_claim_is_released(self):
+        engine = self.make_engine(capacity=1)
+        engine.run([make_incident("alarm-1", "web1"), make_incident("alarm-2", "web2")])
+        engine.buckets["soft_reset_instance"].tokens = 1
+        results = engine.run([make_incident("alarm-2", "web2")])
+
+        self.assertEqual(self.statuses(results, "alarm-2"), ["executed"])
+
+    def test_blast_radius_exceeded(self):
+        results = self.make_engine(max_actions=2).run([make_incident("alarm-1", "web1", "web2", "web3", "web4")])
+
+        self.assertEqual(
+            self.statuses(results, "alarm-1"),
+            ["executed", "executed", "blast_radius_exceeded", "blast_radius_exceeded"]
+        )
+        self.assertEqual(len(self.compute.calls), 2)
+
+    def test_running_at_deadline_is_recorded_when_done(self):
+        self.compute.release = threading.Event()
+        engine = self.make_engine(deadline=0.1)
+        results = engine.run([make_incident("alarm-1", "web1")])
+
+        self.assertEqual(self.statuses(results, "alarm-1"), ["running"])
+
+        self.compute.release.set()
+        engine.executor.shutdown(wait=True)
+        row = self.ledger.connect().execute("SELECT status, detail FROM remediations").fetchone()
+        self.assertEqual(row, ("executed", "web1: RUNNING"))
+
+    def test_disabled_engine_only_plans(self):
+        results = self.make_engine(enabled=False).run([make_incident("alarm-1", "web1")])
+
+        self.assertEqual(self.statuses(results, "alarm-1"), ["planned"])
+        self.assertEqual(self.compute.calls, [])
+
+    def test_only_firing_incidents_are_remediated(self):
+        results = self.make_engine().run([make_incident("alarm-1", "web1", state="OK")])
+
+        self.assertEqual(results, {})
+        self.assertEqual(self.compute.calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
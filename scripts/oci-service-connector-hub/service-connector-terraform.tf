@@ -51,6 +51,18 @@ variable "monitoring_namespace" {
   default     = "oci_computeagent"
 }
 
+variable "batch_size_in_kbs" {
+  description = "Maximum size of an event batch delivered to the function in one invocation"
+  type        = number
+  default     = 5120
+}
+
+variable "batch_time_in_sec" {
+  description = "Maximum time events are buffered before a batch is delivered"
+  type        = number
+  default     = 60
+}
+
 variable "description" {
   description = "Description for the service connector"
   type        = string
@@ -79,6 +91,11 @@ resource "oci_sch_service_connector" "incident_response_connector" {
     function_target_details {
       function_id = oci_functions_function.incident_response_function.id
     }
+
+    # Deliver alarm events in batches; the function coalesces and
+    # deduplicates each batch, so a storm costs few invocations
+    batch_size_in_kbs = var.batch_size_in_kbs
+    batch_time_in_sec = var.batch_time_in_sec
   }
 
   freeform_tags = {
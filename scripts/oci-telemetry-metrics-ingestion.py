@@ -7,26 +7,49 @@ and posts them to OCI Monitoring as custom metrics.
 
 Requirements:
 - OCI Python SDK installed: pip install oci
+- NumPy installed: pip install numpy
 - OCI configuration file: ~/.oci/config
 - BharatMart application running and exposing metrics at /metrics endpoint
 
 Usage:
     python3 scripts/oci-telemetry-metrics-ingestion.py
+    python3 scripts/oci-telemetry-metrics-ingestion.py --interval 60   # daemon mode
+    python3 scripts/oci-telemetry-metrics-ingestion.py --targets-file targets.txt --interval 60
 
 Configuration:
     Set environment variables or modify script variables:
     - COMPARTMENT_OCID: OCI Compartment OCID
     - METRICS_ENDPOINT: BharatMart metrics endpoint URL (default: http://localhost:3000/metrics)
     - NAMESPACE: OCI Monitoring namespace (default: custom.bharatmart)
+    - INGESTION_STATE_FILE: Counter state file used to publish per-interval
+      increases and rates (default: ~/.oci/bharatmart-ingestion-state.json)
+    - INGESTION_SPOOL_DIR: Spool for batches that fail to post during an OCI
+      outage, replayed once it recovers (default: ~/.oci/bharatmart-spool)
+    - INGESTION_ANOMALY_STATE_FILE: Per-series baselines of the anomaly
+      detection stage (default: ~/.oci/bharatmart-anomaly-state.npz)
 """
 
 import os
 import sys
+import codecs
+import mmap
+import struct
+import zlib
+import hashlib
+import json
+import math
+import random
+import signal
+import threading
+import time
+import numpy as np
 import oci
 import requests
 import re
-from datetime import datetime
-from typing import Dict, List, Optional, Any
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed
+from urllib.parse import urlsplit
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Any, Tuple, Union
 import argparse
 import logging
 
@@ -44,8 +67,188 @@ NAMESPACE = os.getenv('OCI_METRICS_NAMESPACE', 'custom.bharatmart')
 OCI_CONFIG_FILE = os.getenv('OCI_CONFIG_FILE', '~/.oci/config')
 OCI_PROFILE = os.getenv('OCI_PROFILE', 'DEFAULT')
 
+# Bytes read from the /metrics response per parser iteration
+SCRAPE_CHUNK_SIZE = 64 * 1024
+SCRAPE_TIMEOUT = 10
 
-def parse_prometheus_metrics(prometheus_text: str) -> Dict[str, Any]:
+# Keep-alive connections held by the scrape session and targets scraped at once
+HTTP_POOL_SIZE = 4
+DEFAULT_SCRAPE_WORKERS = 8
+
+# PostMetricData limits: metric streams and payload size per request
+MAX_STREAMS_PER_REQUEST = 50
+MAX_REQUEST_BYTES = 1024 * 1024
+
+# Counter state for increase/rate conversion; series unseen this long are dropped
+COUNTER_STATE_FILE = os.getenv('INGESTION_STATE_FILE', '~/.oci/bharatmart-ingestion-state.json')
+COUNTER_STATE_MAX_AGE = 3600
+
+# Quantiles published for every histogram, from per-interval bucket deltas
+HISTOGRAM_QUANTILES = (0.5, 0.95, 0.99)
+
+# Series published per metric before the rest is folded into "other"
+DEFAULT_SERIES_BUDGET = 1000
+
+# Local spool for batches that fail to post, replayed once OCI recovers
+SPOOL_DIR = os.getenv('INGESTION_SPOOL_DIR', '~/.oci/bharatmart-spool')
+SPOOL_MAX_BYTES = 64 * 1024 * 1024
+SPOOL_SEGMENT_BYTES = 4 * 1024 * 1024
+SPOOL_REPLAY_BATCHES = 20
+# OCI rejects datapoints older than 2 hours; keep a margin for the replay itself
+SPOOL_MAX_AGE = 2 * 3600 - 300
+
+# Online anomaly detection: per-series EWMA baseline kept between runs
+ANOMALY_STATE_FILE = os.getenv('INGESTION_ANOMALY_STATE_FILE', '~/.oci/bharatmart-anomaly-state.npz')
+ANOMALY_ALPHA = 0.05
+ANOMALY_THRESHOLD = 5.0
+ANOMALY_WARMUP_SAMPLES = 20
+ANOMALY_STATE_MAX_AGE = 3600
+
+# Upload concurrency and retry policy for throttled (429) and 5xx responses
+DEFAULT_UPLOAD_WORKERS = 4
+DEFAULT_MAX_RETRIES = 4
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 10.0
+
+
+# Prometheus text exposition format: name{labels} value [timestamp]
+# Example: http_requests_total{method="GET",route="/api/products",status_code="200"} 42
+SAMPLE_LINE_RE = re.compile(
+    r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)(?:\s+(-?\d+))?$'
+)
+LABEL_PAIR_RE = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)\s*=\s*"((?:[^"\\]|\\.)*)"')
+
+# Sorted ((key, value), ...) tuple - hashable, so it doubles as the series key
+LabelSet = Tuple[Tuple[str, str], ...]
+
+
+class PrometheusSample(NamedTuple):
+    """A single parsed sample line."""
+    name: str
+    labels: LabelSet
+    value: float
+
+
+def iter_prometheus_lines(chunks: Iterable[Union[bytes, str]]) -> Iterator[str]:
+    """
+    Reassemble lines from an iterable of text or byte chunks.
+    
+    Chunks may split lines (and UTF-8 sequences) at arbitrary offsets, which is
+    what requests' Response.iter_content() produces.
+    
+    Args:
+        chunks: Iterable of bytes or str chunks
+        
+    Yields:
+        Complete lines without the trailing newline
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    pending = ''
+    
+    for chunk in chunks:
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk)
+        if not chunk:
+            continue
+        
+        lines = (pending + chunk).split('\n')
+        pending = lines.pop()
+        yield from lines
+    
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+
+def iter_prometheus_samples(
+    lines: Iterable[str],
+    extra_labels: LabelSet = ()
+) -> Iterator[PrometheusSample]:
+    """
+    Parse Prometheus exposition lines into compact sample records.
+    
+    Metric names are interned, (key, value) label pairs are shared across
+    series and identical label strings are parsed only once, so repeated
+    series share storage.
+    
+    Args:
+        lines: Iterable of exposition lines
+        extra_labels: Labels added to every sample (e.g. the scrape target's
+            instance), replacing exported labels with the same key
+        
+    Yields:
+        PrometheusSample records
+    """
+    extra_keys = {key for key, _ in extra_labels}
+    label_cache: Dict[str, LabelSet] = {}
+    pair_cache: Dict[Tuple[str, str], Tuple[str, str]] = {}
+    share_pair = pair_cache.setdefault
+    find_label_pairs = LABEL_PAIR_RE.findall
+    match_line = SAMPLE_LINE_RE.match
+    intern = sys.intern
+    
+    for line in lines:
+        line = line.strip()
+        
+        # Skip comments and empty lines
+        if not line or line[0] == '#':
+            continue
+        
+        match = match_line(line)
+        if not match:
+            continue
+        
+        metric_name, labels_str, value_str, _ = match.groups()
+        try:
+            value = float(value_str)
+        except ValueError:
+            continue
+        
+        if not labels_str:
+            labels: LabelSet = extra_labels
+        else:
+            labels = label_cache.get(labels_str)
+            if labels is None:
+                pairs = find_label_pairs(labels_str)
+                if extra_keys:
+                    pairs = [pair for pair in pairs if pair[0] not in extra_keys]
+                    pairs.extend(extra_labels)
+                labels = tuple(sorted(map(share_pair, pairs, pairs)))
+                label_cache[labels_str] = labels
+        
+        yield PrometheusSample(intern(metric_name), labels, value)
+
+
+def parse_prometheus_stream(
+    chunks: Iterable[Union[bytes, str]],
+    extra_labels: LabelSet = ()
+) -> Dict[str, Dict[LabelSet, float]]:
+    """
+    Parse a Prometheus /metrics body incrementally.
+    
+    Consumes chunks as they arrive (e.g. response.iter_content()), so the full
+    body is never held in memory. Memory use scales with the number of unique
+    series; a series repeated in the body keeps its last value.
+    
+    Args:
+        chunks: Iterable of bytes or str chunks of the exposition body
+        extra_labels: Sorted labels added to every sample
+        
+    Returns:
+        Dictionary mapping metric names to {label set: value}
+    """
+    metrics: Dict[str, Dict[LabelSet, float]] = {}
+    
+    for sample in iter_prometheus_samples(iter_prometheus_lines(chunks), extra_labels):
+        series = metrics.get(sample.name)
+        if series is None:
+            series = metrics[sample.name] = {}
+        series[sample.labels] = sample.value
+    
+    return metrics
+
+
+def parse_prometheus_metrics(prometheus_text: str) -> Dict[str, Dict[LabelSet, float]]:
     """
     Parse Prometheus format metrics from /metrics endpoint.
     
@@ -58,208 +261,1578 @@ def parse_prometheus_metrics(prometheus_text: str) -> Dict[str, Any]:
         prometheus_text: Raw Prometheus metrics text
         
     Returns:
-        Dictionary mapping metric names to their values and labels
+        Dictionary mapping metric names to {label set: value}
     """
-    metrics = {}
-    current_metric = None
-    current_labels = {}
+    return parse_prometheus_stream((prometheus_text,))
+
+
+class UploadReport(NamedTuple):
+    """Outcome of one post_metrics_to_oci() call."""
+    batches_succeeded: int
+    batches_failed: int
+    metrics_posted: int
+    metrics_failed: int
+    # Batches that exhausted their retries, kept so callers can resubmit them
+    failed_batches: List[List[oci.monitoring.models.MetricDataDetails]]
     
-    for line in prometheus_text.split('\n'):
-        line = line.strip()
+    @property
+    def ok(self) -> bool:
+        return self.batches_failed == 0 and self.metrics_failed == 0
+
+
+def estimate_metric_size(metric: oci.monitoring.models.MetricDataDetails) -> int:
+    """Rough upper bound of the serialized JSON size of one metric stream."""
+    size = 128 + len(metric.name) + len(metric.namespace) + len(metric.compartment_id)
+    for key, value in (metric.dimensions or {}).items():
+        size += len(key) + len(value) + 8
+    return size + 64 * len(metric.datapoints or ())
+
+
+def chunk_metrics(
+    metrics_data: List[oci.monitoring.models.MetricDataDetails],
+    max_streams: int = MAX_STREAMS_PER_REQUEST,
+    max_bytes: int = MAX_REQUEST_BYTES
+) -> List[List[oci.monitoring.models.MetricDataDetails]]:
+    """
+    Split metrics into batches PostMetricData will accept.
+    
+    Args:
+        metrics_data: Metrics to post
+        max_streams: Maximum metric streams per batch
+        max_bytes: Maximum estimated payload bytes per batch
         
-        # Skip comments and empty lines
-        if not line or line.startswith('#'):
-            continue
+    Returns:
+        List of batches, in input order
+    """
+    batches = []
+    batch = []
+    batch_bytes = 0
+    
+    for metric in metrics_data:
+        size = estimate_metric_size(metric)
+        if batch and (len(batch) >= max_streams or batch_bytes + size > max_bytes):
+            batches.append(batch)
+            batch = []
+            batch_bytes = 0
+        batch.append(metric)
+        batch_bytes += size
+    
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """True for throttling (429), server-side (5xx) and transport errors."""
+    if isinstance(error, oci.exceptions.ServiceError):
+        return error.status == 429 or error.status >= 500
+    return isinstance(error, (oci.exceptions.RequestException, oci.exceptions.ConnectTimeout))
+
+
+def backoff_delay(attempt: int, base: float = RETRY_BASE_DELAY, cap: float = RETRY_MAX_DELAY) -> float:
+    """Full-jitter exponential backoff for the given retry attempt (0-based)."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def post_metric_batch(
+    monitoring_client: oci.monitoring.MonitoringClient,
+    batch: List[oci.monitoring.models.MetricDataDetails],
+    max_retries: int = DEFAULT_MAX_RETRIES
+) -> int:
+    """
+    Post one batch, retrying throttled and 5xx responses with jittered backoff.
+    
+    Args:
+        monitoring_client: OCI Monitoring client (telemetry-ingestion endpoint)
+        batch: Metrics to post in a single PostMetricData call
+        max_retries: Retries after the first attempt
         
-        # Parse metric line: name{labels} value [timestamp]
-        # Example: http_requests_total{method="GET",route="/api/products",status_code="200"} 42
-        match = re.match(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{([^}]+)\})?\s+([\d.]+)(?:\s+(\d+))?$', line)
-        if match:
-            metric_name = match.group(1)
-            labels_str = match.group(2) if match.group(2) else ""
-            value = float(match.group(3))
-            
-            # Parse labels
-            labels = {}
-            if labels_str:
-                # Split by comma, handle quoted values
-                label_pattern = r'([a-zA-Z_][a-zA-Z0-9_]*)\s*=\s*"([^"]*)"'
-                for label_match in re.finditer(label_pattern, labels_str):
-                    key = label_match.group(1)
-                    val = label_match.group(2)
-                    labels[key] = val
-            
-            # Store metric with full name including labels as key
-            metric_key = f"{metric_name}"
-            if metric_key not in metrics:
-                metrics[metric_key] = []
-            
-            metrics[metric_key].append({
-                'value': value,
-                'labels': labels,
-                'name': metric_name
-            })
+    Returns:
+        Number of metrics OCI reported as failed inside an accepted batch
+        
+    Raises:
+        The last error once retries are exhausted or the error is not retryable
+    """
+    details = oci.monitoring.models.PostMetricDataDetails(metric_data=batch)
     
-    return metrics
+    for attempt in range(max_retries + 1):
+        try:
+            # Retries are handled here, so disable the SDK's own retry strategy
+            response = monitoring_client.post_metric_data(
+                post_metric_data_details=details,
+                retry_strategy=oci.retry.NoneRetryStrategy()
+            )
+            failed = response.data.failed_metrics_count or 0
+            if failed:
+                logger.warning(f"OCI rejected {failed} of {len(batch)} metrics: {response.data.failed_metrics}")
+            return failed
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable_error(e):
+                raise
+            delay = backoff_delay(attempt)
+            logger.debug(f"Retrying batch of {len(batch)} metrics in {delay:.2f}s after: {e}")
+            time.sleep(delay)
 
 
 def post_metrics_to_oci(
     monitoring_client: oci.monitoring.MonitoringClient,
     compartment_id: str,
     namespace: str,
-    metrics_data: List[Dict[str, Any]]
-) -> bool:
+    metrics_data: List[oci.monitoring.models.MetricDataDetails],
+    batch_size: int = MAX_STREAMS_PER_REQUEST,
+    max_workers: int = DEFAULT_UPLOAD_WORKERS,
+    max_retries: int = DEFAULT_MAX_RETRIES
+) -> UploadReport:
     """
-    Post metrics to OCI Monitoring.
+    Post metrics to OCI Monitoring in size-bounded batches.
+    
+    Batches are sent concurrently from a bounded thread pool sharing the one
+    client. At most max_workers batches are queued ahead of the pool, so a
+    large payload does not build up an unbounded backlog of pending requests.
+    A failing batch does not affect the others.
     
     Args:
         monitoring_client: OCI Monitoring client
         compartment_id: OCI Compartment OCID
         namespace: OCI Monitoring namespace
-        metrics_data: List of metric data dictionaries
+        metrics_data: List of MetricDataDetails to post
+        batch_size: Maximum metric streams per PostMetricData call
+        max_workers: Concurrent PostMetricData calls
+        max_retries: Retries per batch for throttled/5xx responses
         
     Returns:
-        True if successful, False otherwise
+        UploadReport with per-batch success and failure counts
     """
     if not metrics_data:
         logger.warning("No metrics to post")
-        return False
+        return UploadReport(0, 0, 0, 0, [])
     
-    try:
-        post_metric_data_details = oci.monitoring.models.PostMetricDataDetails(
-            metric_data=metrics_data
-        )
+    batches = chunk_metrics(metrics_data, max_streams=min(batch_size, MAX_STREAMS_PER_REQUEST))
+    slots = threading.BoundedSemaphore(max_workers * 2)
+    batches_succeeded = metrics_posted = metrics_failed = 0
+    failed_batches = []
+    
+    def send(batch):
+        try:
+            return post_metric_batch(monitoring_client, batch, max_retries)
+        finally:
+            slots.release()
+    
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='oci-upload') as executor:
+        futures = {}
+        for batch in batches:
+            slots.acquire()
+            futures[executor.submit(send, batch)] = batch
         
-        response = monitoring_client.post_metric_data(
-            post_metric_data_details=post_metric_data_details,
-            compartment_id=compartment_id
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                failed = future.result()
+            except Exception as e:
+                logger.error(f"Error posting batch of {len(batch)} metrics to OCI: {e}")
+                failed_batches.append(batch)
+                metrics_failed += len(batch)
+                continue
+            batches_succeeded += 1
+            metrics_posted += len(batch) - failed
+            metrics_failed += failed
+    
+    report = UploadReport(
+        batches_succeeded=batches_succeeded,
+        batches_failed=len(failed_batches),
+        metrics_posted=metrics_posted,
+        metrics_failed=metrics_failed,
+        failed_batches=failed_batches
+    )
+    logger.info(
+        f"Posted {metrics_posted}/{len(metrics_data)} metrics to {namespace} "
+        f"({batches_succeeded}/{len(batches)} batches succeeded)"
+    )
+    return report
+
+
+def encode_batch(batch: List[oci.monitoring.models.MetricDataDetails]) -> bytes:
+    """Serialize a batch compactly for the spool."""
+    return json.dumps([
+        [
+            metric.namespace,
+            metric.compartment_id,
+            metric.name,
+            metric.dimensions or {},
+            [[dp.timestamp.replace(tzinfo=timezone.utc).timestamp(), dp.value] for dp in metric.datapoints]
+        ]
+        for metric in batch
+    ], separators=(',', ':')).encode('utf-8')
+
+
+def decode_batch(payload: bytes) -> List[oci.monitoring.models.MetricDataDetails]:
+    """Rebuild a batch written by encode_batch()."""
+    return [
+        oci.monitoring.models.MetricDataDetails(
+            namespace=namespace,
+            compartment_id=compartment_id,
+            name=name,
+            dimensions=dimensions,
+            datapoints=[
+                oci.monitoring.models.Datapoint(timestamp=datetime.utcfromtimestamp(ts), value=value)
+                for ts, value in datapoints
+            ]
         )
+        for namespace, compartment_id, name, dimensions, datapoints in json.loads(payload)
+    ]
+
+
+class MetricSpool:
+    """
+    Append-only on-disk queue of batches that could not be posted.
+    
+    Batches are appended as length-prefixed, CRC-checked records to segment
+    files of up to segment_bytes. Since failures are appended as they happen,
+    records are in timestamp order, and replay() drains them first-in
+    first-out from a persisted cursor, reading segments through mmap. Fully
+    replayed segments are deleted. When the spool exceeds max_bytes the
+    oldest segments are evicted, replayed or not. Records older than
+    max_age seconds, which OCI would reject, are skipped at replay.
+    
+    A record torn by a crash mid-append fails its length or CRC check and
+    ends that segment; on open, the newest segment is truncated back to its
+    last intact record so that new appends are not stranded behind it.
+    segment_bytes is capped at max_bytes, as the segment being appended to
+    is never evicted.
+    """
+    
+    RECORD_HEADER = struct.Struct('<IId')  # payload length, CRC32, oldest datapoint timestamp
+    SEGMENT_SUFFIX = '.spool'
+    CURSOR_FILE = 'cursor.json'
+    
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = SPOOL_MAX_BYTES,
+        segment_bytes: int = SPOOL_SEGMENT_BYTES,
+        max_age: float = SPOOL_MAX_AGE
+    ):
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        self.segment_bytes = min(segment_bytes, max_bytes)
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self.cursor = self._load_cursor()
+        self._repair_tail()
+    
+    def _segments(self) -> List[str]:
+        """Segment file names, oldest first (names sort by creation)."""
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(self.SEGMENT_SUFFIX))
+    
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+    
+    def _load_cursor(self) -> Tuple[Optional[str], int]:
+        try:
+            with open(self._path(self.CURSOR_FILE), encoding='utf-8') as f:
+                cursor = json.load(f)
+            return cursor['segment'], int(cursor['offset'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None, 0
+    
+    def _save_cursor(self) -> None:
+        tmp_path = self._path(f"{self.CURSOR_FILE}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'segment': self.cursor[0], 'offset': self.cursor[1]}, f)
+        os.replace(tmp_path, self._path(self.CURSOR_FILE))
+    
+    def _repair_tail(self) -> None:
+        """Truncate the newest segment after its last intact record."""
+        segments = self._segments()
+        if not segments:
+            return
+        name = segments[-1]
+        end = 0
+        for end, _, _ in self._records(name, 0):
+            pass
+        size = os.path.getsize(self._path(name))
+        if end < size:
+            logger.warning(f"Truncating {size - end} bytes of torn or corrupt spool records from {name}")
+            os.truncate(self._path(name), end)
+    
+    def pending_bytes(self) -> int:
+        """Bytes on disk not yet replayed (approximate: includes the cursor's segment head)."""
+        return sum(os.path.getsize(self._path(name)) for name in self._segments())
+    
+    def append(self, batch: List[oci.monitoring.models.MetricDataDetails]) -> None:
+        """Durably append one batch, rotating segments and evicting the oldest."""
+        payload = encode_batch(batch)
+        oldest = min(
+            (dp.timestamp.replace(tzinfo=timezone.utc).timestamp() for metric in batch for dp in metric.datapoints),
+            default=time.time()
+        )
+        record = self.RECORD_HEADER.pack(len(payload), zlib.crc32(payload), oldest) + payload
+        
+        with self.lock:
+            segments = self._segments()
+            if segments and os.path.getsize(self._path(segments[-1])) + len(record) <= self.segment_bytes:
+                name = segments[-1]
+            else:
+                name = f"{time.time_ns():020d}{self.SEGMENT_SUFFIX}"
+                segments.append(name)
+            with open(self._path(name), 'ab') as f:
+                f.write(record)
+                f.flush()
+                os.fsync(f.fileno())
+            self._evict(segments)
+    
+    def _evict(self, segments: List[str]) -> None:
+        """Delete the oldest segments until the spool fits in max_bytes."""
+        sizes = {name: os.path.getsize(self._path(name)) for name in segments}
+        total = sum(sizes.values())
+        for name in segments[:-1]:
+            if total <= self.max_bytes:
+                break
+            os.remove(self._path(name))
+            total -= sizes[name]
+            logger.warning(f"Spool over {self.max_bytes} bytes, evicted {name} ({sizes[name]} bytes)")
+            if self.cursor[0] == name:
+                self.cursor = (None, 0)
+                self._save_cursor()
+    
+    def _records(self, name: str, offset: int) -> Iterator[Tuple[int, float, bytes]]:
+        """Yield (end offset, timestamp, payload) of each intact record after offset."""
+        with open(self._path(name), 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size <= offset:
+                return
+            with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mapped:
+                header_size = self.RECORD_HEADER.size
+                while offset + header_size <= size:
+                    length, crc, timestamp = self.RECORD_HEADER.unpack_from(mapped, offset)
+                    end = offset + header_size + length
+                    if end > size:
+                        break
+                    payload = mapped[offset + header_size:end]
+                    if zlib.crc32(payload) != crc:
+                        logger.warning(f"Corrupt spool record in {name} at offset {offset}, skipping rest of segment")
+                        break
+                    yield end, timestamp, payload
+                    offset = end
+    
+    def replay(
+        self,
+        post: Callable[[List[oci.monitoring.models.MetricDataDetails]], int],
+        max_batches: int = SPOOL_REPLAY_BATCHES
+    ) -> int:
+        """
+        Post up to max_batches spooled batches, oldest first.
         
-        logger.info(f"Successfully posted {len(metrics_data)} metrics to OCI Monitoring")
-        logger.debug(f"Response: {response.data}")
-        return True
+        Stops at the first failure, leaving that batch at the head of the
+        spool for the next call. A batch with any metric rejected counts as
+        failed. Expired batches are dropped without being posted.
         
-    except Exception as e:
-        logger.error(f"Error posting metrics to OCI: {e}")
-        return False
+        Args:
+            post: Posts one batch, returning the number of rejected metrics
+                and raising on failure
+            max_batches: Replay rate limit per call
+            
+        Returns:
+            Number of batches replayed
+        """
+        replayed = expired = 0
+        stopped = False
+        cutoff = time.time() - self.max_age
+        with self.lock:
+            segments = self._segments()
+            active = segments[-1] if segments else None
+            
+            for name in segments:
+                if stopped or replayed >= max_batches:
+                    break
+                if self.cursor[0] is not None and name < self.cursor[0]:
+                    # Left behind by an interrupted replay
+                    os.remove(self._path(name))
+                    continue
+                offset = self.cursor[1] if self.cursor[0] == name else 0
+                
+                for end, timestamp, payload in self._records(name, offset):
+                    if replayed >= max_batches:
+                        break
+                    if timestamp < cutoff:
+                        expired += 1
+                    else:
+                        try:
+                            failed = post(decode_batch(payload))
+                        except Exception as e:
+                            logger.warning(f"Spool replay stopped, {name} offset {offset}: {e}")
+                            stopped = True
+                            break
+                        if failed:
+                            logger.warning(f"Spool replay stopped, {name} offset {offset}: OCI rejected {failed} metrics")
+                            stopped = True
+                            break
+                        replayed += 1
+                    offset = end
+                    self.cursor = (name, offset)
+                    self._save_cursor()
+                else:
+                    # Segment drained; the active one stays for further appends
+                    if name != active:
+                        os.remove(self._path(name))
+                        self.cursor = (None, 0)
+                        self._save_cursor()
+        
+        if expired:
+            logger.warning(f"Dropped {expired} spooled batches older than {self.max_age:.0f}s, which OCI would reject")
+        if replayed:
+            logger.info(f"Replayed {replayed} spooled batches")
+        return replayed
+
+
+# Histogram base name -> published average metric name. Histograms not listed
+# here publish their average as <base>_avg.
+HISTOGRAM_AVERAGE_NAMES = {
+    'http_request_duration_seconds': 'api_latency_seconds',
+}
+
+# Counters and gauges published when a filter is given
+KEY_METRICS = [
+    'http_requests_total',
+    'orders_created_total',
+    'orders_success_total',
+    'orders_failed_total',
+    'payments_processed_total',
+    'errors_total',
+    'chaos_events_total',
+    'simulated_latency_ms'
+]
+
+
+class HistogramSeries:
+    """Sum, count and cumulative buckets of one histogram label set."""
+    __slots__ = ('sum', 'count', 'buckets')
+    
+    def __init__(self):
+        self.sum: Optional[float] = None
+        self.count: Optional[float] = None
+        # (upper bound, cumulative count) pairs, sorted by join_histograms()
+        self.buckets: List[Tuple[float, float]] = []
+
+
+def histogram_average_name(base_name: str) -> str:
+    """Name of the average metric published for a histogram."""
+    return HISTOGRAM_AVERAGE_NAMES.get(base_name, f"{base_name}_avg")
+
+
+def join_histograms(
+    prometheus_metrics: Dict[str, Dict[LabelSet, float]]
+) -> Dict[str, Dict[LabelSet, HistogramSeries]]:
+    """
+    Join the _sum, _count and _bucket series of every histogram by label set.
+    
+    A histogram is any <base> exporting both <base>_sum and <base>_count.
+    Bucket series carry an extra "le" label, which is dropped to find the
+    label set they belong to. Every sample is visited once.
+    
+    Args:
+        prometheus_metrics: Parsed Prometheus metrics
+        
+    Returns:
+        Dictionary mapping histogram base names to {label set: HistogramSeries}
+    """
+    histograms: Dict[str, Dict[LabelSet, HistogramSeries]] = {}
+    
+    for metric_name in prometheus_metrics:
+        if metric_name.endswith('_sum') and f"{metric_name[:-4]}_count" in prometheus_metrics:
+            histograms[metric_name[:-4]] = {}
+    
+    for base_name, joined in histograms.items():
+        for labels, value in prometheus_metrics[f"{base_name}_sum"].items():
+            series = joined.get(labels)
+            if series is None:
+                series = joined[labels] = HistogramSeries()
+            series.sum = value
+        
+        for labels, value in prometheus_metrics[f"{base_name}_count"].items():
+            series = joined.get(labels)
+            if series is None:
+                series = joined[labels] = HistogramSeries()
+            series.count = value
+        
+        for labels, value in prometheus_metrics.get(f"{base_name}_bucket", {}).items():
+            upper_bound = None
+            key = []
+            for pair in labels:
+                if pair[0] == 'le':
+                    try:
+                        upper_bound = float(pair[1])
+                    except ValueError:
+                        break
+                else:
+                    key.append(pair)
+            if upper_bound is None:
+                continue
+            
+            labels = tuple(key)
+            series = joined.get(labels)
+            if series is None:
+                series = joined[labels] = HistogramSeries()
+            series.buckets.append((upper_bound, value))
+        
+        for series in joined.values():
+            series.buckets.sort()
+    
+    return histograms
+
+
+class CounterStateStore:
+    """
+    Last value and timestamp of every cumulative series, persisted between runs.
+    
+    Turning Prometheus counters into per-interval increases needs the previous
+    sample of each series. The state is kept in memory (daemon mode) and saved
+    to a small JSON file, so one-shot cron runs pick up where the last run
+    stopped. Series not seen for max_age seconds are dropped on save.
+    """
+    
+    VERSION = 1
+    
+    def __init__(self, path: Optional[str] = None, max_age: float = COUNTER_STATE_MAX_AGE):
+        self.path = os.path.expanduser(path) if path else None
+        self.max_age = max_age
+        self.series: Dict[Tuple[str, LabelSet], Tuple[float, float]] = {}
+    
+    def load(self) -> 'CounterStateStore':
+        """Read the state file; a missing or unreadable file starts empty."""
+        if not self.path or not os.path.exists(self.path):
+            return self
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('version') == self.VERSION:
+                for name, labels, value, timestamp in state['series']:
+                    key = (sys.intern(name), tuple((k, v) for k, v in labels))
+                    self.series[key] = (value, timestamp)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable counter state {self.path}: {e}")
+        return self
+    
+    def save(self) -> None:
+        """Atomically write the state file, expiring stale series first."""
+        if not self.path:
+            return
+        cutoff = time.time() - self.max_age
+        self.series = {key: sample for key, sample in self.series.items() if sample[1] >= cutoff}
+        
+        state = {
+            'version': self.VERSION,
+            'series': [[name, labels, value, timestamp] for (name, labels), (value, timestamp) in self.series.items()]
+        }
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+    
+    def swap(self, name: str, labels: LabelSet, value: Any, timestamp: float) -> Optional[Tuple[Any, float]]:
+        """
+        Record a sample and return the previous (value, timestamp) of the series.
+        
+        value may be a float or a list of floats (e.g. a histogram's buckets).
+        """
+        key = (name, labels)
+        previous = self.series.get(key)
+        self.series[key] = (value, timestamp)
+        return previous
+    
+    def delta(self, name: str, labels: LabelSet, value: float, timestamp: float) -> Optional[Tuple[float, float]]:
+        """
+        Record a cumulative sample and return its change since the last one.
+        
+        A value lower than the previous one means the counter was reset
+        (process restart), so the whole new value is the increase.
+        
+        Returns:
+            (increase, elapsed seconds), or None for the first sample of a series
+        """
+        previous = self.swap(name, labels, value, timestamp)
+        if previous is None:
+            return None
+        previous_value, previous_timestamp = previous
+        elapsed = timestamp - previous_timestamp
+        if elapsed <= 0:
+            return None
+        increase = value - previous_value if value >= previous_value else value
+        return increase, elapsed
+
+
+def quantile_metric_name(base_name: str, quantile: float) -> str:
+    """Name of a histogram quantile metric, e.g. api_latency_seconds_p95."""
+    prefix = HISTOGRAM_AVERAGE_NAMES.get(base_name, base_name)
+    return f"{prefix}_p{quantile * 100:g}".replace('.', '_')
+
+
+def bucket_quantiles(bounds: np.ndarray, counts: np.ndarray, quantiles: np.ndarray) -> np.ndarray:
+    """
+    Interpolate quantiles from cumulative bucket counts, for many series at once.
+    
+    Follows Prometheus' histogram_quantile(): the rank is located in the first
+    bucket whose cumulative count reaches it and linearly interpolated between
+    that bucket's bounds. Ranks in the +Inf bucket return the highest finite
+    bound.
+    
+    Args:
+        bounds: Bucket upper bounds, shape (buckets,), ascending, last may be +Inf
+        counts: Cumulative counts, shape (series, buckets)
+        quantiles: Quantiles in [0, 1], shape (quantiles,)
+        
+    Returns:
+        Array of shape (series, quantiles); NaN for series with no observations
+    """
+    totals = counts[:, -1]
+    ranks = totals[:, None] * quantiles[None, :]
+    
+    # First bucket whose cumulative count reaches the rank: (series, quantiles)
+    index = np.argmax(counts[:, None, :] >= ranks[:, :, None], axis=2)
+    
+    lower_bounds = np.concatenate(([0.0], bounds[:-1]))
+    lower_counts = np.concatenate((np.zeros((counts.shape[0], 1)), counts[:, :-1]), axis=1)
+    
+    rows = np.arange(counts.shape[0])[:, None]
+    lower = lower_bounds[index]
+    upper = bounds[index]
+    below = lower_counts[rows, index]
+    in_bucket = counts[rows, index] - below
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = np.where(in_bucket > 0, (ranks - below) / in_bucket, 0.0)
+        values = np.where(np.isinf(upper), lower, lower + (upper - lower) * fraction)
+    
+    # A first bucket with a non-positive bound has nothing to interpolate from
+    values = np.where((index == 0) & (upper <= 0), upper, values)
+    return np.where(totals[:, None] > 0, values, np.nan)
+
+
+def histogram_quantiles(
+    base_name: str,
+    joined: Dict[LabelSet, HistogramSeries],
+    quantiles: np.ndarray,
+    counter_state: Optional[CounterStateStore] = None,
+    timestamp: Optional[float] = None
+) -> Dict[LabelSet, np.ndarray]:
+    """
+    Quantiles of every label set of one histogram.
+    
+    With counter_state the quantiles describe only the observations since the
+    previous scrape (bucket deltas, reset-aware); the first scrape of a series
+    yields nothing. Without it they describe all observations since the app
+    started. Series sharing a bucket layout are computed in one vectorized pass.
+    
+    Returns:
+        Dictionary mapping label sets to arrays of quantile values
+    """
+    groups: Dict[Tuple[float, ...], Tuple[List[LabelSet], List[List[float]], List[Any]]] = {}
+    for labels, series in joined.items():
+        if not series.buckets:
+            continue
+        layout = tuple(bound for bound, _ in series.buckets)
+        group = groups.setdefault(layout, ([], [], []))
+        group[0].append(labels)
+        counts = [count for _, count in series.buckets]
+        group[1].append(counts)
+        if counter_state is not None:
+            previous = counter_state.swap(f"{base_name}_bucket", labels, counts, timestamp)
+            group[2].append(previous[0] if previous and len(previous[0]) == len(counts) else None)
+    
+    results: Dict[LabelSet, np.ndarray] = {}
+    for layout, (label_sets, current, previous) in groups.items():
+        counts = np.asarray(current, dtype=np.float64)
+        
+        if counter_state is not None:
+            has_previous = np.array([p is not None for p in previous])
+            if not has_previous.any():
+                continue
+            before = np.asarray([p if p is not None else [0.0] * len(layout) for p in previous], dtype=np.float64)
+            counts = counts - before
+            # Any bucket going backwards means the process restarted
+            reset = (counts < 0).any(axis=1)
+            counts[reset] = np.asarray(current, dtype=np.float64)[reset]
+            counts[~has_previous] = 0.0
+        
+        values = bucket_quantiles(np.asarray(layout, dtype=np.float64), counts, quantiles)
+        for labels, row in zip(label_sets, values):
+            if not np.isnan(row).all():
+                results[labels] = row
+    
+    return results
+
+
+def make_metric_data(
+    namespace: str,
+    compartment_id: str,
+    name: str,
+    labels: LabelSet,
+    value: float,
+    timestamp: datetime
+) -> oci.monitoring.models.MetricDataDetails:
+    """Build a single-datapoint OCI MetricDataDetails for one series."""
+    return oci.monitoring.models.MetricDataDetails(
+        namespace=namespace,
+        compartment_id=compartment_id,
+        name=name,
+        dimensions=dict(labels),
+        datapoints=[
+            oci.monitoring.models.Datapoint(
+                timestamp=timestamp,
+                value=value
+            )
+        ]
+    )
 
 
 def convert_prometheus_to_oci_metrics(
-    prometheus_metrics: Dict[str, Any],
+    prometheus_metrics: Dict[str, Dict[LabelSet, float]],
     namespace: str,
-    filter_metrics: Optional[List[str]] = None
-) -> List[oci.monitoring.models.MetricData]:
+    compartment_id: str,
+    filter_metrics: Optional[List[str]] = None,
+    counter_state: Optional[CounterStateStore] = None,
+    timestamp: Optional[float] = None,
+    quantiles: Iterable[float] = HISTOGRAM_QUANTILES
+) -> List[oci.monitoring.models.MetricDataDetails]:
     """
     Convert Prometheus metrics to OCI Monitoring format.
     
     Filters and converts key metrics:
-    - http_request_duration_seconds (histogram -> average latency)
+    - Every histogram (sum/count -> average), e.g.
+      http_request_duration_seconds -> api_latency_seconds and
+      external_call_latency_ms -> external_call_latency_ms_avg
+    - Every histogram's buckets -> interpolated quantiles, e.g.
+      api_latency_seconds_p50/_p95/_p99 and external_call_latency_ms_p99
     - http_requests_total (counter)
     - orders_created_total, orders_success_total, orders_failed_total
     - payments_processed_total
     - errors_total
     
+    With counter_state, every *_total counter also publishes
+    <name>_increase (change since the previous scrape, reset-aware) and
+    <name>_rate (increase per second), so readers need no long windows.
+    
+    Non-finite values (NaN, +Inf) are dropped since OCI rejects them.
+    
     Args:
         prometheus_metrics: Parsed Prometheus metrics
         namespace: OCI Monitoring namespace
-        filter_metrics: Optional list of metric names to include (None = all)
+        compartment_id: OCI Compartment OCID the metrics are posted to
+        filter_metrics: Optional list of metric names to include (None = all).
+            A histogram matches by base name, average name or _sum/_count name.
+        counter_state: Optional state store used to derive counter increases
+        timestamp: Scrape time as a Unix timestamp (default: now)
+        quantiles: Histogram quantiles to publish
         
     Returns:
-        List of OCI MetricData objects
+        List of OCI MetricDataDetails objects
     """
     oci_metrics = []
-    now = datetime.utcnow()
+    if timestamp is None:
+        timestamp = time.time()
+    now = datetime.utcfromtimestamp(timestamp)
+    histograms = join_histograms(prometheus_metrics)
+    histogram_parts = set()
+    quantiles = np.asarray(sorted(quantiles), dtype=np.float64)
     
-    # Track histogram sums and counts for averaging
-    histogram_sums = {}
-    histogram_counts = {}
-    
-    # First pass: collect histogram data
-    for metric_key, metric_list in prometheus_metrics.items():
-        for metric in metric_list:
-            metric_name = metric['name']
-            
-            # Skip if filter is specified and metric not in filter
-            if filter_metrics and metric_name not in filter_metrics:
+    # Average of every histogram, one hash lookup per series
+    for base_name, joined in histograms.items():
+        average_name = histogram_average_name(base_name)
+        histogram_parts.update((f"{base_name}_sum", f"{base_name}_count", f"{base_name}_bucket"))
+        
+        if filter_metrics and not {
+            base_name, average_name, f"{base_name}_sum", f"{base_name}_count"
+        }.intersection(filter_metrics):
+            continue
+        
+        for labels, series in joined.items():
+            if series.sum is None or not series.count:
                 continue
-            
-            # Handle histogram sum and count separately
-            if metric_name.endswith('_sum'):
-                base_name = metric_name[:-4]
-                if base_name not in histogram_sums:
-                    histogram_sums[base_name] = []
-                histogram_sums[base_name].append(metric)
-            elif metric_name.endswith('_count'):
-                base_name = metric_name[:-6]
-                if base_name not in histogram_counts:
-                    histogram_counts[base_name] = []
-                histogram_counts[base_name].append(metric)
-    
-    # Calculate average latency from histogram
-    if 'http_request_duration_seconds' in histogram_sums and 'http_request_duration_seconds' in histogram_counts:
-        for sum_metric in histogram_sums['http_request_duration_seconds']:
-            for count_metric in histogram_counts['http_request_duration_seconds']:
-                if sum_metric['labels'] == count_metric['labels']:
-                    count = count_metric['value']
-                    if count > 0:
-                        avg_latency = sum_metric['value'] / count
-                        
-                        dimensions = {**sum_metric['labels']}
-                        metric_data = oci.monitoring.models.MetricData(
-                            namespace=namespace,
-                            name='api_latency_seconds',
-                            dimensions=dimensions,
-                            datapoints=[
-                                oci.monitoring.models.Datapoint(
-                                    timestamp=now,
-                                    value=avg_latency
-                                )
-                            ]
-                        )
-                        oci_metrics.append(metric_data)
+            average = series.sum / series.count
+            if math.isfinite(average):
+                oci_metrics.append(
+                    make_metric_data(namespace, compartment_id, average_name, labels, average, now)
+                )
+        
+        if not quantiles.size:
+            continue
+        quantile_names = [quantile_metric_name(base_name, q) for q in quantiles]
+        for labels, values in histogram_quantiles(base_name, joined, quantiles, counter_state, timestamp).items():
+            for name, value in zip(quantile_names, values.tolist()):
+                if math.isfinite(value):
+                    oci_metrics.append(
+                        make_metric_data(namespace, compartment_id, name, labels, value, now)
+                    )
     
     # Convert counters and gauges
-    key_metrics = [
-        'http_requests_total',
-        'orders_created_total',
-        'orders_success_total',
-        'orders_failed_total',
-        'payments_processed_total',
-        'errors_total',
-        'chaos_events_total',
-        'simulated_latency_ms'
-    ]
+    for metric_name, series in prometheus_metrics.items():
+        # Skip histogram internal metrics (already processed)
+        if metric_name in histogram_parts:
+            continue
+        
+        # Apply filter if specified
+        if filter_metrics and metric_name not in filter_metrics:
+            continue
+        
+        # Include key metrics or all if no filter
+        if not filter_metrics or metric_name in KEY_METRICS:
+            is_counter = counter_state is not None and metric_name.endswith('_total')
+            for labels, value in series.items():
+                if not math.isfinite(value):
+                    continue
+                oci_metrics.append(
+                    make_metric_data(namespace, compartment_id, metric_name, labels, value, now)
+                )
+                if not is_counter:
+                    continue
+                
+                delta = counter_state.delta(metric_name, labels, value, timestamp)
+                if delta is not None:
+                    increase, elapsed = delta
+                    oci_metrics.append(
+                        make_metric_data(namespace, compartment_id, f"{metric_name}_increase", labels, increase, now)
+                    )
+                    oci_metrics.append(
+                        make_metric_data(namespace, compartment_id, f"{metric_name}_rate", labels, increase / elapsed, now)
+                    )
     
-    for metric_key, metric_list in prometheus_metrics.items():
-        for metric in metric_list:
-            metric_name = metric['name']
-            
-            # Skip histogram internal metrics (already processed)
-            if metric_name.endswith('_sum') or metric_name.endswith('_count') or metric_name.endswith('_bucket'):
-                continue
+    return oci_metrics
+
+
+def is_additive_metric(name: str) -> bool:
+    """True for counters, increases and rates, whose series can be summed."""
+    return name.endswith(('_total', '_increase', '_rate'))
+
+
+class CardinalityGuard:
+    """
+    Pre-upload stage bounding the number of series published per metric.
+    
+    Configured from a JSON file, for example:
+    
+        {
+            "max_series": 500,
+            "drop_dimensions": ["instance"],
+            "hash_dimensions": ["route"],
+            "hash_buckets": 16,
+            "metrics": {
+                "http_requests_total_rate": {"max_series": 100, "allow_dimensions": ["route", "status_code"]}
+            }
+        }
+    
+    Top-level keys are defaults and "metrics" overrides them per metric name.
+    allow_dimensions keeps only the listed dimensions, drop_dimensions
+    removes the listed ones and hash_dimensions maps values onto
+    hash_buckets stable buckets. Series that collapse onto the same
+    dimensions are merged, then anything above max_series is folded into one
+    series whose dimensions are all "other", keeping the top series by value.
+    Counters, increases and rates are merged by summing, everything else
+    (gauges, averages, quantiles) by taking the maximum.
+    """
+    
+    def __init__(self, config: Optional[Dict[str, Any]] = None, max_series: Optional[int] = None):
+        config = {'max_series': DEFAULT_SERIES_BUDGET, **(config or {})}
+        self.overrides: Dict[str, Dict[str, Any]] = config.pop('metrics', {})
+        self.defaults = config
+        if max_series is not None:
+            self.defaults['max_series'] = max_series
+    
+    @classmethod
+    def from_file(cls, path: Optional[str], max_series: Optional[int] = None) -> 'CardinalityGuard':
+        """Load a guard from a JSON config file (None = defaults only)."""
+        config = None
+        if path:
+            with open(os.path.expanduser(path), encoding='utf-8') as f:
+                config = json.load(f)
+        return cls(config, max_series)
+    
+    def settings(self, name: str) -> Dict[str, Any]:
+        """Effective settings for one metric name."""
+        return {**self.defaults, **self.overrides.get(name, {})}
+    
+    @staticmethod
+    def hash_value(value: str, buckets: int) -> str:
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest()
+        return f"h{int.from_bytes(digest, 'big') % buckets:02d}"
+    
+    def apply(
+        self,
+        metrics_data: List[oci.monitoring.models.MetricDataDetails]
+    ) -> Tuple[List[oci.monitoring.models.MetricDataDetails], Dict[str, int]]:
+        """
+        Rewrite dimensions and fold series above each metric's budget.
+        
+        Returns:
+            (metrics to upload, {metric name: series folded into "other"})
+        """
+        by_name: Dict[str, List[oci.monitoring.models.MetricDataDetails]] = {}
+        for metric in metrics_data:
+            by_name.setdefault(metric.name, []).append(metric)
+        
+        guarded = []
+        folded: Dict[str, int] = {}
+        for name, metrics in by_name.items():
+            settings = self.settings(name)
+            allow = settings.get('allow_dimensions')
+            drop = set(settings.get('drop_dimensions') or ())
+            hashed = set(settings.get('hash_dimensions') or ())
+            buckets = int(settings.get('hash_buckets', 16))
+            max_series = int(settings.get('max_series') or 0)
+            merge = sum if is_additive_metric(name) else max
             
-            # Apply filter if specified
-            if filter_metrics and metric_name not in filter_metrics:
+            if not (allow is not None or drop or hashed or (max_series and len(metrics) > max_series)):
+                guarded.extend(metrics)
                 continue
             
-            # Include key metrics or all if no filter
-            if not filter_metrics or metric_name in key_metrics:
-                dimensions = {**metric['labels']}
+            # Rewrite dimensions and merge series that became identical
+            merged: Dict[LabelSet, List[Any]] = {}
+            for metric in metrics:
+                dimensions = []
+                for key, value in (metric.dimensions or {}).items():
+                    if key in drop or (allow is not None and key not in allow):
+                        continue
+                    dimensions.append((key, self.hash_value(value, buckets) if key in hashed else value))
                 
-                metric_data = oci.monitoring.models.MetricData(
-                    namespace=namespace,
-                    name=metric_name,
-                    dimensions=dimensions,
-                    datapoints=[
-                        oci.monitoring.models.Datapoint(
-                            timestamp=now,
-                            value=metric['value']
-                        )
-                    ]
+                labels = tuple(sorted(dimensions))
+                datapoint = metric.datapoints[0]
+                entry = merged.get(labels)
+                if entry is None:
+                    merged[labels] = [metric, datapoint.timestamp, [datapoint.value]]
+                else:
+                    entry[2].append(datapoint.value)
+            
+            series = [(labels, entry[0], entry[1], merge(entry[2])) for labels, entry in merged.items()]
+            if max_series and len(series) > max_series:
+                series.sort(key=lambda item: abs(item[3]), reverse=True)
+                kept, rest = series[:max_series - 1], series[max_series - 1:]
+                other_keys = sorted({key for labels, _, _, _ in rest for key, _ in labels})
+                other = (
+                    tuple((key, 'other') for key in other_keys),
+                    rest[0][1],
+                    rest[0][2],
+                    merge(value for _, _, _, value in rest)
                 )
-                oci_metrics.append(metric_data)
+                series = kept + [other]
+                folded[name] = len(rest)
+            
+            for labels, template, timestamp, value in series:
+                guarded.append(
+                    make_metric_data(template.namespace, template.compartment_id, name, labels, value, timestamp)
+                )
+        
+        return guarded, folded
+
+
+class AnomalyDetector:
+    """
+    Online anomaly detection over the published series, one sample at a time.
     
-    return oci_metrics
+    Every series keeps an exponentially weighted mean and mean absolute
+    deviation, so memory and work per series per sample are constant. The
+    baselines live in flat NumPy arrays indexed by series ID; a dict maps
+    (metric name, labels) to that ID and each cycle updates all series in one
+    vectorized pass.
+    
+    A sample's score is its distance from the mean in deviations (a robust
+    z-score). Residuals are clipped at the threshold before updating the
+    baseline, so a single spike barely moves it, while a lasting level shift
+    is absorbed within a few 1/alpha samples. Series are scored once they
+    have warmup samples.
+    
+    Anomalies are published as their own metrics, so alarms need no extra
+    queries against the raw series:
+    - ingestion_anomalies{metric}: anomalous series of a metric this cycle
+      (0 included, so alarms resolve)
+    - ingestion_anomaly_score{metric, <series labels>}: the score of each
+      anomalous series, only while it is anomalous
+    
+    Cumulative counters and their increases are not watched; their _rate,
+    histogram averages/quantiles and gauges are.
+    """
+    
+    VERSION = 1
+    
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        alpha: float = ANOMALY_ALPHA,
+        threshold: float = ANOMALY_THRESHOLD,
+        warmup: int = ANOMALY_WARMUP_SAMPLES,
+        max_age: float = ANOMALY_STATE_MAX_AGE
+    ):
+        self.path = os.path.expanduser(path) if path else None
+        self.alpha = alpha
+        self.threshold = threshold
+        self.warmup = warmup
+        self.max_age = max_age
+        self.index: Dict[Tuple[str, LabelSet], int] = {}
+        self.mean = np.zeros(0, dtype=np.float64)
+        self.deviation = np.zeros(0, dtype=np.float64)
+        self.count = np.zeros(0, dtype=np.int32)
+        self.last_seen = np.zeros(0, dtype=np.float64)
+    
+    @staticmethod
+    def watches(name: str) -> bool:
+        """True for metrics whose level is meaningful sample to sample."""
+        return not name.endswith(('_total', '_increase')) and not name.startswith('ingestion_')
+    
+    def load(self) -> 'AnomalyDetector':
+        """Read the state file; a missing or unreadable file starts empty."""
+        if not self.path or not os.path.exists(self.path):
+            return self
+        try:
+            with np.load(self.path) as state:
+                if int(state['version']) != self.VERSION:
+                    return self
+                keys = json.loads(str(state['keys']))
+                arrays = [state['mean'], state['deviation'], state['count'], state['last_seen']]
+            if any(len(array) != len(keys) for array in arrays):
+                raise ValueError("state arrays do not match the series keys")
+            self.mean, self.deviation, self.count, self.last_seen = (
+                arrays[0].astype(np.float64), arrays[1].astype(np.float64),
+                arrays[2].astype(np.int32), arrays[3].astype(np.float64)
+            )
+            self.index = {
+                (sys.intern(name), tuple((k, v) for k, v in labels)): i
+                for i, (name, labels) in enumerate(keys)
+            }
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable anomaly state {self.path}: {e}")
+        return self
+    
+    def save(self) -> None:
+        """Atomically write the state file, expiring stale series first."""
+        if not self.path:
+            return
+        self.expire(time.time() - self.max_age)
+        
+        keys = sorted(self.index.items(), key=lambda item: item[1])
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                version=self.VERSION,
+                keys=json.dumps([[name, labels] for (name, labels), _ in keys], separators=(',', ':')),
+                mean=self.mean,
+                deviation=self.deviation,
+                count=self.count,
+                last_seen=self.last_seen
+            )
+        os.replace(tmp_path, self.path)
+    
+    def expire(self, cutoff: float) -> None:
+        """Drop series last seen before cutoff and compact the arrays."""
+        keep = self.last_seen >= cutoff
+        if keep.all():
+            return
+        remap = np.cumsum(keep) - 1
+        self.index = {key: int(remap[i]) for key, i in self.index.items() if keep[i]}
+        self.mean, self.deviation = self.mean[keep], self.deviation[keep]
+        self.count, self.last_seen = self.count[keep], self.last_seen[keep]
+    
+    def series_ids(self, keys: List[Tuple[str, LabelSet]]) -> np.ndarray:
+        """IDs of the given series, allocating (and growing the arrays for) new ones."""
+        ids = np.empty(len(keys), dtype=np.int64)
+        size = len(self.index)
+        for i, key in enumerate(keys):
+            series_id = self.index.get(key)
+            if series_id is None:
+                series_id = self.index[key] = size
+                size += 1
+            ids[i] = series_id
+        
+        if size > len(self.mean):
+            capacity = max(size, 2 * len(self.mean), 64)
+            grow = capacity - len(self.mean)
+            self.mean = np.concatenate((self.mean, np.zeros(grow)))
+            self.deviation = np.concatenate((self.deviation, np.zeros(grow)))
+            self.count = np.concatenate((self.count, np.zeros(grow, dtype=np.int32)))
+            # Unused slots look long expired, so save() compacts them away
+            self.last_seen = np.concatenate((self.last_seen, np.full(grow, -np.inf)))
+        return ids
+    
+    def update(self, keys: List[Tuple[str, LabelSet]], values: np.ndarray, timestamp: float) -> np.ndarray:
+        """
+        Score one sample per series and fold it into the baselines.
+        
+        Args:
+            keys: (metric name, labels) of each sample, each series at most once
+            values: float64 sample values
+            timestamp: Scrape time as a Unix timestamp
+            
+        Returns:
+            Robust z-score per sample, 0 for series still warming up
+        """
+        ids = self.series_ids(keys)
+        # A series back after expiring restarts its warmup
+        stale = self.last_seen[ids] < timestamp - self.max_age
+        self.count[ids[stale]] = 0
+        
+        mean, deviation, count = self.mean[ids], self.deviation[ids], self.count[ids]
+        first = count == 0
+        mean = np.where(first, values, mean)
+        deviation = np.where(first, 0.0, deviation)
+        
+        # Mean absolute deviation * 1.2533 estimates the standard deviation of
+        # normal data; the floor keeps flat series from scoring every wiggle
+        scale = np.maximum(1.2533 * deviation, np.maximum(0.01 * np.abs(mean), 1e-9))
+        residual = values - mean
+        scores = np.where(count >= self.warmup, residual / scale, 0.0)
+        
+        # Warming series average plainly (1/n); warm ones clip outliers first
+        warming = count < self.warmup
+        alpha = np.where(warming, np.maximum(self.alpha, 1.0 / (count + 1)), self.alpha)
+        bound = self.threshold * scale
+        residual = np.where(warming, residual, np.clip(residual, -bound, bound))
+        
+        self.mean[ids] = mean + alpha * residual
+        self.deviation[ids] = deviation + alpha * (np.abs(residual) - deviation)
+        self.count[ids] = np.minimum(count + 1, np.iinfo(np.int32).max)
+        self.last_seen[ids] = timestamp
+        return scores
+    
+    def apply(
+        self,
+        metrics_data: List[oci.monitoring.models.MetricDataDetails],
+        timestamp: float
+    ) -> List[oci.monitoring.models.MetricDataDetails]:
+        """
+        Update the baselines with one cycle's metrics and build the anomaly metrics.
+        
+        Returns:
+            ingestion_anomalies and ingestion_anomaly_score metrics to upload
+        """
+        watched = [metric for metric in metrics_data if self.watches(metric.name)]
+        if not watched:
+            return []
+        keys = [(metric.name, tuple(sorted((metric.dimensions or {}).items()))) for metric in watched]
+        values = np.fromiter((metric.datapoints[0].value for metric in watched), dtype=np.float64, count=len(watched))
+        scores = self.update(keys, values, timestamp)
+        
+        template = watched[0]
+        now = datetime.utcfromtimestamp(timestamp)
+        anomalies: Dict[str, int] = {name: 0 for name, _ in keys}
+        results = []
+        for i in np.flatnonzero(np.abs(scores) >= self.threshold).tolist():
+            name, labels = keys[i]
+            anomalies[name] += 1
+            results.append(make_metric_data(
+                template.namespace, template.compartment_id, 'ingestion_anomaly_score',
+                (('metric', name),) + tuple(pair for pair in labels if pair[0] != 'metric'),
+                round(float(scores[i]), 3), now
+            ))
+        results.extend(
+            make_metric_data(template.namespace, template.compartment_id, 'ingestion_anomalies', (('metric', name),), count, now)
+            for name, count in anomalies.items()
+        )
+        return results
+
+
+class ScrapeError(Exception):
+    """Raised when no scrape target produced metrics in a cycle."""
+
+
+class CycleTimings(NamedTuple):
+    """Wall time of each phase of one ingestion cycle, in seconds."""
+    scrape: float
+    parse: float
+    convert: float
+    post: float
+    
+    @property
+    def total(self) -> float:
+        return self.scrape + self.parse + self.convert + self.post
+
+
+def create_http_session(pool_size: int = HTTP_POOL_SIZE) -> requests.Session:
+    """Keep-alive session with a connection pool, reused across scrapes."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def create_monitoring_client(
+    config_file: str,
+    profile: str,
+    monitoring_endpoint: Optional[str] = None
+) -> oci.monitoring.MonitoringClient:
+    """
+    Build a Monitoring client for PostMetricData.
+    
+    PostMetricData is served by the telemetry-ingestion endpoint, not the
+    default telemetry endpoint, so the endpoint is derived from the region
+    unless monitoring_endpoint overrides it.
+    """
+    config = oci.config.from_file(
+        file_location=os.path.expanduser(config_file),
+        profile_name=profile
+    )
+    service_endpoint = monitoring_endpoint or f"https://telemetry-ingestion.{config['region']}.oraclecloud.com"
+    monitoring_client = oci.monitoring.MonitoringClient(config, service_endpoint=service_endpoint)
+    logger.info(f"OCI Monitoring client initialized ({service_endpoint})")
+    return monitoring_client
+
+
+class ScrapeTarget(NamedTuple):
+    """A /metrics endpoint and the instance dimension its samples get."""
+    url: str
+    instance: str
+
+
+def make_target(url: str, instance: Optional[str] = None) -> ScrapeTarget:
+    """Build a target, defaulting the instance to the URL's host:port."""
+    return ScrapeTarget(url, instance or urlsplit(url).netloc or url)
+
+
+def load_targets(endpoints: Optional[List[str]], targets_file: Optional[str]) -> List[ScrapeTarget]:
+    """
+    Collect scrape targets from the command line and a discovery file.
+    
+    The file holds one target per line as "<url> [instance]"; blank lines and
+    lines starting with # are ignored. It is re-read every cycle, so replicas
+    can be added or removed without restarting a daemon.
+    
+    Args:
+        endpoints: URLs given with --metrics-endpoint
+        targets_file: Optional path of the discovery file
+        
+    Returns:
+        De-duplicated list of targets, in order
+    """
+    targets = [make_target(url) for url in endpoints or ()]
+    
+    if targets_file:
+        with open(os.path.expanduser(targets_file), encoding='utf-8') as f:
+            for line in f:
+                fields = line.split()
+                if fields and not fields[0].startswith('#'):
+                    targets.append(make_target(fields[0], fields[1] if len(fields) > 1 else None))
+    
+    return list(dict.fromkeys(targets))
+
+
+def timed_chunks(
+    chunks: Iterable[bytes],
+    elapsed: List[float],
+    deadline: Optional[float] = None
+) -> Iterator[bytes]:
+    """
+    Yield chunks, adding the time spent waiting on each one to elapsed[0].
+    
+    Raises:
+        requests.exceptions.Timeout once time.monotonic() passes deadline
+    """
+    iterator = iter(chunks)
+    while True:
+        if deadline is not None and time.monotonic() > deadline:
+            raise requests.exceptions.Timeout("Scrape deadline exceeded while reading the body")
+        start = time.perf_counter()
+        chunk = next(iterator, None)
+        elapsed[0] += time.perf_counter() - start
+        if chunk is None:
+            return
+        yield chunk
+
+
+def scrape_metrics(
+    session: requests.Session,
+    metrics_endpoint: str,
+    timeout: float = SCRAPE_TIMEOUT,
+    extra_labels: LabelSet = ()
+) -> Tuple[Dict[str, Dict[LabelSet, float]], float, float]:
+    """
+    Fetch and stream-parse one /metrics body.
+    
+    Network reads and parsing are interleaved, so they are timed separately:
+    the scrape time is spent waiting on the connection, the rest is parsing.
+    timeout bounds each socket read and is checked between body chunks.
+    
+    Returns:
+        (parsed metrics, scrape seconds, parse seconds)
+        
+    Raises:
+        requests.exceptions.RequestException on connection, HTTP or timeout errors
+    """
+    deadline = time.monotonic() + timeout
+    network = [0.0]
+    start = time.perf_counter()
+    with session.get(metrics_endpoint, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        network[0] = time.perf_counter() - start
+        prometheus_metrics = parse_prometheus_stream(
+            timed_chunks(response.iter_content(chunk_size=SCRAPE_CHUNK_SIZE), network, deadline),
+            extra_labels
+        )
+    total = time.perf_counter() - start
+    return prometheus_metrics, network[0], total - network[0]
+
+
+class TargetScraper:
+    """
+    Scrapes many targets concurrently over one keep-alive session.
+    
+    A target that fails or exceeds the timeout is reported as down and does
+    not hold up the others. Its request keeps running in the background
+    until the socket gives up, and the target is skipped in later cycles
+    until then, so a hung replica cannot pile up requests on the pool.
+    """
+    
+    def __init__(self, max_workers: int = DEFAULT_SCRAPE_WORKERS, timeout: float = SCRAPE_TIMEOUT):
+        self.timeout = timeout
+        self.session = create_http_session(pool_size=max_workers)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scrape')
+        self.in_flight: Dict[ScrapeTarget, Future] = {}
+    
+    def scrape(
+        self,
+        targets: List[ScrapeTarget]
+    ) -> Tuple[Dict[str, Dict[LabelSet, float]], Dict[ScrapeTarget, bool], float, float]:
+        """
+        Scrape all targets and merge their samples.
+        
+        Every sample gets an instance label naming its target, so series from
+        different replicas stay distinct in the merged result.
+        
+        Returns:
+            (merged metrics, {target: up}, scrape seconds, parse seconds).
+            Parsing holds the GIL, so parse time is summed over targets and
+            the scrape time is the rest of the phase's wall time.
+        """
+        merged: Dict[str, Dict[LabelSet, float]] = {}
+        up: Dict[ScrapeTarget, bool] = {target: False for target in targets}
+        parse_seconds = 0.0
+        start = time.perf_counter()
+        
+        futures = {}
+        for target in targets:
+            if target in self.in_flight:
+                logger.warning(f"Previous scrape of {target.url} ({target.instance}) still running, skipping")
+                continue
+            future = self.executor.submit(
+                scrape_metrics, self.session, target.url, self.timeout, (('instance', target.instance),)
+            )
+            futures[future] = target
+            self.in_flight[target] = future
+            future.add_done_callback(lambda _, target=target: self.in_flight.pop(target, None))
+        
+        try:
+            for future in as_completed(futures, timeout=self.timeout + 1):
+                target = futures[future]
+                try:
+                    prometheus_metrics, _, target_parse_seconds = future.result()
+                except requests.exceptions.RequestException as e:
+                    logger.warning(f"Error scraping {target.url} ({target.instance}): {e}")
+                    continue
+                up[target] = True
+                parse_seconds += target_parse_seconds
+                for metric_name, series in prometheus_metrics.items():
+                    merged.setdefault(metric_name, {}).update(series)
+        except FuturesTimeout:
+            for future, target in futures.items():
+                if not future.done():
+                    logger.warning(f"Scrape of {target.url} ({target.instance}) did not finish in {self.timeout}s")
+        
+        elapsed = time.perf_counter() - start
+        return merged, up, max(elapsed - parse_seconds, 0.0), parse_seconds
+    
+    def close(self) -> None:
+        """Stop accepting scrapes and release pooled connections."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+
+def timing_metrics(
+    namespace: str,
+    compartment_id: str,
+    timings: CycleTimings,
+    timestamp: datetime
+) -> List[oci.monitoring.models.MetricDataDetails]:
+    """Publish a cycle's phase timings as ingestion_cycle_seconds{phase=...}."""
+    return [
+        make_metric_data(namespace, compartment_id, 'ingestion_cycle_seconds', (('phase', phase),), seconds, timestamp)
+        for phase, seconds in (*zip(CycleTimings._fields, timings), ('total', timings.total))
+    ]
+
+
+def run_cycle(
+    scraper: TargetScraper,
+    monitoring_client: oci.monitoring.MonitoringClient,
+    compartment_id: str,
+    args: argparse.Namespace,
+    counter_state: Optional[CounterStateStore] = None,
+    cardinality_guard: Optional[CardinalityGuard] = None,
+    anomaly_detector: Optional[AnomalyDetector] = None,
+    spool: Optional[MetricSpool] = None,
+    previous_timings: Optional[CycleTimings] = None
+) -> Tuple[UploadReport, CycleTimings]:
+    """
+    Scrape, parse, convert and post one set of metrics.
+    
+    All targets are scraped concurrently and posted in one batched upload,
+    together with an ingestion_target_up{instance} sample per target.
+    
+    Args:
+        scraper: Scraper holding the HTTP session and scrape pool
+        monitoring_client: OCI Monitoring client
+        compartment_id: OCI Compartment OCID
+        args: Parsed command line arguments
+        counter_state: Counter state for increase/rate metrics, saved after conversion
+        cardinality_guard: Dimension rollup stage applied to the converted metrics
+        anomaly_detector: Anomaly detection stage run on the guarded metrics,
+            saved after the update
+        spool: Spool receiving batches that fail to post; replayed once a
+            cycle's upload fully succeeds
+        previous_timings: Timings of the previous cycle, posted alongside this one
+        
+    Returns:
+        (upload report, timings of this cycle)
+        
+    Raises:
+        ScrapeError if no target could be scraped
+    """
+    targets = load_targets(args.metrics_endpoint, args.targets_file)
+    scraped_at = time.time()
+    prometheus_metrics, up, scrape_seconds, parse_seconds = scraper.scrape(targets)
+    if not any(up.values()):
+        raise ScrapeError(f"None of {len(targets)} scrape targets responded")
+    logger.debug(f"Parsed {len(prometheus_metrics)} metric types from {sum(up.values())}/{len(targets)} targets")
+    
+    start = time.perf_counter()
+    now = datetime.utcfromtimestamp(scraped_at)
+    oci_metrics = convert_prometheus_to_oci_metrics(
+        prometheus_metrics,
+        args.namespace,
+        compartment_id,
+        filter_metrics=args.filter,
+        counter_state=counter_state,
+        timestamp=scraped_at,
+        quantiles=args.quantiles
+    )
+    if counter_state is not None:
+        counter_state.save()
+    if cardinality_guard is not None:
+        oci_metrics, folded = cardinality_guard.apply(oci_metrics)
+        if folded:
+            logger.info(f"Folded {sum(folded.values())} series over budget: {folded}")
+        oci_metrics.extend(
+            make_metric_data(args.namespace, compartment_id, 'ingestion_series_folded', (('metric', name),), count, now)
+            for name, count in folded.items()
+        )
+    if anomaly_detector is not None:
+        anomalies = anomaly_detector.apply(oci_metrics, scraped_at)
+        anomaly_detector.save()
+        flagged = [m.dimensions['metric'] for m in anomalies if m.name == 'ingestion_anomaly_score']
+        if flagged:
+            logger.warning(f"Anomalous series: {len(flagged)} ({', '.join(sorted(set(flagged)))})")
+        oci_metrics.extend(anomalies)
+    oci_metrics.extend(
+        make_metric_data(
+            args.namespace, compartment_id, 'ingestion_target_up',
+            (('instance', target.instance),), 1.0 if target_up else 0.0, now
+        )
+        for target, target_up in up.items()
+    )
+    if previous_timings is not None:
+        oci_metrics.extend(timing_metrics(args.namespace, compartment_id, previous_timings, now))
+    convert_seconds = time.perf_counter() - start
+    logger.debug(f"Converted {len(oci_metrics)} metrics to OCI format")
+    
+    start = time.perf_counter()
+    report = post_metrics_to_oci(
+        monitoring_client,
+        compartment_id,
+        args.namespace,
+        oci_metrics,
+        batch_size=args.batch_size,
+        max_workers=args.upload_workers,
+        max_retries=args.max_retries
+    )
+    
+    if spool is not None:
+        if report.failed_batches:
+            for batch in report.failed_batches:
+                spool.append(batch)
+            logger.warning(
+                f"Spooled {len(report.failed_batches)} failed batches "
+                f"({spool.pending_bytes()} bytes pending replay)"
+            )
+        else:
+            spool.replay(
+                lambda batch: post_metric_batch(monitoring_client, batch, max_retries=1),
+                max_batches=args.spool_replay_batches
+            )
+    post_seconds = time.perf_counter() - start
+    
+    return report, CycleTimings(scrape_seconds, parse_seconds, convert_seconds, post_seconds)
+
+
+def run_daemon(
+    scraper: TargetScraper,
+    monitoring_client: oci.monitoring.MonitoringClient,
+    compartment_id: str,
+    args: argparse.Namespace,
+    counter_state: Optional[CounterStateStore] = None,
+    cardinality_guard: Optional[CardinalityGuard] = None,
+    anomaly_detector: Optional[AnomalyDetector] = None,
+    spool: Optional[MetricSpool] = None
+) -> None:
+    """
+    Run ingestion cycles on a fixed-rate schedule until SIGTERM/SIGINT.
+    
+    Cycles start at multiples of the interval from the first one, so a slow
+    cycle does not push later ones back. Ticks missed because a cycle overran
+    are skipped rather than run back to back. A signal lets the in-flight
+    cycle finish before returning.
+    """
+    stop = threading.Event()
+    
+    def request_stop(signum, frame):
+        logger.info(f"Received signal {signum}, stopping after the current cycle")
+        stop.set()
+    
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    
+    interval = args.interval
+    next_run = time.monotonic()
+    timings = None
+    
+    while not stop.is_set():
+        try:
+            report, timings = run_cycle(
+                scraper, monitoring_client, compartment_id, args,
+                counter_state=counter_state,
+                cardinality_guard=cardinality_guard,
+                anomaly_detector=anomaly_detector,
+                spool=spool,
+                previous_timings=timings
+            )
+            logger.info(
+                f"Cycle {timings.total:.3f}s (scrape {timings.scrape:.3f}s, parse {timings.parse:.3f}s, "
+                f"convert {timings.convert:.3f}s, post {timings.post:.3f}s): "
+                f"{report.metrics_posted} posted, {report.metrics_failed} failed"
+            )
+        except ScrapeError as e:
+            logger.error(f"Error fetching metrics: {e}")
+        except Exception as e:
+            logger.error(f"Ingestion cycle failed: {e}", exc_info=True)
+        
+        if stop.is_set():
+            break
+        next_run += interval
+        now = time.monotonic()
+        if now >= next_run:
+            missed = int((now - next_run) // interval) + 1
+            logger.warning(f"Cycle overran the {interval}s interval, skipping {missed} tick(s)")
+            next_run += missed * interval
+        stop.wait(next_run - now)
+    
+    logger.info("Ingestion daemon stopped")
 
 
 def main():
@@ -274,8 +1847,24 @@ def main():
     )
     parser.add_argument(
         '--metrics-endpoint',
-        default=METRICS_ENDPOINT,
-        help='BharatMart metrics endpoint URL'
+        nargs='+',
+        help=f'BharatMart metrics endpoint URL(s) to scrape (default: {METRICS_ENDPOINT})'
+    )
+    parser.add_argument(
+        '--targets-file',
+        help='File listing "<url> [instance]" scrape targets, re-read every cycle'
+    )
+    parser.add_argument(
+        '--scrape-timeout',
+        type=float,
+        default=SCRAPE_TIMEOUT,
+        help='Seconds a single target may take before it is skipped for the cycle'
+    )
+    parser.add_argument(
+        '--scrape-workers',
+        type=int,
+        default=DEFAULT_SCRAPE_WORKERS,
+        help='Targets scraped concurrently'
     )
     parser.add_argument(
         '--namespace',
@@ -297,6 +1886,88 @@ def main():
         nargs='+',
         help='Filter specific metrics to ingest'
     )
+    parser.add_argument(
+        '--monitoring-endpoint',
+        help='Override the telemetry-ingestion endpoint (e.g. a local stub for testing)'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=MAX_STREAMS_PER_REQUEST,
+        help=f'Metric streams per PostMetricData call (max {MAX_STREAMS_PER_REQUEST})'
+    )
+    parser.add_argument(
+        '--upload-workers',
+        type=int,
+        default=DEFAULT_UPLOAD_WORKERS,
+        help='Concurrent PostMetricData calls'
+    )
+    parser.add_argument(
+        '--max-retries',
+        type=int,
+        default=DEFAULT_MAX_RETRIES,
+        help='Retries per batch for throttled (429) and 5xx responses'
+    )
+    parser.add_argument(
+        '--quantiles',
+        nargs='*',
+        type=float,
+        default=list(HISTOGRAM_QUANTILES),
+        help='Histogram quantiles to publish (none disables them)'
+    )
+    parser.add_argument(
+        '--state-file',
+        default=COUNTER_STATE_FILE,
+        help='Counter state file for <counter>_increase/_rate metrics ("" disables them)'
+    )
+    parser.add_argument(
+        '--cardinality-config',
+        help='JSON file with per-metric series budgets and dimension drop/hash/allow lists'
+    )
+    parser.add_argument(
+        '--series-budget',
+        type=int,
+        help=f'Default maximum series per metric (default: {DEFAULT_SERIES_BUDGET}, 0 disables)'
+    )
+    parser.add_argument(
+        '--anomaly-state-file',
+        default=ANOMALY_STATE_FILE,
+        help='Baseline state of the anomaly detection stage ("" disables it)'
+    )
+    parser.add_argument(
+        '--anomaly-alpha',
+        type=float,
+        default=ANOMALY_ALPHA,
+        help=f'EWMA weight of each new sample in a series baseline (default: {ANOMALY_ALPHA})'
+    )
+    parser.add_argument(
+        '--anomaly-threshold',
+        type=float,
+        default=ANOMALY_THRESHOLD,
+        help=f'Robust z-score at which a sample counts as anomalous (default: {ANOMALY_THRESHOLD})'
+    )
+    parser.add_argument(
+        '--spool-dir',
+        default=SPOOL_DIR,
+        help='Directory spooling batches that fail to post, for later replay ("" disables)'
+    )
+    parser.add_argument(
+        '--spool-max-bytes',
+        type=int,
+        default=SPOOL_MAX_BYTES,
+        help='Disk budget of the spool; the oldest segments are evicted beyond it'
+    )
+    parser.add_argument(
+        '--spool-replay-batches',
+        type=int,
+        default=SPOOL_REPLAY_BATCHES,
+        help='Spooled batches replayed per cycle once uploads succeed again'
+    )
+    parser.add_argument(
+        '--interval',
+        type=float,
+        help='Run as a daemon, ingesting every N seconds until SIGTERM'
+    )
     parser.add_argument(
         '--verbose',
         '-v',
@@ -315,63 +1986,73 @@ def main():
         logger.error("Compartment ID is required. Set OCI_COMPARTMENT_ID env var or use --compartment-id")
         sys.exit(1)
     
-    logger.info(f"Fetching metrics from: {args.metrics_endpoint}")
+    if not args.metrics_endpoint and not args.targets_file:
+        args.metrics_endpoint = [METRICS_ENDPOINT]
+    
+    if args.metrics_endpoint:
+        logger.info(f"Fetching metrics from: {', '.join(args.metrics_endpoint)}")
+    if args.targets_file:
+        logger.info(f"Fetching metrics from targets in: {args.targets_file}")
     logger.info(f"Posting to OCI Monitoring namespace: {args.namespace}")
     logger.info(f"Compartment OCID: {compartment_id}")
     
-    # Fetch metrics from BharatMart
     try:
-        response = requests.get(args.metrics_endpoint, timeout=10)
-        response.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error fetching metrics from {args.metrics_endpoint}: {e}")
+        monitoring_client = create_monitoring_client(args.config_file, args.profile, args.monitoring_endpoint)
+    except Exception as e:
+        logger.error(f"Error initializing OCI client: {e}")
+        logger.error("Make sure OCI config file exists and is properly configured")
         sys.exit(1)
     
-    # Parse Prometheus metrics
-    logger.info("Parsing Prometheus metrics...")
-    prometheus_metrics = parse_prometheus_metrics(response.text)
-    logger.info(f"Parsed {len(prometheus_metrics)} metric types")
-    
-    # Convert to OCI format
-    logger.info("Converting metrics to OCI format...")
-    oci_metrics = convert_prometheus_to_oci_metrics(
-        prometheus_metrics,
-        args.namespace,
-        filter_metrics=args.filter
-    )
-    logger.info(f"Converted {len(oci_metrics)} metrics to OCI format")
+    scraper = TargetScraper(max_workers=args.scrape_workers, timeout=args.scrape_timeout)
+    counter_state = CounterStateStore(args.state_file).load() if args.state_file else None
+    try:
+        cardinality_guard = CardinalityGuard.from_file(args.cardinality_config, args.series_budget)
+    except (OSError, ValueError) as e:
+        logger.error(f"Error loading cardinality config {args.cardinality_config}: {e}")
+        sys.exit(1)
+    anomaly_detector = AnomalyDetector(
+        args.anomaly_state_file,
+        alpha=args.anomaly_alpha,
+        threshold=args.anomaly_threshold
+    ).load() if args.anomaly_state_file else None
+    spool = MetricSpool(args.spool_dir, max_bytes=args.spool_max_bytes) if args.spool_dir else None
     
-    if not oci_metrics:
-        logger.warning("No metrics to post after conversion")
+    if args.interval:
+        logger.info(f"Running as a daemon every {args.interval}s")
+        run_daemon(
+            scraper, monitoring_client, compartment_id, args,
+            counter_state, cardinality_guard, anomaly_detector, spool
+        )
+        scraper.close()
         sys.exit(0)
     
-    # Initialize OCI Monitoring client
+    # One-shot: scrape, convert and post once
     try:
-        config = oci.config.from_file(
-            file_location=os.path.expanduser(args.config_file),
-            profile_name=args.profile
+        report, timings = run_cycle(
+            scraper, monitoring_client, compartment_id, args,
+            counter_state=counter_state,
+            cardinality_guard=cardinality_guard,
+            anomaly_detector=anomaly_detector,
+            spool=spool
         )
-        monitoring_client = oci.monitoring.MonitoringClient(config)
-        logger.info("OCI Monitoring client initialized")
-    except Exception as e:
-        logger.error(f"Error initializing OCI client: {e}")
-        logger.error("Make sure OCI config file exists and is properly configured")
+    except (ScrapeError, OSError) as e:
+        logger.error(f"Error fetching metrics: {e}")
         sys.exit(1)
-    
-    # Post metrics to OCI Monitoring
-    logger.info("Posting metrics to OCI Monitoring...")
-    success = post_metrics_to_oci(
-        monitoring_client,
-        compartment_id,
-        args.namespace,
-        oci_metrics
+    finally:
+        scraper.close()
+    logger.info(
+        f"Scrape {timings.scrape:.3f}s, parse {timings.parse:.3f}s, "
+        f"convert {timings.convert:.3f}s, post {timings.post:.3f}s"
     )
     
-    if success:
+    if report.ok:
         logger.info("✅ Metrics successfully posted to OCI Monitoring!")
         sys.exit(0)
     else:
-        logger.error("❌ Failed to post metrics to OCI Monitoring")
+        logger.error(
+            f"❌ Failed to post {report.metrics_failed} metrics to OCI Monitoring "
+            f"({report.batches_failed} batches failed)"
+        )
         sys.exit(1)
 
 
@@ -0,0 +1,169 @@
+"""
+Tests for the batched PostMetricData upload of oci-telemetry-metrics-ingestion.py,
+against a stub Monitoring client.
+
+Run from this directory:
+    python -m unittest test_metrics_ingestion
+"""
+
+import importlib.util
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+
+import oci
+
+spec = importlib.util.spec_from_file_location(
+    "metrics_ingestion",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "oci-telemetry-metrics-ingestion.py")
+)
+ingestion = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(ingestion)
+
+
+class StubMonitoringClient:
+    """
+    Records posted batches and answers from a script.
+
+    outcomes maps the first metric name of a batch to a list of responses, one
+    per attempt: an int is the failed_metrics_count of an accepted batch, an
+    exception is raised. Batches without an entry are accepted in full.
+    """
+
+    def __init__(self, outcomes=None):
+        self.outcomes = outcomes or {}
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def post_metric_data(self, post_metric_data_details, retry_strategy=None):
+        batch = post_metric_data_details.metric_data
+        with self.lock:
+            self.batches.append([metric.name for metric in batch])
+            script = self.outcomes.get(batch[0].name)
+            outcome = script.pop(0) if script else 0
+        if isinstance(outcome, Exception):
+            raise outcome
+        return SimpleNamespace(data=SimpleNamespace(failed_metrics_count=outcome, failed_metrics=[]))
+
+
+def make_metrics(count, dimensions=None):
+    now = datetime.utcnow()
+    return [
+        oci.monitoring.models.MetricDataDetails(
+            namespace="custom.bharatmart",
+            compartment_id="ocid1.compartment.oc1..test",
+            name=f"metric_{index:03d}",
+            dimensions=dimensions or {},
+            datapoints=[oci.monitoring.models.Datapoint(timestamp=now, value=float(index))]
+        )
+        for index in range(count)
+    ]
+
+
+class ChunkMetricsTest(unittest.TestCase):
+
+    def test_splits_by_stream_count(self):
+        batches = ingestion.chunk_metrics(make_metrics(120), max_streams=50)
+
+        self.assertEqual([len(batch) for batch in batches], [50, 50, 20])
+        self.assertEqual([metric.name for batch in batches for metric in batch], [f"metric_{i:03d}" for i in range(120)])
+
+    def test_splits_by_estimated_size(self):
+        metrics = make_metrics(10, dimensions={"label": "x" * 1000})
+        size = ingestion.estimate_metric_size(metrics[0])
+        batches = ingestion.chunk_metrics(metrics, max_streams=50, max_bytes=size * 3)
+
+        self.assertEqual([len(batch) for batch in batches], [3, 3, 3, 1])
+
+
+class PostMetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        # No backoff sleeps between retries
+        self.backoff_delay = ingestion.backoff_delay
+        ingestion.backoff_delay = lambda attempt: 0
+
+    def tearDown(self):
+        ingestion.backoff_delay = self.backoff_delay
+
+    def post(self, client, metrics, **kwargs):
+        return ingestion.post_metrics_to_oci(
+            client, "ocid1.compartment.oc1..test", "custom.bharatmart", metrics, **kwargs
+        )
+
+    def test_posts_every_metric_once_in_bounded_batches(self):
+        client = StubMonitoringClient()
+        report = self.post(client, make_metrics(120), batch_size=50, max_workers=4)
+
+        self.assertEqual(sorted(len(batch) for batch in client.batches), [20, 50, 50])
+        self.assertEqual(report, ingestion.UploadReport(3, 0, 120, 0, []))
+        self.assertTrue(report.ok)
+
+    def test_counts_metrics_rejected_inside_accepted_batch(self):
+        client = StubMonitoringClient({"metric_050": [7]})
+        report = self.post(client, make_metrics(120), batch_size=50)
+
+        self.assertEqual(report.batches_succeeded, 3)
+        self.assertEqual(report.metrics_posted, 113)
+        self.assertEqual(report.metrics_failed, 7)
+        self.assertFalse(report.ok)
+
+    def test_retries_throttled_batch(self):
+        throttled = oci.exceptions.ServiceError(429, "TooManyRequests", {}, "throttled")
+        client = StubMonitoringClient({"metric_000": [throttled, throttled]})
+        report = self.post(client, make_metrics(10), max_retries=3)
+
+        self.assertEqual(len(client.batches), 3)
+        self.assertEqual(report, ingestion.UploadReport(1, 0, 10, 0, []))
+
+    def test_failed_batches_are_returned_for_resubmission(self):
+        unavailable = oci.exceptions.ServiceError(503, "ServiceUnavailable", {}, "down")
+        invalid = oci.exceptions.ServiceError(400, "InvalidParameter", {}, "bad metric")
+        client = StubMonitoringClient({"metric_000": [unavailable] * 3, "metric_050": [invalid]})
+        report = self.post(client, make_metrics(120), batch_size=50, max_retries=2)
+
+        # The 503 batch is tried 1 + 2 times, the 400 batch once
+        self.assertEqual(len(client.batches), 5)
+        self.assertEqual(report.batches_succeeded, 1)
+        self.assertEqual(report.batches_failed, 2)
+        self.assertEqual(report.metrics_posted, 20)
+        self.assertEqual(report.metrics_failed, 100)
+        self.assertEqual(
+            sorted(batch[0].name for batch in report.failed_batches), ["metric_000", "metric_050"]
+        )
+
+
+class MetricSpoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def replay_names(self, spool):
+        posted = []
+        spool.replay(lambda batch: posted.append(batch[0].name) or 0)
+        return posted
+
+    def test_appends_after_torn_tail_are_replayed(self):
+        spool = ingestion.MetricSpool(self.tmp.name)
+        spool.append(make_metrics(1))
+        segment = os.path.join(self.tmp.name, spool._segments()[-1])
+        with open(segment, "ab") as f:
+            f.write(b"\xff" * 10)
+
+        spool = ingestion.MetricSpool(self.tmp.name)
+        spool.append(make_metrics(2)[1:])
+
+        self.assertEqual(self.replay_names(spool), ["metric_000", "metric_001"])
+
+    def test_segment_bytes_capped_at_max_bytes(self):
+        spool = ingestion.MetricSpool(self.tmp.name, max_bytes=1000, segment_bytes=4096)
+
+        self.assertEqual(spool.segment_bytes, 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
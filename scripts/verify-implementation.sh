@@ -112,6 +112,10 @@ if [ -f "scripts/oci-telemetry-metrics-ingestion.py" ]; then
     check_python_syntax "scripts/oci-telemetry-metrics-ingestion.py"
     check_file_executable "scripts/oci-telemetry-metrics-ingestion.py"
 fi
+check_file_exists "scripts/benchmark-prometheus-parser.py"
+if [ -f "scripts/benchmark-prometheus-parser.py" ]; then
+    check_python_syntax "scripts/benchmark-prometheus-parser.py"
+fi
 echo ""
 
 # 2. Instance Pools + Auto Scaling Terraform
@@ -153,11 +157,16 @@ echo "------------------------------------------"
 check_directory_exists "scripts/oci-service-connector-hub"
 check_file_exists "scripts/oci-service-connector-hub/incident-response-function/func.py"
 check_file_exists "scripts/oci-service-connector-hub/incident-response-function/func.yaml"
+check_file_exists "scripts/oci-service-connector-hub/incident-response-function/remediation.py"
+check_file_exists "scripts/oci-service-connector-hub/incident-response-function/remediation-rules.json"
 check_file_exists "scripts/oci-service-connector-hub/service-connector-terraform.tf"
 check_file_exists "scripts/oci-service-connector-hub/README.md"
 if [ -f "scripts/oci-service-connector-hub/incident-response-function/func.py" ]; then
     check_python_syntax "scripts/oci-service-connector-hub/incident-response-function/func.py"
 fi
+if [ -f "scripts/oci-service-connector-hub/incident-response-function/remediation.py" ]; then
+    check_python_syntax "scripts/oci-service-connector-hub/incident-response-function/remediation.py"
+fi
 echo ""
 
 # 6. OCI REST API Dashboard Scripts
@@ -166,6 +175,9 @@ echo "----------------------------------"
 check_directory_exists "scripts/oci-rest-api-dashboard"
 check_file_exists "scripts/oci-rest-api-dashboard/sre-dashboard.py"
 check_file_exists "scripts/oci-rest-api-dashboard/query-metrics.py"
+check_file_exists "scripts/oci-rest-api-dashboard/metric_rollups.py"
+check_file_exists "scripts/oci-rest-api-dashboard/metric_analytics.py"
+check_file_exists "scripts/oci-rest-api-dashboard/slo-config.json"
 check_file_exists "scripts/oci-rest-api-dashboard/README.md"
 if [ -f "scripts/oci-rest-api-dashboard/sre-dashboard.py" ]; then
     check_python_syntax "scripts/oci-rest-api-dashboard/sre-dashboard.py"
@@ -173,6 +185,12 @@ fi
 if [ -f "scripts/oci-rest-api-dashboard/query-metrics.py" ]; then
     check_python_syntax "scripts/oci-rest-api-dashboard/query-metrics.py"
 fi
+if [ -f "scripts/oci-rest-api-dashboard/metric_rollups.py" ]; then
+    check_python_syntax "scripts/oci-rest-api-dashboard/metric_rollups.py"
+fi
+if [ -f "scripts/oci-rest-api-dashboard/metric_analytics.py" ]; then
+    check_python_syntax "scripts/oci-rest-api-dashboard/metric_analytics.py"
+fi
 echo ""
 
 # 7. OCI Cloud Agent Configuration Guide